@@ -1,3 +1,3 @@
 #!/bin/bash
 
-python3 src/main.py "/ssg/"
\ No newline at end of file
+python3 src/main.py "/ssg/" --force
\ No newline at end of file
@@ -1,3 +1,3 @@
 #!/bin/bash
 
-python3 src/main.py && cd public && python3 -m http.server 8888
+python3 src/main.py watch --port 8888
@@ -0,0 +1,171 @@
+"""Content-hashed names for static files, so they can be cached for good,
+and the sizes of images, read from their headers.
+
+Each hashed static file is written a second time under a name holding its
+hash, next to the original, which stays for anything that refers to it
+from outside the pages, such as a stylesheet's url(). Pages and templates
+are pointed at the hashed names through an AssetTable. Both the hash and
+the image size live in the file's record in the manifest, which is only
+hashed again when the file's size or mtime changes, so neither is worked
+out again for a file that didn't change."""
+
+import hashlib
+import json
+import os
+import struct
+
+import fileio
+
+# Extensions of the files that get a hashed name: what pages and templates
+# point at. Anything else, like robots.txt, keeps only its own name.
+HASHED_TYPES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".ico", ".css", ".js", ".mjs", ".woff", ".woff2"}
+
+# How many hex digits of the hash go into a name.
+HASH_LENGTH = 10
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers, which hold the image's size. 0xC4, 0xC8 and
+# 0xCC are in the same range but mean something else.
+JPEG_FRAMES = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def hashed_name(rel_path, digest):
+    """rel_path with the start of digest before its extension: images/a.png becomes images/a.0123456789.png."""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def jpeg_size(f):
+    """Walks the markers of the JPEG f, from just after its start marker, to the first frame's size."""
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            return None
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+        data = f.read(2)
+        if len(data) < 2:
+            return None
+        length = struct.unpack(">H", data)[0]
+        if marker in JPEG_FRAMES:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_size(path):
+    """The (width, height) of the PNG, GIF or JPEG at path, from its header,
+    or None if it isn't one of those or its header is damaged."""
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+            return struct.unpack("<HH", head[6:10])
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return jpeg_size(f)
+    return None
+
+
+def update(static_dir, dest_dir, previous, current, changed, report=None):
+    """Writes the hashed copy of each static file in current, noting its
+    name and, for images, its size in its record. previous holds the
+    records of the last build and changed the files this build copied.
+    Copies are linked to the file they copy where the filesystem allows.
+    Returns an AssetTable of the files."""
+    names = set()
+    for rel_path, record in current.items():
+        if os.path.splitext(rel_path)[1].lower() not in HASHED_TYPES:
+            continue
+        old = previous.get(rel_path) or {}
+        name = hashed_name(rel_path, record["hash"])
+        record["hashed"] = name
+        names.add(name)
+        if old.get("hash") == record["hash"] and "image" in old:
+            record["image"] = old["image"]
+        else:
+            try:
+                size = image_size(os.path.join(static_dir, rel_path))
+            except OSError:
+                size = None
+            record["image"] = list(size) if size else None
+        dest_path = os.path.join(dest_dir, name)
+        if rel_path in changed or old.get("hashed") != name or fileio.dest_size(dest_path) != record["size"]:
+            fileio.place(os.path.join(dest_dir, rel_path), dest_path, link=True)
+            if report is not None:
+                report.written.append(name)
+        elif report is not None:
+            report.skipped.append(name)
+    remove_stale(dest_dir, previous, names, report)
+    return AssetTable(current)
+
+
+def remove_stale(dest_dir, previous, names=(), report=None):
+    """Removes the hashed copies recorded in previous that aren't in names."""
+    for record in previous.values():
+        name = record.get("hashed")
+        if name and name not in names and os.path.exists(os.path.join(dest_dir, name)):
+            fileio.remove(os.path.join(dest_dir, name), dest_dir)
+            if report is not None:
+                report.removed.append(name)
+
+
+def url_path(url):
+    """Splits a url into its path and the query or fragment after it."""
+    end = len(url)
+    for sep in "?#":
+        pos = url.find(sep)
+        if pos != -1:
+            end = min(end, pos)
+    return url[:end], url[end:]
+
+
+class AssetTable():
+    """The lookup table from the site-absolute url of each static file with
+    a hashed name to that name's url, and to its width and height if it is
+    an image. Urls are looked up before the basepath is added to them."""
+
+    def __init__(self, static):
+        self.paths = {}
+        self.urls = {}
+        self.sizes = {}
+        for rel_path, record in static.items():
+            if not record.get("hashed"):
+                continue
+            url = "/" + rel_path.replace(os.sep, "/")
+            self.paths[url] = rel_path
+            self.urls[url] = "/" + record["hashed"].replace(os.sep, "/")
+            if record.get("image"):
+                self.sizes[url] = tuple(record["image"])
+        data = json.dumps([sorted(self.urls.items()), sorted(self.sizes.items())])
+        self.digest = hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+    def url(self, url):
+        """url pointed at the hashed name of the static file it names, or url itself."""
+        path, rest = url_path(url)
+        hashed = self.urls.get(path)
+        return url if hashed is None else hashed + rest
+
+    def path(self, url):
+        """The static file url names, relative to the static directory, or None."""
+        return self.paths.get(url_path(url)[0])
+
+    def size(self, url):
+        """The (width, height) of the image url names, or None."""
+        return self.sizes.get(url_path(url)[0])
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __repr__(self):
+        return f"AssetTable({len(self.urls)} files, {self.digest})"
@@ -0,0 +1,392 @@
+"""Benchmarks for the generator's hot paths and whole-site builds.
+
+Run from the repository root with ./bench.sh [name ...]. With no names,
+every benchmark runs. --json saves the results and --compare prints them
+next to a saved run, so two commits can be compared:
+
+    ./bench.sh --json before.json
+    git checkout other-branch
+    ./bench.sh --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import corpus
+from textnode import TextNode, TextType
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__.removeprefix("bench_")] = fn
+    return fn
+
+
+def best_of(fn, number, repeat=5):
+    """Returns the best time per call of fn, in seconds."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+# The inline chain from before the single-pass scanner, kept verbatim (but
+# for the names) so bench_inline measures against what it replaced.
+
+
+def baseline_split_nodes_delimiter(old_nodes, delimiter, text_type):
+    """Takes a list of TextNodes and splits off nodes containing a particular text type."""
+    res = []
+    for node in old_nodes:
+        if node.text_type != TextType.NORMAL:
+            res.append(node)
+            continue
+        segments = node.text.split(delimiter)
+        if len(segments) % 2 == 0:
+            raise ValueError("Invalid markdown syntax. Uneven number of delimiters")
+
+        for i in range(len(segments)):
+            if i % 2 == 0:
+                res.append(TextNode(segments[i], TextType.NORMAL))
+            else:
+                res.append(TextNode(segments[i], text_type))
+
+    return res
+
+
+def baseline_split_nodes_image(old_nodes):
+    new_nodes = []
+    regex = r"(!\[[^\[\]]*\]\([^\(\)]*\))"
+    gre = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    for node in old_nodes:
+        if node.text_type != TextType.NORMAL:
+            new_nodes.append(node)
+            continue
+
+        text = node.text
+        while re.search(regex, text):
+            before, image, after = re.split(regex, text, maxsplit=1)
+            if before:
+                new_nodes.append(TextNode(before, TextType.NORMAL))
+            m = re.match(gre, image)
+            if m:
+                new_nodes.append(TextNode(m.group(1), TextType.IMAGE, url=m.group(2)))
+            text = after
+        if text:
+            new_nodes.append(TextNode(text, TextType.NORMAL))
+    return new_nodes
+
+
+def baseline_split_nodes_link(old_nodes):
+    new_nodes = []
+    regex = r"((?<!!)\[[^\[\]]*\]\([^\(\)]*\))"
+    gre = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    for node in old_nodes:
+        if node.text_type != TextType.NORMAL:
+            new_nodes.append(node)
+            continue
+
+        text = node.text
+        while re.search(regex, text):
+            before, link, after = re.split(regex, text, maxsplit=1)
+            if before:
+                new_nodes.append(TextNode(before, TextType.NORMAL))
+            m = re.match(gre, link)
+            if m:
+                new_nodes.append(TextNode(m.group(1), TextType.LINK, url=m.group(2)))
+            text = after
+        if text:
+            new_nodes.append(TextNode(text, TextType.NORMAL))
+    return new_nodes
+
+
+def baseline_text_to_textnodes(text):
+    nodes = [TextNode(text, TextType.NORMAL)]
+    nodes = baseline_split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = baseline_split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = baseline_split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = baseline_split_nodes_image(nodes)
+    nodes = baseline_split_nodes_link(nodes)
+
+    return nodes
+
+
+@benchmark
+def bench_inline(args):
+    """The single-pass inline scanner against the chained split_nodes_* passes it replaced."""
+    from inline import text_to_textnodes
+
+    cases = {
+        "short": "This is **text** with an _italic_ word and a `code block` and a [link](https://boot.dev)",
+        "link-heavy": " ".join(f"see [page {i}](/pages/{i}) or ![img {i}](/images/{i}.png)" for i in range(1000)),
+        "long-paragraph": "In the vast and intricate weave of the legendarium, **amidst heroes** of renown, _there exists_ a curious anomaly. " * 2000,
+    }
+    results = {}
+    for name, text in cases.items():
+        assert text_to_textnodes(text) == baseline_text_to_textnodes(text)
+        number = 1000 if len(text) < 1000 else 5
+        results[f"{name}.chained"] = (best_of(lambda: baseline_text_to_textnodes(text), number), "s")
+        results[f"{name}.scanner"] = (best_of(lambda: text_to_textnodes(text), number), "s")
+    return results
+
+
+@benchmark
+def bench_hot(args):
+    """Single-function hot paths on one synthetic page."""
+    from convert import markdown_to_html_node, parse_blocks, text_to_textnodes
+
+    markdown = corpus.synthetic_markdown(args.blocks * 10, args.seed, args.mix, args.link_density)
+    paragraph = " ".join(corpus.Generator(args.seed, link_density=args.link_density).sentence() for _ in range(200))
+    node = markdown_to_html_node(markdown)
+    return {
+        "text_to_textnodes": (best_of(lambda: text_to_textnodes(paragraph), 20), "s"),
+        "parse_blocks": (best_of(lambda: parse_blocks(markdown), 20), "s"),
+        "markdown_to_html_node": (best_of(lambda: markdown_to_html_node(markdown), 5), "s"),
+        "to_html": (best_of(node.to_html, 20), "s"),
+    }
+
+
+@benchmark
+def bench_output(args):
+    """Serializing one synthetic page as it is, escaped, and escaped and minified."""
+    import io
+
+    from convert import markdown_to_html_node
+    from htmlnode import OUTPUTS
+    from template import Template
+
+    node = markdown_to_html_node(corpus.synthetic_markdown(args.blocks * 10, args.seed, args.mix, args.link_density))
+    template = Template(corpus.TEMPLATE)
+
+    def fill(text):
+        template.write_to(io.StringIO(), {"Title": "Title", "Content": node}, text)
+
+    results = {}
+    for name, text in OUTPUTS.items():
+        results[name] = (best_of(lambda: fill(text), 10), "s")
+    return results
+
+
+def run_measured(statement):
+    """Runs statement in a fresh interpreter. Returns the last number it
+    printed, if any, and its peak RSS in KiB."""
+    code = f"import resource, corpus\n{statement}\nprint(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    output = result.stdout.split()
+    return (float(output[-2]) if len(output) > 1 else None), int(output[-1])
+
+
+def rss_after(statement):
+    """Runs statement in a fresh interpreter and returns its peak RSS in KiB."""
+    return run_measured(statement)[1]
+
+
+@benchmark
+def bench_nodes(args):
+    """Construction time and memory of the node tree for a large document."""
+    from convert import markdown_to_html_node, text_node_to_html_node
+    from textnode import TextNode, TextType
+
+    # The children inherit this process's peak RSS, so measure them first.
+    blocks = 60000
+    base = rss_after("from convert import markdown_to_html_node\nmarkdown = corpus.synthetic_markdown(%d)" % blocks)
+    rss = rss_after("from convert import markdown_to_html_node\nnode = markdown_to_html_node(corpus.synthetic_markdown(%d))" % blocks)
+
+    markdown = corpus.synthetic_markdown(blocks)
+    elapsed = best_of(lambda: markdown_to_html_node(markdown), 1, repeat=3)
+
+    tracemalloc.start()
+    node = markdown_to_html_node(markdown)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del node
+
+    spans = [(f"span {i}", text_type) for i in range(100000) for text_type in (TextType.NORMAL, TextType.BOLD, TextType.CODE)]
+    construct = best_of(lambda: [text_node_to_html_node(TextNode(text, text_type)) for text, text_type in spans], 1)
+
+    return {
+        "tree": (elapsed, "s"),
+        "spans": (construct, "s"),
+        "traced_peak": (peak / 2**20, "MiB"),
+        "tree_rss": ((rss - base) / 2**10, "MiB"),
+    }
+
+
+@benchmark
+def bench_large(args):
+    """One very large page, read whole against streamed: time and peak RSS."""
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        source = os.path.join(root, "large.md")
+        template = os.path.join(root, "template.html")
+        with open(source, "w") as f:
+            f.write(corpus.synthetic_markdown(args.blocks * 5000, args.seed, args.mix, args.link_density))
+        with open(template, "w") as f:
+            f.write(corpus.TEMPLATE)
+        results = {"source": (os.path.getsize(source) / 2**20, "MiB")}
+        for mode, size in (("whole", 1 << 62), ("streamed", 0)):
+            statement = (
+                "import convert, time\n"
+                f"convert.STREAM_SIZE = {size}\n"
+                "start = time.perf_counter()\n"
+                f"convert.generate_page('/', {source!r}, {template!r}, {os.path.join(root, mode + '.html')!r})\n"
+                "print(time.perf_counter() - start)"
+            )
+            elapsed, rss = run_measured(statement)
+            results[mode] = (elapsed, "s")
+            results[f"{mode}_rss"] = (rss / 2**10, "MiB")
+    finally:
+        shutil.rmtree(root)
+    return results
+
+
+def best_run(command, cwd, repeat=20):
+    """The fastest of repeat runs of command, in seconds, start to exit."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def import_time(module):
+    """Seconds spent importing module and everything it imports, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+@benchmark
+def bench_startup(args):
+    """Interpreter startup and imports: a bare interpreter, main.py page on one page, and imports of the entry points."""
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        paths = corpus.generate(root, 1, 1, args.blocks, args.mix, args.link_density, args.seed)
+        main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        page = os.path.join("content", paths[0])
+        results = {
+            "interpreter": (best_run([sys.executable, "-c", "pass"], root), "s"),
+            "page": (best_run([sys.executable, main, "page", page, os.path.join(root, "page.html")], root), "s"),
+        }
+    finally:
+        shutil.rmtree(root)
+    for module in ("convert", "build", "main"):
+        results[f"import_{module}"] = (min(import_time(module) for _ in range(5)), "s")
+    return results
+
+
+@benchmark
+def bench_build(args):
+    """Cold, no-op and one-edit builds of a synthetic site, and a metadata scan of all of it."""
+    import build
+    from manifest import Manifest
+
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        paths = corpus.generate(root, args.pages, args.depth, args.blocks, args.mix, args.link_density, args.seed)
+        content = os.path.join(root, "content")
+        dest = os.path.join(root, "docs")
+
+        def run():
+            build.build("/", content, os.path.join(root, "template.html"), os.path.join(root, "static"), dest, jobs=args.jobs,
+                        io_threads=args.io_threads)
+
+        cold = timed(run)
+        noop = timed(run)
+        with open(os.path.join(content, paths[0]), "a") as f:
+            f.write("\nOne more paragraph.\n")
+        edit = timed(run)
+        pages = build.discover_pages(content)
+        index = timed(lambda: build.index_pages(content, pages, Manifest(None), Manifest(None)))
+    finally:
+        shutil.rmtree(root)
+    return {
+        "cold": (cold, "s"),
+        "warm_noop": (noop, "s"),
+        "warm_one_edit": (edit, "s"),
+        "metadata_scan": (index, "s"),
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def format_value(value, unit):
+    if unit == "s":
+        return f"{value * 1e3:12.3f} ms"
+    return f"{value:12.1f} {unit:<3}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmarks.")
+    parser.add_argument("names", nargs="*", metavar="name",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", metavar="PATH", help="save the results to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="compare against results saved with --json")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes for the build benchmark")
+    parser.add_argument("--io-threads", type=int, default=0, help="I/O threads for the build benchmark")
+    corpus.add_arguments(parser)
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        fn = BENCHMARKS[name]
+        print(f"{name}: {fn.__doc__}")
+        for metric, (value, unit) in fn(args).items():
+            key = f"{name}.{metric}"
+            results[key] = {"value": value, "unit": unit}
+            line = f"  {metric:<28}{format_value(value, unit)}"
+            if key in baseline:
+                old = baseline[key]["value"]
+                line += f"  was {format_value(old, unit)}  {value / old if old else float('inf'):6.2f}x"
+            print(line)
+
+    if args.json:
+        data = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "corpus": {
+                "pages": args.pages, "depth": args.depth, "blocks": args.blocks,
+                "mix": args.mix, "link_density": args.link_density, "seed": args.seed,
+            },
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(data, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+"""Incremental site builds driven by the build manifest."""
+
+import os
+import shutil
+
+import convert
+import fileio
+import meta
+import timing
+from htmlnode import OUTPUTS
+from links import LinkIndex
+from manifest import Manifest, fingerprint, manifest_path
+from template import find_template, load_template
+
+
+class BuildReport():
+    def __init__(self):
+        self.generated = []
+        self.removed = []
+        self.copied = []
+        self.written = []
+        self.skipped = []
+        self.errors = []
+        self.static = None
+        self.links = None
+        self.dangling = {}
+        self.inputs = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.page_cache_hits = 0
+        self.page_cache_misses = 0
+        self.compressed = []
+        self.index = None
+        self.listings = []
+
+    def summary(self):
+        """Returns the files in dest_dir that this build wrote, left as they
+        were and deleted, relative to dest_dir, for a deploy step to upload."""
+        return {
+            "written": sorted(self.written),
+            "skipped": sorted(self.skipped),
+            "deleted": sorted(self.removed),
+        }
+
+    def __repr__(self):
+        return f"BuildReport(generated={len(self.generated)}, removed={len(self.removed)}, copied={len(self.copied)}, errors={len(self.errors)})"
+
+
+class DestError(ValueError):
+    """dest_dir can't be cleared for a build from scratch."""
+
+
+def clear_dest(dest_dir, force=False, keep=()):
+    """Deletes dest_dir, which has no manifest, so a build can start over.
+    Raises DestError instead if dest_dir is or holds any of keep, the paths
+    the build reads from, or if it holds files and force isn't set, as it
+    may not be a build's output at all."""
+    if not os.path.exists(dest_dir):
+        return
+    dest = os.path.realpath(dest_dir)
+    for path in keep:
+        path = os.path.realpath(path)
+        if path == dest or path.startswith(os.path.join(dest, "")):
+            raise DestError(f"{dest_dir} holds {path}, which the build reads from")
+    if os.listdir(dest_dir) and not force:
+        raise DestError(f"{dest_dir} isn't empty and has no manifest from an earlier build (--force deletes it anyway)")
+    shutil.rmtree(dest_dir)
+
+
+class PageError():
+    def __init__(self, path, error):
+        self.path = path
+        self.error = error
+
+    def __str__(self):
+        return f"{self.path}: {type(self.error).__name__}: {self.error}"
+
+
+def discover_pages(content_dir):
+    """Returns the .md files under content_dir, relative to it, in sorted order."""
+    return [path for path in fileio.walk_files(content_dir) if path.endswith(".md")]
+
+
+def page_dest(rel_path):
+    return rel_path[:-3] + ".html"
+
+
+def init_worker(profile, block_cache, page_cache, serialize_text, asset_table):
+    """ProcessPoolExecutor initializer. Sets up profiling, the block and page
+    caches, the output and the asset table in each worker the way build()
+    set them up in the parent."""
+    timing.init_worker(profile)
+    convert.serialize_text = serialize_text
+    convert.asset_table = asset_table
+    open_caches(block_cache, page_cache)
+
+
+def open_caches(block_cache, page_cache):
+    """Opens convert's block cache from block_cache, a (maxsize, path) pair,
+    and its page cache from page_cache, a (path, max_bytes) pair, where they
+    aren't None. Used by build() and by each worker, so both get the same."""
+    if block_cache is None and page_cache is None:
+        return
+    import cache
+
+    if block_cache is not None:
+        convert.block_cache = cache.BlockCache(*block_cache)
+    if page_cache is not None:
+        convert.page_cache = cache.PageCache(*page_cache)
+
+
+def render_page(basepath, source_path, template_path, dest_path, previous):
+    """Worker process entry point. Generates one page and returns its result
+    with the profiler's measurements and cache counts for the parent to
+    merge."""
+    profiler = timing.profiler
+    if profiler is not None:
+        profiler.reset()
+    result = convert.generate_page(basepath, source_path, template_path, dest_path, previous)
+    return {
+        "result": result,
+        "profile": profiler.take() if profiler is not None else None,
+        "cache": convert.block_cache.take_stats() if convert.block_cache is not None else None,
+        "page_cache": convert.page_cache.take_stats() if convert.page_cache is not None else None,
+    }
+
+
+def render_pages(basepath, pages, jobs=1, block_cache=None, report=None, io_threads=0, page_cache=None, done=None):
+    """Generates each (source_path, template_path, dest_path, previous) page
+    in pages, where previous is the page's output record from the last build
+    or None.
+
+    With jobs > 1 the pages are rendered on a pool of worker processes.
+    block_cache is the (maxsize, path) of the block cache and page_cache
+    the (path, max_bytes) of the page cache the workers should use, and
+    their hit and miss counts are added to report.
+    Otherwise, with io_threads > 0, reads and writes are overlapped with
+    rendering by pipeline.render_pages.
+    done, if given, is called on this thread with the index and result of
+    each page that was written, as soon as it is.
+    Returns the result of convert.generate_page for each page and the
+    exception it raised, with None in place of whichever is missing, as
+    two lists in the order of pages."""
+    if jobs <= 1 and io_threads > 0:
+        import pipeline
+
+        return pipeline.render_pages(basepath, pages, io_threads, done=done)
+    results = []
+    errors = []
+    if jobs <= 1 or len(pages) <= 1:
+        for i, (source_path, template_path, dest_path, previous) in enumerate(pages):
+            try:
+                results.append(convert.generate_page(basepath, source_path, template_path, dest_path, previous))
+                errors.append(None)
+            except Exception as e:
+                results.append(None)
+                errors.append(e)
+                continue
+            if done is not None:
+                done(i, results[i])
+        return results, errors
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    profiler = timing.profiler
+    initargs = (profiler is not None, block_cache, page_cache, convert.serialize_text, convert.asset_table)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=initargs) as executor:
+        futures = [
+            executor.submit(render_page, basepath, source_path, template_path, dest_path, previous)
+            for source_path, template_path, dest_path, previous in pages
+        ]
+        for i, future in enumerate(futures):
+            error = future.exception()
+            if error is None:
+                result = future.result()
+                results.append(result["result"])
+                if done is not None:
+                    done(i, result["result"])
+                if result["profile"] is not None:
+                    profiler.merge(result["profile"])
+                if result["cache"] is not None and report is not None:
+                    report.cache_hits += result["cache"][0]
+                    report.cache_misses += result["cache"][1]
+                if result["page_cache"] is not None and report is not None:
+                    report.page_cache_hits += result["page_cache"][0]
+                    report.page_cache_misses += result["page_cache"][1]
+            else:
+                results.append(None)
+            errors.append(error)
+    return results, errors
+
+
+def index_pages(content_dir, pages, previous, current):
+    """Returns a meta.SiteIndex of pages. A page's metadata is kept in its
+    manifest record and only scanned again if its source changed; pages
+    without a record in current, such as other shards' pages, are always
+    scanned. A page that can't be read is indexed without a title."""
+    index = meta.SiteIndex()
+    for rel_path in pages:
+        old = previous.pages.get(rel_path)
+        record = current.pages.get(rel_path)
+        if record and old and "meta" in old and old["hash"] == record["hash"]:
+            page = meta.PageMeta.from_json(rel_path, old["meta"])
+        else:
+            try:
+                page = meta.scan(content_dir, rel_path)
+            except (OSError, ValueError):
+                page = meta.PageMeta(rel_path)
+        if record:
+            record["meta"] = page.to_json()
+        index.add(page)
+    return index
+
+
+def write_listings(outputs, dest_dir, previous, current, text, report):
+    """Writes each listing.Output whose digest changed since the last build,
+    or whose file went missing, recording them in current's listings.
+    Outputs that a static file already provides are left out."""
+    for output in outputs:
+        if output.dest in current.static:
+            continue
+        old = previous.listings.get(output.dest)
+        path = os.path.join(dest_dir, output.dest)
+        digest = output.digest
+        if old and old["digest"] == digest and fileio.dest_size(path) == old["size"]:
+            current.listings[output.dest] = old
+            if output.links:
+                old["links"] = output.links
+            report.skipped.append(output.dest)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            record, written = fileio.write_output_stream(path, lambda stream: output.write_to(stream, text), old)
+        except (OSError, ValueError) as e:
+            report.errors.append(PageError(output.dest, e))
+            continue
+        record["digest"] = digest
+        if output.links:
+            record["links"] = output.links
+        current.listings[output.dest] = record
+        report.listings.append(output.dest)
+        if written:
+            report.written.append(output.dest)
+        else:
+            report.skipped.append(output.dest)
+
+
+def add_inputs(files, inputs, previous_inputs, changed_inputs):
+    """Fingerprints each of files not yet in inputs, adding those that
+    changed since the last build to changed_inputs."""
+    for file in files:
+        if file not in inputs and os.path.exists(file):
+            inputs[file] = fingerprint(file, previous_inputs.get(file))
+            if previous_inputs.get(file, {}).get("hash") != inputs[file]["hash"]:
+                changed_inputs.add(file)
+
+
+def template_static(template_path, basepath, asset_table):
+    """Returns the static files the template points at through asset_table,
+    which are part of every page it fills."""
+    if asset_table is None:
+        return []
+    try:
+        return load_template(template_path, basepath, asset_table).static
+    except (OSError, ValueError):
+        return []
+
+
+def template_files(template_path, basepath):
+    """Returns the template's file and its partials. If the template can't be
+    loaded, just its own path, and rendering will report why."""
+    try:
+        return load_template(template_path, basepath).files
+    except (OSError, ValueError):
+        return [template_path]
+
+
+def build(basepath, content_dir, template_path, static_dir, dest_dir, jobs=1, checksum=False, link=False,
+          block_cache=None, io_threads=0, shard=None, page_cache=None, output="raw", gzip=None, listings=None,
+          hash_assets=False, force=False):
+    """Brings dest_dir up to date with the content, templates and static files.
+
+    Each page is rendered with the closest template.html in its directory of
+    content_dir or above, or else template_path. The manifest records what
+    every page was built from: its source, its template and the partials
+    that includes, and the static files it links to. It is kept in
+    manifest.STATE_DIR beside dest_dir, so it is never deployed with the
+    site. Only pages for which one of those changed since the last build
+    are regenerated, on jobs worker processes, and all of them if the
+    basepath changed. Outputs whose
+    source was deleted are removed. Without a manifest from a previous build,
+    dest_dir is rebuilt from scratch. A page that fails to render is listed
+    in the report's errors and retried on the next build. checksum and link
+    are passed on to fileio.sync for the static files.
+
+    Files are replaced atomically, and a regenerated page whose HTML didn't
+    change is left untouched, keeping its mtime. The report lists every
+    output as written or skipped, and the deleted ones as removed.
+
+    Each page's links and images are kept in the manifest, and the report's
+    links is a LinkIndex over the whole site. dangling maps the output path
+    of each removed page to the pages that still link to it. inputs lists
+    every template and partial used. index is a meta.SiteIndex of the
+    titles and front matter of every page in the site, read without
+    rendering them.
+
+    block_cache is an optional (maxsize, path) pair. It turns on a cache of
+    rendered blocks holding maxsize entries in memory per process, and
+    shared on disk at path if path is set.
+
+    page_cache is an optional (path, max_bytes) pair. It keeps the rendered
+    body of every page on disk at path, up to max_bytes, so pages whose
+    markdown hasn't changed are not parsed again, as when only a template
+    did.
+
+    io_threads > 0, with jobs = 1, reads and writes pages on that many
+    threads while rendering continues.
+
+    output names the htmlnode.OUTPUTS function pages are serialized with:
+    "raw" writes text as it is, "escape" escapes text and attribute values,
+    and "minify" also collapses whitespace outside pre elements. Changing it
+    rebuilds every page.
+
+    gzip is an optional (level, min_size) pair. It keeps a .gz sibling next
+    to every HTML and text-like static output of at least min_size bytes,
+    compressed at level on a pool of threads while the build goes on. Only
+    outputs written by this build, or missing their sibling, are compressed
+    again. Siblings are listed in the report with the other outputs.
+
+    hash_assets also writes each static file that pages point at under a
+    name holding its hash, see assets.update, and points the pages and
+    templates at those names. Images are given their width and height.
+    Pages are regenerated when a static file their template points at
+    changes, as they are for the files they link to, even ones added since
+    they were built, and all of them when hash_assets is turned on or off.
+
+    listings is an optional listing.Listings. It adds a sitemap, feeds and
+    listing pages made from the index to the site, each written again only
+    when the pages it covers or their metadata changed. Listing pages use
+    the template their directory's pages would.
+
+    shard is an optional shard.Shard. Only its share of the pages is built,
+    along with all the static files, for shard.merge to combine with the
+    other shards' output.
+
+    Without a manifest, dest_dir is only deleted if it is empty or force is
+    set, and never if it holds the content, templates or static files; see
+    clear_dest."""
+    path = manifest_path(dest_dir)
+    previous = Manifest.load(path)
+    if previous is None:
+        clear_dest(dest_dir, force, (content_dir, template_path, static_dir))
+        previous = Manifest(path)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    current = Manifest(path)
+    inputs = {}
+    current.config = {"basepath": basepath, "inputs": inputs, "output": output}
+    rebuild_all = (
+        previous.config.get("basepath") != basepath
+        or previous.config.get("output", "raw") != output
+        or previous.config.get("hash_assets", False) != hash_assets
+    )
+    previous_inputs = previous.config.get("inputs", {})
+
+    report = BuildReport()
+    report.static = fileio.sync(static_dir, dest_dir, previous.static, current.static, checksum, link)
+    report.copied = report.static.copied + report.static.linked
+    report.written.extend(report.copied)
+    report.skipped.extend(report.static.unchanged)
+    report.removed.extend(report.static.removed)
+    changed_static = set(report.copied) | set(report.static.removed)
+    # Each page's urls from the last build, resolved against this build's
+    # static files, so a page is also rebuilt when a file it links to that
+    # didn't exist then is added. Only needed when static files changed.
+    previous_links = LinkIndex(previous.pages, current.static) if changed_static else None
+
+    asset_table = None
+    if hash_assets:
+        import assets
+
+        current.config["hash_assets"] = True
+        asset_table = assets.update(static_dir, dest_dir, previous.static, current.static, changed_static, report)
+    elif previous.config.get("hash_assets"):
+        import assets
+
+        assets.remove_stale(dest_dir, previous.static, report=report)
+
+    compressor = None
+    if gzip is not None:
+        import compress
+
+        current.config["gzip"] = list(gzip)
+        recompress = previous.config.get("gzip") != list(gzip)
+        compressor = compress.Compressor(dest_dir, *gzip)
+        hashed = set()
+        for rel_path, record in current.static.items():
+            compressor.update(rel_path, record["size"], recompress or rel_path in changed_static, current.static)
+            if record.get("hashed"):
+                hashed.add(record["hashed"])
+                compressor.update(record["hashed"], record["size"], recompress or rel_path in changed_static, current.static)
+        for rel_path in report.static.removed:
+            compressor.remove(rel_path)
+        for record in previous.static.values():
+            if record.get("hashed") and record["hashed"] not in hashed:
+                compressor.remove(record["hashed"])
+
+    templates = {}
+    dependencies = {}
+    static_deps = {}
+    changed_inputs = set()
+
+    def resolve_template(template):
+        """Notes the files and static files template depends on, the first time it is used."""
+        if template not in dependencies:
+            dependencies[template] = template_files(template, basepath)
+            add_inputs(dependencies[template], inputs, previous_inputs, changed_inputs)
+            static_deps[template] = template_static(template, basepath, asset_table)
+
+    dirty = []
+    all_pages = discover_pages(content_dir)
+    if shard is None:
+        selected = all_pages
+    else:
+        sizes = {p: os.path.getsize(os.path.join(content_dir, p)) for p in all_pages} if shard.weighted else None
+        selected = shard.select(all_pages, sizes)
+        current.config["shard"] = shard.record(all_pages)
+    for rel_path in selected:
+        source_path = os.path.join(content_dir, rel_path)
+        dest_path = os.path.join(dest_dir, page_dest(rel_path))
+        template = find_template(content_dir, os.path.dirname(rel_path), template_path, templates)
+        resolve_template(template)
+        deps = dependencies[template]
+
+        old = previous.pages.get(rel_path)
+        record = fingerprint(source_path, old)
+        record["dest"] = page_dest(rel_path)
+        record["deps"] = deps
+        if old:
+            for key in ("output", "links", "images", "assets"):
+                if key in old:
+                    record[key] = old[key]
+        current.pages[rel_path] = record
+        if (
+            rebuild_all
+            or not old
+            or old["hash"] != record["hash"]
+            or old.get("deps") != deps
+            or any(file in changed_inputs for file in deps)
+            or any(asset in changed_static for asset in old.get("assets", ()))
+            or (previous_links is not None and any(asset in changed_static for asset in previous_links.assets(rel_path)))
+            or any(asset in changed_static for asset in static_deps[template])
+            or not os.path.exists(dest_path)
+        ):
+            dirty.append(rel_path)
+        else:
+            report.skipped.append(record["dest"])
+    report.inputs = sorted(inputs)
+    report.index = index_pages(content_dir, all_pages, previous, current)
+
+    pages = [
+        (os.path.join(content_dir, p), current.pages[p]["deps"][0], os.path.join(dest_dir, page_dest(p)), current.pages[p].get("output"))
+        for p in dirty
+    ]
+    saved = (convert.block_cache, convert.page_cache, convert.serialize_text, convert.asset_table)
+    convert.serialize_text = OUTPUTS[output]
+    convert.asset_table = asset_table
+    open_caches(block_cache, page_cache)
+    compress_page = None
+    if compressor is not None:
+        # Each page's sibling is compressed as soon as the page is written,
+        # while the rest are still rendering.
+        def compress_page(i, result):
+            compressor.update(page_dest(dirty[i]), result["output"]["size"], recompress or result["written"])
+
+    try:
+        results, errors = render_pages(basepath, pages, jobs, block_cache, report, io_threads, page_cache, compress_page)
+    finally:
+        if block_cache is not None:
+            hits, misses = convert.block_cache.take_stats()
+            report.cache_hits += hits
+            report.cache_misses += misses
+            if convert.block_cache.disk is not None:
+                import cache
+
+                convert.block_cache.disk.prune(cache.DISK_ENTRIES)
+                convert.block_cache.disk.close()
+        if page_cache is not None:
+            hits, misses = convert.page_cache.take_stats()
+            report.page_cache_hits += hits
+            report.page_cache_misses += misses
+            convert.page_cache.close()
+        convert.block_cache, convert.page_cache, convert.serialize_text, convert.asset_table = saved
+
+    for rel_path, result, error in zip(dirty, results, errors):
+        if error is None:
+            report.generated.append(rel_path)
+            record = current.pages[rel_path]
+            record["output"] = result["output"]
+            record["links"] = result["links"]
+            record["images"] = result["images"]
+            if result["written"]:
+                report.written.append(page_dest(rel_path))
+            else:
+                report.skipped.append(page_dest(rel_path))
+        else:
+            current.pages[rel_path]["hash"] = None
+            report.errors.append(PageError(rel_path, error))
+
+    removed_pages = []
+    for rel_path, old in previous.pages.items():
+        if rel_path not in current.pages:
+            fileio.remove(os.path.join(dest_dir, old["dest"]), dest_dir)
+            report.removed.append(old["dest"])
+            removed_pages.append(old["dest"])
+
+    if listings is not None:
+        import listing
+
+        outputs = listing.outputs(listings, report.index, basepath, output)
+        for made in outputs:
+            if isinstance(made, listing.ListingPage):
+                made.template = find_template(content_dir, made.section, template_path, templates)
+                resolve_template(made.template)
+                made.data["template"] = [inputs.get(file, {}).get("hash") for file in dependencies[made.template]]
+                made.data["assets"] = [current.static[path]["hashed"] for path in static_deps[made.template]]
+                made.assets = asset_table
+        report.inputs = sorted(inputs)
+        write_listings(outputs, dest_dir, previous, current, OUTPUTS[output], report)
+    page_outputs = {record["dest"] for record in current.pages.values()}
+    for rel_path in previous.listings:
+        if rel_path not in current.listings and rel_path not in page_outputs and rel_path not in current.static:
+            fileio.remove(os.path.join(dest_dir, rel_path), dest_dir)
+            report.removed.append(rel_path)
+            removed_pages.append(rel_path)
+
+    if compressor is not None:
+        written = set(report.written)
+        rendered = set(dirty)
+        for rel_path, record in current.pages.items():
+            # Failed pages keep their old output and its sibling.
+            if rel_path not in rendered and record.get("output"):
+                compressor.update(record["dest"], record["output"]["size"], recompress)
+        for dest, record in current.listings.items():
+            compressor.update(dest, record["size"], recompress or dest in written)
+        for dest in removed_pages:
+            compressor.remove(dest)
+        for path, error in compressor.wait():
+            report.errors.append(PageError(path, error))
+        report.compressed = compressor.written
+        report.written.extend(compressor.written)
+        report.skipped.extend(compressor.skipped)
+        report.removed.extend(compressor.removed)
+    elif previous.config.get("gzip"):
+        import compress
+
+        old_outputs = list(previous.static) + [old["dest"] for old in previous.pages.values()] + list(previous.listings)
+        old_outputs.extend(record["hashed"] for record in previous.static.values() if record.get("hashed"))
+        for rel_path in old_outputs:
+            if rel_path + compress.SUFFIX not in current.static and compress.remove_sibling(dest_dir, rel_path):
+                report.removed.append(rel_path + compress.SUFFIX)
+
+    report.links = LinkIndex(current.pages, current.static, current.listings)
+    for rel_path in report.generated:
+        current.pages[rel_path]["assets"] = report.links.assets(rel_path)
+    if shard is None:
+        # A shard's removed pages may just have moved to another shard.
+        report.dangling = report.links.linking_to(removed_pages)
+    current.save()
+    return report
@@ -0,0 +1,225 @@
+"""Caches for rendered markdown, in memory and optionally on disk."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from htmlnode import OUTPUTS, RawNode
+from links import References
+
+# Modules whose code decides what a block renders to. Cached HTML is
+# keyed on their source so editing the parser invalidates it.
+PARSER_MODULES = ["convert", "inline", "htmlnode", "textnode", "template", "cache"]
+
+# How many entries an on-disk cache keeps after each build.
+DISK_ENTRIES = 200000
+
+# How many bytes of rendered pages a PageCache keeps by default.
+PAGE_BYTES = 256 << 20
+
+_parser_version = None
+
+
+def parser_version():
+    global _parser_version
+    if _parser_version is None:
+        h = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in PARSER_MODULES:
+            with open(os.path.join(here, name + ".py"), "rb") as f:
+                h.update(f.read())
+        _parser_version = h.hexdigest()[:16]
+    return _parser_version
+
+
+def output_name(serialize):
+    """The name in htmlnode.OUTPUTS of a serialize function, to key its HTML on."""
+    return next(name for name, fn in OUTPUTS.items() if fn is serialize)
+
+
+def assets_name(assets):
+    """The digest of an assets.AssetTable, to key the HTML rendered with it on."""
+    return assets.digest if assets is not None else ""
+
+
+class LRUCache():
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DiskCache():
+    """A string store in an SQLite file, safe to share between processes.
+
+    Connections are opened lazily per process, so an instance can be
+    inherited by forked workers."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.pid = None
+
+    def connect(self):
+        if self.conn is None or self.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)")
+            self.pid = os.getpid()
+        return self.conn
+
+    def get(self, key):
+        row = self.connect().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, value):
+        self.connect().execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, value, time.time()))
+
+    def touch(self, key):
+        """Marks key as just used, so prune() keeps it longer."""
+        self.connect().execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+
+    def flush(self):
+        if self.conn is not None and self.pid == os.getpid():
+            self.conn.commit()
+
+    def prune(self, max_entries, max_bytes=None):
+        """Deletes all but the max_entries most recently used entries, and
+        then the least recently used ones until the values left add up to
+        no more than max_bytes."""
+        conn = self.connect()
+        conn.execute("DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY used DESC, rowid DESC LIMIT ?)", (max_entries,))
+        if max_bytes is not None:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM (SELECT key, SUM(LENGTH(CAST(value AS BLOB)))"
+                " OVER (ORDER BY used DESC, rowid DESC) AS total FROM entries) WHERE total > ?)",
+                (max_bytes,),
+            )
+        conn.commit()
+
+    def close(self):
+        self.flush()
+        if self.conn is not None and self.pid == os.getpid():
+            self.conn.close()
+        self.conn = None
+
+
+class BlockCache():
+    """Memoizes the HTML of rendered markdown blocks by their content."""
+
+    def __init__(self, maxsize=10000, path=None):
+        self.memory = LRUCache(maxsize)
+        self.disk = DiskCache(path) if path else None
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, block, basepath, render, refs=None, serialize=None, assets=None):
+        """Returns the block's HTML as a RawNode, calling render(block, basepath, refs)
+        for the node only if a block with the same text hasn't been seen before.
+        The urls of the block's links and images are added to refs if given,
+        cached or not. serialize is the htmlnode.OUTPUTS function the node is
+        serialized with, and assets the assets.AssetTable it was rendered
+        with, if any."""
+        text = block.text
+        output = output_name(serialize)
+        table = assets_name(assets)
+        key = (basepath, output, table, block.type, text)
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            disk_key = hashlib.sha1(f"{parser_version()}\0{basepath}\0{output}\0{table}\0{block.type}\0{text}".encode()).hexdigest()
+            value = self.disk.get(disk_key)
+            if value is not None:
+                entry = tuple(json.loads(value))
+                self.memory.put(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            block_refs = References()
+            entry = (render(block, basepath, block_refs).to_html(serialize), block_refs.links, block_refs.images)
+            self.memory.put(key, entry)
+            if self.disk is not None:
+                self.disk.put(disk_key, json.dumps(entry))
+        else:
+            self.hits += 1
+        html, links, images = entry
+        if refs is not None:
+            refs.links.extend(links)
+            refs.images.extend(images)
+        return RawNode(html)
+
+    def take_stats(self):
+        """Returns (hits, misses) so far and resets them. Commits any disk writes."""
+        stats = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        if self.disk is not None:
+            self.disk.flush()
+        return stats
+
+
+class PageCache():
+    """Keeps the title and rendered body of each page on disk, keyed by a hash
+    of its markdown, so a page whose source hasn't changed is not parsed
+    again when only its template has."""
+
+    def __init__(self, path, max_bytes=PAGE_BYTES):
+        self.disk = DiskCache(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, markdown, basepath, render, refs=None, serialize=None, assets=None):
+        """Returns the page's title and its body as a RawNode, calling
+        render(markdown, basepath, refs) for the title and node only if the
+        same markdown hasn't been rendered before by this parser. The urls of
+        the page's links and images are added to refs if given. serialize is
+        the htmlnode.OUTPUTS function the body is serialized with, and assets
+        the assets.AssetTable it was rendered with, if any."""
+        digest = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+        output = output_name(serialize)
+        key = hashlib.sha1(f"{parser_version()}\0{basepath}\0{output}\0{assets_name(assets)}\0{digest}".encode()).hexdigest()
+        value = self.disk.get(key)
+        if value is None:
+            self.misses += 1
+            page_refs = References()
+            title, node = render(markdown, basepath, page_refs)
+            entry = (title, node.to_html(serialize), page_refs.links, page_refs.images)
+            self.disk.put(key, json.dumps(entry))
+        else:
+            self.hits += 1
+            self.disk.touch(key)
+            entry = json.loads(value)
+        title, html, links, images = entry
+        if refs is not None:
+            refs.links.extend(links)
+            refs.images.extend(images)
+        return title, RawNode(html)
+
+    def take_stats(self):
+        """Returns (hits, misses) so far and resets them. Commits any disk writes."""
+        stats = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        self.disk.flush()
+        return stats
+
+    def close(self):
+        """Evicts the least recently used pages down to the size limit."""
+        self.disk.prune(DISK_ENTRIES, self.max_bytes)
+        self.disk.close()
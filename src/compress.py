@@ -0,0 +1,93 @@
+"""Precompressed .gz siblings of the site's text files, for static servers
+that can send them as they are instead of compressing every response."""
+
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import fileio
+
+SUFFIX = ".gz"
+
+# Extensions of the files worth compressing. Images and fonts are
+# compressed already.
+TEXT_TYPES = {".html", ".htm", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml", ".csv", ".md"}
+
+DEFAULT_LEVEL = 9
+DEFAULT_MIN_SIZE = 256
+
+
+def compressible(rel_path, size, min_size):
+    return os.path.splitext(rel_path)[1].lower() in TEXT_TYPES and size >= min_size
+
+
+def compress_file(path, level=DEFAULT_LEVEL):
+    """Writes path's .gz sibling. The gzip header holds no name or mtime, so
+    the same file always compresses to the same bytes."""
+    def write(tmp_path):
+        with open(path, "rb") as src, open(tmp_path, "wb") as raw:
+            with gzip.GzipFile("", "wb", level, raw, mtime=0) as dst:
+                while chunk := src.read(1 << 20):
+                    dst.write(chunk)
+
+    fileio.replace_with(path + SUFFIX, write)
+
+
+def remove_sibling(dest_dir, rel_path):
+    """Removes the .gz sibling of rel_path in dest_dir. Returns True if there was one."""
+    gz_path = os.path.join(dest_dir, rel_path + SUFFIX)
+    if not os.path.exists(gz_path):
+        return False
+    fileio.remove(gz_path, dest_dir)
+    return True
+
+
+class Compressor():
+    """Keeps the .gz siblings of dest_dir's outputs up to date as a build
+    writes them, compressing on a pool of threads. zlib releases the GIL
+    while it works, so the threads compress in parallel."""
+
+    def __init__(self, dest_dir, level=DEFAULT_LEVEL, min_size=DEFAULT_MIN_SIZE, threads=None):
+        self.dest_dir = dest_dir
+        self.level = level
+        self.min_size = min_size
+        self.executor = ThreadPoolExecutor(max_workers=threads or os.cpu_count() or 1, thread_name_prefix="gzip")
+        self.futures = []
+        self.written = []
+        self.skipped = []
+        self.removed = []
+
+    def update(self, rel_path, size, changed, outputs=()):
+        """Brings rel_path's sibling up to date with an output of size bytes,
+        compressing it again if changed or the sibling is missing, and
+        removing it if the output is no longer worth compressing. Outputs
+        lists the build's other outputs, so a sibling that is one of them is
+        left alone."""
+        gz_path = rel_path + SUFFIX
+        if gz_path in outputs:
+            return
+        path = os.path.join(self.dest_dir, rel_path)
+        if not compressible(rel_path, size, self.min_size):
+            self.remove(rel_path)
+        elif changed or not os.path.exists(path + SUFFIX):
+            self.futures.append((gz_path, self.executor.submit(compress_file, path, self.level)))
+        else:
+            self.skipped.append(gz_path)
+
+    def remove(self, rel_path):
+        if remove_sibling(self.dest_dir, rel_path):
+            self.removed.append(rel_path + SUFFIX)
+
+    def wait(self):
+        """Waits for every sibling to be written. Returns the (path, error)
+        of each that failed."""
+        errors = []
+        for gz_path, future in self.futures:
+            error = future.exception()
+            if error is None:
+                self.written.append(gz_path)
+            else:
+                errors.append((gz_path, error))
+        self.futures = []
+        self.executor.shutdown()
+        return errors
@@ -1,25 +1,72 @@
+import io
+import itertools
 import os
-import re
 
+import fileio
+import inline
+import meta
 from htmlnode import LeafNode, ParentNode
+from lazyre import LazyPattern
+from links import References
+from template import load_template, rewrite_url
 from textnode import TextNode, TextType
 
-def text_node_to_html_node(text_node):
-    match text_node.text_type:
-        case TextType.NORMAL:
-            return LeafNode(None, text_node.text)
-        case TextType.BOLD:
-            return LeafNode("b", text_node.text)
-        case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
-        case TextType.CODE:
-            return LeafNode("code", text_node.text)
-        case TextType.LINK:
-            return LeafNode("a", text_node.text, props={"href": text_node.url})
-        case TextType.IMAGE:
-            return LeafNode("img", "", props={"src": text_node.url, "alt": text_node.text})
-        case _:
-            raise ValueError("Can't convert text to html.")
+# A cache.BlockCache, set by the build, that memoizes rendered blocks.
+block_cache = None
+
+# A cache.PageCache, set by the build, that keeps rendered pages.
+page_cache = None
+
+# The function from htmlnode.OUTPUTS that pages are serialized with, set by
+# the build. None writes text as it is.
+serialize_text = None
+
+# An assets.AssetTable, set by the build, that points urls of static files
+# at their hashed names and gives the sizes of images.
+asset_table = None
+
+# Sources bigger than this many bytes are parsed and written as a stream,
+# so that memory use doesn't grow with the size of the page.
+STREAM_SIZE = 16 << 20
+
+IMAGE_RE = LazyPattern(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = LazyPattern(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+HEADING_RE = LazyPattern(r"#{1,6} .+")
+
+INLINE_TAGS = {
+    TextType.NORMAL: None,
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+    TextType.CODE: "code",
+    TextType.LINK: "a",
+}
+
+def text_node_to_html_node(text_node, basepath="/", refs=None):
+    text_type = text_node.text_type
+    if refs is not None:
+        if text_type is TextType.LINK:
+            refs.links.append(text_node.url)
+        elif text_type is TextType.IMAGE:
+            refs.images.append(text_node.url)
+    if text_type is TextType.IMAGE:
+        if asset_table is None:
+            return LeafNode("img", "", {"src": rewrite_url(text_node.url, basepath), "alt": text_node.text})
+        props = {"src": rewrite_url(asset_table.url(text_node.url), basepath), "alt": text_node.text}
+        size = asset_table.size(text_node.url)
+        if size is not None:
+            props["width"], props["height"] = str(size[0]), str(size[1])
+        return LeafNode("img", "", props)
+    try:
+        tag = INLINE_TAGS[text_type]
+    except KeyError:
+        raise ValueError("Can't convert text to html.")
+    props = None
+    if text_type is TextType.LINK:
+        url = text_node.url if asset_table is None else asset_table.url(text_node.url)
+        props = {"href": rewrite_url(url, basepath)}
+    if text_node.children:
+        return ParentNode(tag, [text_node_to_html_node(child, basepath, refs) for child in text_node.children], props)
+    return LeafNode(tag, text_node.text, props)
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     """Takes a list of TextNodes and splits off nodes containing a particular text type."""
@@ -41,147 +88,180 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return res
 
 def extract_markdown_images(text):
-    regex = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(regex, text)
+    return IMAGE_RE.findall(text)
 
 def extract_markdown_links(text):
-    regex = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(regex, text)
+    return LINK_RE.findall(text)
 
-def split_nodes_image(old_nodes):
+def split_nodes_regex(old_nodes, regex, text_type):
     new_nodes = []
-    regex = r"(!\[[^\[\]]*\]\([^\(\)]*\))"
-    gre = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
     for node in old_nodes:
         if node.text_type != TextType.NORMAL:
             new_nodes.append(node)
             continue
 
-        text = node.text
-        while re.search(regex, text):
-            before, image, after = re.split(regex, text, maxsplit=1)
-            if before:
-                new_nodes.append(TextNode(before, TextType.NORMAL))
-            m = re.match(gre, image)
-            if m:
-                new_nodes.append(TextNode(m.group(1), TextType.IMAGE, url=m.group(2)))
-            text = after
-        if text:
-            new_nodes.append(TextNode(text, TextType.NORMAL))
+        pos = 0
+        for m in regex.finditer(node.text):
+            if m.start() > pos:
+                new_nodes.append(TextNode(node.text[pos:m.start()], TextType.NORMAL))
+            new_nodes.append(TextNode(m.group(1), text_type, url=m.group(2)))
+            pos = m.end()
+        if pos < len(node.text):
+            new_nodes.append(TextNode(node.text[pos:], TextType.NORMAL))
     return new_nodes
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    regex = r"((?<!!)\[[^\[\]]*\]\([^\(\)]*\))"
-    gre = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    for node in old_nodes:
-        if node.text_type != TextType.NORMAL:
-            new_nodes.append(node)
-            continue
+def split_nodes_image(old_nodes):
+    return split_nodes_regex(old_nodes, IMAGE_RE, TextType.IMAGE)
 
-        text = node.text
-        while re.search(regex, text):
-            before, link, after = re.split(regex, text, maxsplit=1)
-            if before:
-                new_nodes.append(TextNode(before, TextType.NORMAL))
-            m = re.match(gre, link)
-            if m:
-                new_nodes.append(TextNode(m.group(1), TextType.LINK, url=m.group(2)))
-            text = after
-        if text:
-            new_nodes.append(TextNode(text, TextType.NORMAL))
-    return new_nodes
+def split_nodes_link(old_nodes):
+    return split_nodes_regex(old_nodes, LINK_RE, TextType.LINK)
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.NORMAL)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    return inline.text_to_textnodes(text)
 
-    return nodes
+class Block():
+    """A block of markdown: its type, its lines, and the span of line
+    numbers [start, end) it came from. error is set, and raised when the
+    block is rendered, if a quote or list has a malformed line."""
 
-def markdown_to_blocks(markdown):
-    blocks = []
-    new_block = []
-    for line in markdown.splitlines():
-        if line == "":
-            if new_block:
-                blocks.append("\n".join(new_block))
-            new_block = []
-        else:
-            new_block.append(line)
-    if new_block:
-        blocks.append("\n".join(new_block))
-    return blocks
+    __slots__ = ("type", "lines", "start", "end", "error")
 
-def block_to_block_type(block):
-    if re.match(r"#{1,6} .+$", block):
-        return "heading"
-    elif re.match(r"```.*```", block, flags=re.DOTALL):
-        return "code"
-    elif block[0] == ">":
-        for line in block.splitlines():
-            if not line:
+    def __init__(self, type, lines, start, end, error=None):
+        self.type = type
+        self.lines = lines
+        self.start = start
+        self.end = end
+        self.error = error
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __eq__(self, other):
+        return (self.type, self.lines, self.start, self.end, self.error) == (other.type, other.lines, other.start, other.end, other.error)
+
+    def __repr__(self):
+        return f"Block({self.type}, {self.lines}, {self.start}, {self.end}, {self.error})"
+
+def iter_blocks(lines, last_fence=-1):
+    """Yields the Blocks of markdown given as an iterable of lines, reading
+    no further ahead than the end of the block being yielded.
+
+    Blocks are separated by blank lines, except that a fenced code block runs
+    to its closing fence, blank lines included. A fence with no closing line
+    after it is not a code block, so last_fence must be the index of the last
+    line ending with ``` (or -1). Each block is typed from its first line and
+    checked line by line as it is read."""
+    block_type = None
+    for i, line in enumerate(lines):
+        if block_type is None:
+            if line == "":
                 continue
-            if line[0] != ">":
-                raise ValueError("quote block must all start with >")
-        return "quote"
-    elif block[:2] == "* " or block[:2] == "- ":
-        for line in block.splitlines():
-            if not line:
+            start = i
+            block = [line]
+            error = None
+            if line.startswith("```") and len(line) >= 6 and line.endswith("```"):
+                yield Block("code", block, i, i + 1)
                 continue
-            if line[:2] != "* " and line[:2] != "- ":
-                raise ValueError("unordered lists must start with \"* \" or \"- \"")
-        return "unordered"
-    elif block[:2] == "1.":
-        i = 1
-        for line in block.splitlines():
-            if not line:
+            if line.startswith("```") and i < last_fence:
+                block_type = "code"
                 continue
-            if line[0] != str(i) or line[1:3] != ". ":
-                raise ValueError("ordered list must start with a number followed by a period and a space")
-            i += 1
-        return "ordered"
-    else:
-        return "paragraph"
+            if HEADING_RE.fullmatch(line):
+                block_type = "heading"
+            elif line[0] == ">":
+                block_type = "quote"
+            elif line[:2] == "* " or line[:2] == "- ":
+                block_type = "unordered"
+            elif line[:3] == "1. ":
+                block_type = "ordered"
+            else:
+                block_type = "paragraph"
+        elif block_type == "code":
+            block.append(line)
+            if line.endswith("```"):
+                yield Block(block_type, block, start, i + 1)
+                block_type = None
+        elif line == "":
+            yield Block(block_type, block, start, i, error)
+            block_type = None
+        else:
+            block.append(line)
+            if error is not None:
+                pass
+            elif block_type == "paragraph":
+                pass
+            elif block_type == "quote":
+                if line[0] != ">":
+                    error = "quote block must all start with >"
+            elif block_type == "unordered":
+                if line[:2] != "* " and line[:2] != "- ":
+                    error = "unordered lists must start with \"* \" or \"- \""
+            elif block_type == "ordered":
+                if not line.startswith(f"{i - start + 1}. "):
+                    error = "ordered list must start with a number followed by a period and a space"
+            elif block_type == "heading":
+                block_type = "paragraph"
+    if block_type is not None:
+        yield Block(block_type, block, start, start + len(block), error)
+
+def last_fence(lines):
+    """The index of the last line in lines ending with ```, or -1."""
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i].endswith("```"):
+            return i
+    return -1
 
+def parse_blocks(markdown):
+    """Splits markdown into typed Blocks in a single pass over its lines."""
+    lines = markdown.splitlines()
+    return list(iter_blocks(lines, last_fence(lines)))
 
-def text_to_html_nodes(text):
+def markdown_to_blocks(markdown):
+    return [block.text for block in parse_blocks(markdown)]
+
+def block_to_block_type(block):
+    block = parse_blocks(block)[0]
+    if block.error is not None:
+        raise ValueError(block.error)
+    return block.type
+
+
+def text_to_html_nodes(text, basepath="/", refs=None):
     text_nodes = text_to_textnodes(text)
-    return [text_node_to_html_node(text_node) for text_node in text_nodes]
+    return [text_node_to_html_node(text_node, basepath, refs) for text_node in text_nodes]
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    html_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
+def block_to_html_node(block, basepath="/", refs=None):
+    """Renders a Block. The urls of its links and images are added to refs if given."""
+    if block.error is not None:
+        raise ValueError(block.error)
 
-        if block_type == "heading":
-            hashes, title = block.split(maxsplit=1)
-            html_nodes.append(ParentNode(f"h{len(hashes)}", text_to_html_nodes(title)))
-        elif block_type == "code":
-            code_node = ParentNode("code", text_to_html_nodes(block[3:-3]))
-            pre_node = ParentNode("pre", [code_node])
-            html_nodes.append(pre_node)
-        elif block_type == "quote":
-            quoted = "\n".join(map(lambda line: line[2:], block.split("\n")))
-            html_nodes.append(ParentNode("blockquote", text_to_html_nodes(quoted)))
-        elif block_type == "unordered":
-            children = []
-            for line in block.split("\n"):
-                li_node = ParentNode("li", text_to_html_nodes(line[2:]))
-                children.append(li_node)
-            html_nodes.append(ParentNode("ul", children))
-        elif block_type == "ordered":
-            children = []
-            for line in block.split("\n"):
-                li_node = ParentNode("li", text_to_html_nodes(line[3:]))
-                children.append(li_node)
-            html_nodes.append(ParentNode("ol", children))
-        elif block_type == "paragraph":
-            html_nodes.append(ParentNode("p", text_to_html_nodes(block)))
+    if block.type == "heading":
+        hashes, title = block.lines[0].split(maxsplit=1)
+        return ParentNode(f"h{len(hashes)}", text_to_html_nodes(title, basepath, refs))
+    elif block.type == "code":
+        code_node = ParentNode("code", text_to_html_nodes(block.text[3:-3], basepath, refs))
+        return ParentNode("pre", [code_node])
+    elif block.type == "quote":
+        quoted = "\n".join(line[2:] for line in block.lines)
+        return ParentNode("blockquote", text_to_html_nodes(quoted, basepath, refs))
+    elif block.type == "unordered":
+        children = [ParentNode("li", text_to_html_nodes(line[2:], basepath, refs)) for line in block.lines]
+        return ParentNode("ul", children)
+    elif block.type == "ordered":
+        children = [
+            ParentNode("li", text_to_html_nodes(line[len(str(i)) + 2:], basepath, refs))
+            for i, line in enumerate(block.lines, 1)
+        ]
+        return ParentNode("ol", children)
+    else:
+        return ParentNode("p", text_to_html_nodes(block.text, basepath, refs))
+
+def markdown_to_html_node(markdown, basepath="/", refs=None):
+    blocks = parse_blocks(markdown)
+    if block_cache is None:
+        html_nodes = [block_to_html_node(block, basepath, refs) for block in blocks]
+    else:
+        html_nodes = [block_cache.render(block, basepath, block_to_html_node, refs, serialize_text, asset_table) for block in blocks]
     return ParentNode("div", html_nodes)
 
 def extract_title(markdown):
@@ -191,27 +271,161 @@ def extract_title(markdown):
 
     return header[2:].strip()
 
-def generate_page(basepath, from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+def read_source(path):
+    with open(path) as f:
+        return f.read()
+
+class MappedSource():
+    """A markdown file too big to hold in memory. Lines are read through a
+    bounded buffer, split at each newline, dropping a carriage return before
+    it, and decoded one at a time. The file is also mapped with mmap, to find
+    its last code fence by searching back from the end."""
+
+    CHUNK = 1 << 20
+
+    def __init__(self, path):
+        import mmap
+
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    with open(from_path) as f:
-        markdown = f.read()
+    def close(self):
+        if not isinstance(self.map, bytes):
+            self.map.close()
+        self.file.close()
 
-    with open(template_path) as f:
-        template = f.read()
+    def lines(self):
+        self.file.seek(0)
+        for line in self.file:
+            if line.endswith(b"\n"):
+                line = line[:-2] if line.endswith(b"\r\n") else line[:-1]
+            yield line.decode("utf-8")
 
-    html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
+    def last_fence(self):
+        """last_fence() for the lines of the file. Call it before lines()."""
+        data = self.map
+        end = len(data)
+        while True:
+            i = data.rfind(b"```", 0, end)
+            if i == -1:
+                return -1
+            after = data[i + 3:i + 5]
+            if after[:1] in (b"\n", b"") or after == b"\r\n":
+                break
+            end = i + 2
+        self.file.seek(0)
+        count = 0
+        while i > 0:
+            chunk = self.file.read(min(self.CHUNK, i))
+            count += chunk.count(b"\n")
+            i -= len(chunk)
+        return count
 
-    output = template.replace("{{ Title }}", title)
-    output = output.replace("{{ Content }}", html)
-    output = output.replace("href=\"/", f"href=\"{basepath}")
-    output = output.replace("src=\"/", f"src=\"{basepath}")
+class BlockStream():
+    """A template value that renders blocks one at a time as it is written,
+    standing in for the <div> markdown_to_html_node would return."""
 
+    def __init__(self, blocks, basepath="/", refs=None):
+        self.blocks = blocks
+        self.basepath = basepath
+        self.refs = refs
+
+    def write(self, write, text=None):
+        write("<div>")
+        for block in self.blocks:
+            if block_cache is None:
+                node = block_to_html_node(block, self.basepath, self.refs)
+            else:
+                node = block_cache.render(block, self.basepath, block_to_html_node, self.refs, text, asset_table)
+            node.write(write, text)
+        write("</div>")
+
+def parse_page(markdown, basepath="/", refs=None):
+    """Returns a page's title, or None if it doesn't start with one, and its
+    content as a node. An empty body is an empty <div>, as BlockStream writes it."""
+    node = markdown_to_html_node(markdown, basepath, refs)
+    if not node.children:
+        node = LeafNode("div", "")
+    return extract_title(markdown) if markdown.startswith("#") else None, node
+
+def render_markdown(markdown, basepath="/", refs=None):
+    """Returns a page's title and its content as a node, from page_cache if it has them."""
+    if page_cache is None:
+        return parse_page(markdown, basepath, refs)
+    return page_cache.render(markdown, basepath, parse_page, refs, serialize_text, asset_table)
+
+def template_values(fields, title, content):
+    """The values a page's template is filled with: its Title and Content,
+    and each field of its front matter, capitalized, with lists joined by
+    commas. A title in the front matter takes the place of the page's own,
+    which the page only needs without one."""
+    values = {}
+    for key, value in (fields or {}).items():
+        values[key[:1].upper() + key[1:]] = ", ".join(value) if isinstance(value, list) else value
+    values["Title"] = (fields or {}).get("title", title)
+    if values["Title"] is None:
+        raise ValueError('title not found')
+    values["Content"] = content
+    return values
+
+def page_values(markdown, basepath="/", refs=None):
+    """Renders a page's markdown into its template_values."""
+    fields, body = meta.split_front_matter(markdown)
+    title, node = render_markdown(body, basepath, refs)
+    return template_values(fields, title, node)
+
+def write_page(dest_path, template, values, previous=None):
     os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-    with open(dest_path, 'w') as f:
-        f.write(output)
+    out = io.StringIO()
+    template.write_to(out, values, serialize_text)
+    return fileio.write_output(dest_path, out.getvalue(), previous)
+
+def page_result(output, written, refs):
+    """What generate_page returns: the page's output record, whether it was
+    written, and the urls of its links and images, ready for the manifest."""
+    return {"output": output, "written": written, "links": refs.links, "images": refs.images}
+
+def generate_page(basepath, from_path, template_path, dest_path, previous=None):
+    """Renders from_path into dest_path, leaving dest_path alone if it already
+    holds the same HTML. previous is the output record from the last time.
+    Returns a page_result. Sources over STREAM_SIZE go to stream_page."""
+    if os.path.getsize(from_path) > STREAM_SIZE:
+        return stream_page(basepath, from_path, template_path, dest_path, previous)
+
+    markdown = read_source(from_path)
+    template = load_template(template_path, basepath, asset_table)
+
+    refs = References()
+    values = page_values(markdown, basepath, refs)
+
+    output, written = write_page(dest_path, template, values, previous)
+    return page_result(output, written, refs)
+
+def stream_page(basepath, from_path, template_path, dest_path, previous=None):
+    """generate_page without holding the page in memory: blocks are parsed
+    lazily from the mapped source, and each is rendered and written out
+    before the next is read."""
+    template = load_template(template_path, basepath, asset_table)
+    refs = References()
+    with MappedSource(from_path) as source:
+        last = source.last_fence()
+        fields, lines, skipped = meta.read_front_matter(source.lines())
+        first = next(lines, "")
+        title = extract_title(first) if first.startswith("#") else None
+        # last counts lines from the top of the file, iter_blocks from after the front matter.
+        blocks = iter_blocks(itertools.chain([first], lines), last - skipped if last >= 0 else last)
+        values = template_values(fields, title, BlockStream(blocks, basepath, refs))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        output, written = fileio.write_output_stream(dest_path, lambda stream: template.write_to(stream, values, serialize_text), previous)
+    return page_result(output, written, refs)
 
 def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path):
     for entry in os.scandir(dir_path_content):
@@ -0,0 +1,159 @@
+"""Reproducible synthetic sites for benchmarks.
+
+Run python3 src/corpus.py DIR --pages N to write one to disk."""
+
+import argparse
+import os
+import random
+
+DEFAULT_MIX = {
+    "heading": 2,
+    "paragraph": 6,
+    "unordered": 2,
+    "ordered": 1,
+    "quote": 1,
+    "code": 1,
+}
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "while elves dwarves and men held the other rings for an age until "
+    "a hobbit from the shire carried it east through moria and lorien"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+<head>
+  <title>{{ Title }}</title>
+  <link href="/index.css" rel="stylesheet" />
+</head>
+<body>
+  <article>{{ Content }}</article>
+</body>
+</html>
+"""
+
+
+class Generator():
+    def __init__(self, seed=0, mix=None, link_density=0.2, targets=None):
+        self.rng = random.Random(seed)
+        mix = mix or DEFAULT_MIX
+        self.block_types = list(mix)
+        self.weights = [mix[block_type] for block_type in self.block_types]
+        self.link_density = link_density
+        self.targets = targets or ["/"]
+
+    def words(self, n):
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def sentence(self):
+        """A sentence with inline markup, and a link or image link_density of the time."""
+        parts = [self.words(self.rng.randint(3, 8))]
+        r = self.rng.random()
+        if r < self.link_density:
+            if self.rng.random() < 0.8:
+                parts.append(f"[{self.words(2)}]({self.rng.choice(self.targets)})")
+            else:
+                parts.append(f"![{self.words(2)}](/images/{self.rng.randint(0, 9)}.png)")
+        match self.rng.randint(0, 3):
+            case 0:
+                parts.append(f"**{self.words(2)}**")
+            case 1:
+                parts.append(f"_{self.words(2)}_")
+            case 2:
+                parts.append(f"`{self.rng.choice(WORDS)}()`")
+        parts.append(self.words(self.rng.randint(2, 6)))
+        return " ".join(parts) + "."
+
+    def block(self):
+        match self.rng.choices(self.block_types, self.weights)[0]:
+            case "heading":
+                return "#" * self.rng.randint(2, 4) + " " + self.words(4)
+            case "paragraph":
+                return "\n".join(self.sentence() for _ in range(self.rng.randint(1, 6)))
+            case "unordered":
+                return "\n".join(f"- {self.sentence()}" for _ in range(self.rng.randint(2, 6)))
+            case "ordered":
+                return "\n".join(f"{i}. {self.sentence()}" for i in range(1, self.rng.randint(2, 9)))
+            case "quote":
+                return "\n".join(f"> {self.sentence()}" for _ in range(self.rng.randint(1, 4)))
+            case "code":
+                return "```\n" + "\n".join(self.words(5) for _ in range(self.rng.randint(1, 6))) + "\n```"
+
+    def page(self, blocks):
+        return "\n\n".join([f"# {self.words(5)}"] + [self.block() for _ in range(blocks)]) + "\n"
+
+
+def synthetic_markdown(blocks, seed=0, mix=None, link_density=0.2):
+    """Returns a single synthetic page with the given number of blocks."""
+    return Generator(seed, mix, link_density).page(blocks)
+
+
+def page_paths(pages, depth, seed=0, fanout=8):
+    """Spreads pages over a directory tree at most depth levels deep."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        dirs = [f"section{rng.randrange(fanout)}" for _ in range(rng.randint(0, depth))]
+        paths.append(os.path.join(*dirs, f"page{i}", "index.md"))
+    return paths
+
+
+def generate(root, pages=100, depth=3, blocks=20, mix=None, link_density=0.2, seed=0):
+    """Writes a site with content/, static/ and template.html under root.
+
+    The same arguments always produce the same files. Returns the page
+    paths relative to content/."""
+    paths = page_paths(pages, depth, seed)
+    targets = ["/" + os.path.dirname(path) for path in paths]
+    generator = Generator(seed, mix, link_density, targets)
+    for path in paths:
+        dest = os.path.join(root, "content", path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "w") as f:
+            f.write(generator.page(blocks))
+
+    os.makedirs(os.path.join(root, "static", "images"), exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), "w") as f:
+        f.write("body { font-family: serif; }\n")
+    for i in range(10):
+        with open(os.path.join(root, "static", "images", f"{i}.png"), "wb") as f:
+            f.write(random.Random(seed + i).randbytes(4096))
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+    return paths
+
+
+def parse_mix(text):
+    """Parses a block mix like "paragraph=6,code=1"."""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown block type: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def add_arguments(parser):
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help="relative block type weights, e.g. paragraph=6,code=1")
+    parser.add_argument("--link-density", type=float, default=0.2,
+                        help="chance of a link or image in each sentence")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic site for benchmarking.")
+    parser.add_argument("root")
+    add_arguments(parser)
+    args = parser.parse_args()
+    paths = generate(args.root, args.pages, args.depth, args.blocks, args.mix, args.link_density, args.seed)
+    print(f"wrote {len(paths)} pages to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,234 @@
+import hashlib
 import os
-import shutil
+import threading
 
-def copy(source, destination):
-    print(f"cwd: {os.getcwd()}")
+from manifest import fingerprint, hash_file
 
-    if not os.path.exists(source):
-        print("source does not exist: ", source)
+# ioctl request for a copy-on-write clone (Linux FICLONE).
+FICLONE = 0x40049409
+
+
+class SyncReport():
+    def __init__(self):
+        self.copied = []
+        self.linked = []
+        self.removed = []
+        self.unchanged = []
+
+    def changes(self):
+        """Yields (action, relative path) for every file that was touched."""
+        for path in self.copied:
+            yield "copied", path
+        for path in self.linked:
+            yield "linked", path
+        for path in self.removed:
+            yield "removed", path
+
+    def __repr__(self):
+        return f"SyncReport(copied={len(self.copied)}, linked={len(self.linked)}, removed={len(self.removed)}, unchanged={len(self.unchanged)})"
+
+
+def walk_files(root, rel_dir=""):
+    """Yields the path of every file under root, relative to root, in sorted order."""
+    for entry in sorted(os.scandir(os.path.join(root, rel_dir)), key=lambda e: e.name):
+        rel_path = os.path.join(rel_dir, entry.name)
+        if entry.is_dir():
+            yield from walk_files(root, rel_path)
+        elif entry.is_file():
+            yield rel_path
+
+
+def remove(path, root):
+    """Deletes the file at path and any directories it leaves empty, up to root."""
+    if os.path.exists(path):
+        os.remove(path)
+    root = os.path.abspath(root)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != root and parent.startswith(root):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+
+def reflink(source_path, dest_path):
+    """Clones source_path to dest_path without copying data. Raises OSError if
+    the platform or filesystem can't do it."""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dest_path)
+            raise
+    import shutil
+
+    shutil.copystat(source_path, dest_path)
+
+
+def temp_path(path):
+    """A hidden sibling of path, unique to this thread, to write into before
+    renaming it over path."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def replace_with(path, write):
+    """Calls write(tmp_path) and renames tmp_path over path, so an interrupted
+    build leaves either the old file or the new one, never part of one."""
+    tmp_path = temp_path(path)
+    try:
+        result = write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return result
+
+
+def place(source_path, dest_path, link=False):
+    """Puts a copy of source_path at dest_path.
+
+    With link, tries a reflink and then a hardlink before falling back to a
+    real copy. Returns True if the file was linked rather than copied."""
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+    def write(tmp_path):
+        if link:
+            try:
+                reflink(source_path, tmp_path)
+                return True
+            except OSError:
+                pass
+            try:
+                os.link(source_path, tmp_path)
+                return True
+            except OSError:
+                pass
+        import shutil
+
+        shutil.copy2(source_path, tmp_path)
         return False
 
-    if os.path.exists(destination):
-        print("destination already exists: ", destination)
-        shutil.rmtree(destination)
+    return replace_with(dest_path, write)
+
+
+class HashingWriter():
+    """Writes text to a binary file as UTF-8 in large chunks, keeping the
+    hash and size of everything written."""
+
+    BUFFER = 1 << 16
+
+    def __init__(self, file):
+        self.file = file
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.parts = []
+        self.pending = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.pending >= self.BUFFER:
+            self.flush()
+
+    def flush(self):
+        data = "".join(self.parts).encode("utf-8")
+        self.parts = []
+        self.pending = 0
+        self.hash.update(data)
+        self.size += len(data)
+        self.file.write(data)
+
+    def record(self):
+        return {"hash": self.hash.hexdigest(), "size": self.size}
+
+
+def write_output_stream(path, fill, previous=None):
+    """Like write_output, for output too big to build as one string. fill is
+    called with a stream to write the text into, which always goes to a temp
+    file first; the temp file is dropped if path already held the same text."""
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            writer = HashingWriter(f)
+            fill(writer)
+            writer.flush()
+        record = writer.record()
+        if dest_size(path) == record["size"]:
+            if (previous and previous.get("hash") == record["hash"]) or hash_file(path) == record["hash"]:
+                os.remove(tmp_path)
+                return record, False
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return record, True
+
+
+def write_output(path, text, previous=None):
+    """Writes text to path as UTF-8 unless the file already holds exactly that.
 
-    print("making new destination: ", destination)
-    os.mkdir(destination)
+    previous is the {hash, size} record returned for path by an earlier call.
+    If it matches the new text and the file is still that size, the file is
+    not read; otherwise a file of the right size is hashed to compare.
+    Returns the record for the new text and whether the file was written."""
+    data = text.encode("utf-8")
+    record = {"hash": hashlib.sha256(data).hexdigest(), "size": len(data)}
+    if dest_size(path) == record["size"]:
+        if previous and previous.get("hash") == record["hash"]:
+            return record, False
+        if hash_file(path) == record["hash"]:
+            return record, False
 
-    print("Copying from source: ", source)
-    for f in os.listdir(source):
-        source_path = os.path.join(source, f)
-        dest_path = os.path.join(destination, f)
-        print(f"source_path: {source_path} {os.stat(source_path)}")
-        print(f"dest_path: {dest_path}")
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            f.write(data)
 
+    replace_with(path, write)
+    return record, True
 
-        if os.path.isfile(source_path):
-            print(f"{source_path} is a file")
-            print(f"Copied {f} to {shutil.copy(source_path, destination)}")
-        elif os.path.isdir(source_path):
-            print(f"{source_path} is a directory")
-            copy(source_path, dest_path)
-        else:
-            print(f"Something went wrong while copying {source_path}")
 
+def dest_size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
 
 
+def sync(source, destination, previous, current, checksum=False, link=False):
+    """Brings the copies of source's files in destination up to date.
 
+    previous and current map paths relative to source to fingerprint records;
+    current is filled in as the tree is walked. A file is only hashed when its
+    size or mtime changed, or always with checksum, and only copied when its
+    hash changed or the copy in destination is missing or the wrong size.
+    Files recorded in previous that are gone from source are removed from
+    destination. With link, files are reflinked or hardlinked where possible."""
+    report = SyncReport()
+    if os.path.isdir(source):
+        for rel_path in walk_files(source):
+            source_path = os.path.join(source, rel_path)
+            dest_path = os.path.join(destination, rel_path)
+            old = previous.get(rel_path)
+            record = fingerprint(source_path, None if checksum else old)
+            current[rel_path] = record
+            if old and old["hash"] == record["hash"] and dest_size(dest_path) == record["size"]:
+                report.unchanged.append(rel_path)
+            elif place(source_path, dest_path, link):
+                report.linked.append(rel_path)
+            else:
+                report.copied.append(rel_path)
 
+    for rel_path in previous:
+        if rel_path not in current:
+            remove(os.path.join(destination, rel_path), destination)
+            report.removed.append(rel_path)
+    return report
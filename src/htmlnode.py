@@ -1,50 +1,166 @@
+from lazyre import LazyPattern
+
+# An & that doesn't already start a character reference such as &amp; or &#169;.
+AMPERSAND_RE = LazyPattern(r"&(?!#?\w+;)")
+# Whitespace other than a lone space.
+WHITESPACE_RE = LazyPattern(r"[ \t\n\r\f\v]{2,}|[\t\n\r\f\v]")
+
+# Tags whose text keeps its whitespace when minified.
+PREFORMATTED = {"pre", "textarea"}
+# Elements of raw markup whose content keeps its whitespace when minified.
+VERBATIM_RE = LazyPattern(r"(?is)<(pre|textarea|script|style)\b.*?</\1\s*>")
+
+
+def escape_text(text):
+    """Escapes text for an element's content."""
+    if "&" in text:
+        text = AMPERSAND_RE.sub("&amp;", text)
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def minify_text(text):
+    """escape_text, with each run of whitespace collapsed to a single space."""
+    text = escape_text(text)
+    # Newlines and tabs aren't printable, so this skips the regex for text
+    # whose only whitespace is single spaces.
+    if "  " in text or not text.isprintable():
+        text = WHITESPACE_RE.sub(" ", text)
+    return text
+
+
+def minify_html(html):
+    """Collapses whitespace in markup the way minify_text does, except inside
+    elements such as pre and script, where it matters."""
+    parts = []
+    pos = 0
+    for m in VERBATIM_RE.finditer(html):
+        parts.append(WHITESPACE_RE.sub(" ", html[pos:m.start()]))
+        parts.append(m.group())
+        pos = m.end()
+    parts.append(WHITESPACE_RE.sub(" ", html[pos:]))
+    return "".join(parts)
+
+
+def escape_attribute(value):
+    return escape_text(value).replace('"', "&quot;")
+
+
+# How a build serializes its pages: a function that every text value passes
+# through, or None to write values as they are.
+OUTPUTS = {"raw": None, "escape": escape_text, "minify": minify_text}
+
+
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
-        self.props = props
+        self.props = props or None
+
+    def to_html(self, text=None):
+        parts = []
+        self.write(parts.append, text)
+        return "".join(parts)
 
-    def to_html(self):
+    def write_to(self, stream, text=None):
+        """Serializes the node into stream, anything with a write(str) method."""
+        self.write(stream.write, text)
+
+    def write(self, write, text=None):
+        """Passes the node's HTML to the write callable, one fragment at a
+        time. text is one of OUTPUTS: if it is set, text values go through
+        it and attribute values are escaped as they are written."""
         raise NotImplementedError
 
-    def props_to_html(self):
+    def props_to_html(self, text=None):
         if self.props is None:
             return ""
-        return "".join(f' {key}="{value}"' for (key, value) in self.props.items())
+        if text is None:
+            return "".join(f' {key}="{value}"' for (key, value) in self.props.items())
+        return "".join(f' {key}="{escape_attribute(value)}"' for (key, value) in self.props.items())
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-         super().__init__(tag, value, children=None, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props or None
 
-    def to_html(self):
+    def to_html(self, text=None):
         if self.value is None:
             raise ValueError("All leaf nodes must have a value.")
+        if text is None:
+            if self.tag is None:
+                return self.value
+            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
         if self.tag is None:
-            return self.value
+            return text(self.value)
+        if self.tag in PREFORMATTED:
+            text = escape_text
+        return f"<{self.tag}{self.props_to_html(text)}>{text(self.value)}</{self.tag}>"
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+    def write(self, write, text=None):
+        write(self.to_html(text))
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props or None
 
-    def to_html(self):
+    def write(self, write, text=None):
         if self.tag is None:
             raise ValueError("Parent nodes must have a tag")
         if len(self.children) == 0:
             raise ValueError("Parent nodes must have children")
 
-        return f"<{self.tag}{self.props_to_html()}>{''.join(child.to_html() for child in self.children)}</{self.tag}>"
+        write(f"<{self.tag}{self.props_to_html(text)}>")
+        if text is minify_text and self.tag in PREFORMATTED:
+            text = escape_text
+        for child in self.children:
+            child.write(write, text)
+        write(f"</{self.tag}>")
 
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
 
+
+class RawNode(HTMLNode):
+    """Markup that has already been serialized, written out as is."""
+
+    __slots__ = ()
+
+    def __init__(self, html):
+        self.tag = None
+        self.value = html
+        self.children = None
+        self.props = None
+
+    def to_html(self, text=None):
+        return self.value
+
+    def write(self, write, text=None):
+        write(self.value)
+
+    def __repr__(self):
+        return f"RawNode({self.value})"
@@ -0,0 +1,118 @@
+"""Single-pass scanner for inline markdown."""
+
+from lazyre import LazyPattern
+from textnode import TextNode, TextType
+
+SPECIAL_RE = LazyPattern(r"[`*_!\[]")
+IMAGE_RE = LazyPattern(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = LazyPattern(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+}
+
+
+def text_to_textnodes(text):
+    """Splits text into TextNodes in one left-to-right pass.
+
+    Code spans are taken literally. Bold, italic and link text are scanned
+    for nested markup; a node only gets children when there is some."""
+    nodes, _ = _scan(text, 0, None)
+    return nodes
+
+
+def _styled(text, text_type, children, url=None):
+    if not children or (len(children) == 1 and children[0].text_type == TextType.NORMAL):
+        return TextNode(text, text_type, url)
+    return TextNode(text, text_type, url, children=children)
+
+
+def _closes_before(text, start, end, closers):
+    """Whether one of closers occurs in text between start and end."""
+    return any(0 <= text.find(closer, start, end) for closer in closers)
+
+
+def _scan(text, pos, closer, outer=()):
+    """Scans text from pos until closer (or the end if closer is None).
+
+    Returns the nodes found and the position just past the closer. outer
+    holds the closers of the enclosing spans; if one of them comes first,
+    or the text ends inside a nested span, the nodes are None."""
+    enclosing = outer + (closer,) if closer is not None else outer
+    nodes = []
+    start = pos
+    while True:
+        m = SPECIAL_RE.search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        c = text[i]
+
+        if closer is not None and text.startswith(closer, i):
+            if start < i:
+                nodes.append(TextNode(text[start:i], TextType.NORMAL))
+            return nodes, i + len(closer)
+        if any(text.startswith(end, i) for end in outer):
+            return None, i
+
+        if c == "`":
+            end = text.find("`", i + 1)
+            if end == -1 or _closes_before(text, i + 1, end, enclosing):
+                if not enclosing:
+                    raise ValueError("Invalid markdown syntax. Uneven number of delimiters")
+                # An opener with no match inside the enclosing span is text.
+                pos = i + 1
+                continue
+            if start < i:
+                nodes.append(TextNode(text[start:i], TextType.NORMAL))
+            nodes.append(TextNode(text[i + 1:end], TextType.CODE))
+            pos = start = end + 1
+            continue
+
+        delimiter = "**" if text.startswith("**", i) else c
+        if delimiter in DELIMITERS:
+            inner_start = i + len(delimiter)
+            children, end = _scan(text, inner_start, delimiter, enclosing)
+            if children is None:
+                pos = inner_start
+                continue
+            if start < i:
+                nodes.append(TextNode(text[start:i], TextType.NORMAL))
+            nodes.append(_styled(text[inner_start:end - len(delimiter)], DELIMITERS[delimiter], children))
+            pos = start = end
+            continue
+
+        if c == "!":
+            m = IMAGE_RE.match(text, i)
+            if m is None:
+                pos = i + 1
+                continue
+            if start < i:
+                nodes.append(TextNode(text[start:i], TextType.NORMAL))
+            nodes.append(TextNode(m.group(1), TextType.IMAGE, m.group(2)))
+            pos = start = m.end()
+            continue
+
+        if c == "[":
+            m = LINK_RE.match(text, i)
+            if m is None:
+                pos = i + 1
+                continue
+            if start < i:
+                nodes.append(TextNode(text[start:i], TextType.NORMAL))
+            label = m.group(1)
+            children = _scan(label, 0, None)[0] if SPECIAL_RE.search(label) else None
+            nodes.append(_styled(label, TextType.LINK, children, m.group(2)))
+            pos = start = m.end()
+            continue
+
+        pos = i + 1
+
+    if outer:
+        return None, len(text)
+    if closer is not None:
+        raise ValueError("Invalid markdown syntax. Uneven number of delimiters")
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.NORMAL))
+    return nodes, len(text)
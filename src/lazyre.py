@@ -0,0 +1,21 @@
+"""Regexes that are compiled the first time they are used, not on import."""
+
+import re
+
+
+class LazyPattern():
+    """Stands in for re.compile(pattern, flags) until it is first used. The
+    compiled pattern's methods are then kept on the instance, so calling them
+    afterwards costs no more than calling them on the pattern itself."""
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+
+    def __getattr__(self, name):
+        value = getattr(re.compile(self.pattern, self.flags), name)
+        setattr(self, name, value)
+        return value
+
+    def __repr__(self):
+        return f"LazyPattern({self.pattern!r})"
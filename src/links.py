@@ -0,0 +1,141 @@
+"""The site's link graph: what every page links to, and what that points at.
+
+Links and images are recorded while pages are parsed and kept in the build
+manifest, so the graph covers the whole site even when a build only
+regenerates a few pages."""
+
+import posixpath
+from urllib.parse import unquote, urlsplit
+
+
+class References():
+    """The urls of the links and images found while rendering some markdown."""
+
+    __slots__ = ("links", "images")
+
+    def __init__(self, links=None, images=None):
+        self.links = links if links is not None else []
+        self.images = images if images is not None else []
+
+    def extend(self, other):
+        self.links.extend(other.links)
+        self.images.extend(other.images)
+
+
+class LinkReport():
+    def __init__(self):
+        self.broken = []
+        self.missing = []
+        self.orphans = []
+
+    def __repr__(self):
+        return f"LinkReport(broken={len(self.broken)}, missing={len(self.missing)}, orphans={len(self.orphans)})"
+
+
+def is_internal(url):
+    """Whether url points into the site, rather than elsewhere or at a fragment of the same page."""
+    parts = urlsplit(url)
+    return not parts.scheme and not parts.netloc and bool(parts.path)
+
+
+def page_url(dest):
+    """The url a page is served at, given its output path."""
+    if dest == "index.html" or dest.endswith("/index.html"):
+        return "/" + dest[:-len("index.html")]
+    return "/" + dest
+
+
+class LinkIndex():
+    def __init__(self, pages, static=(), listings=()):
+        """pages maps each page's source path to its manifest record, which
+        has its output path as "dest" and its urls as "links" and "images".
+        static holds the paths of the static files in the output, and
+        listings those of the files made from the site index, or maps them
+        to their manifest records, whose "links" count as links to pages."""
+        self.pages = pages
+        self.by_dest = {record["dest"]: page for page, record in pages.items()}
+        self.static = set(static)
+        self.listings = listings if isinstance(listings, dict) else {}
+        self.outputs = self.static | self.by_dest.keys() | set(listings)
+
+    def find(self, url, page):
+        """Returns the output path an internal url on page points at, or None
+        if nothing in the site matches it."""
+        return self.resolve(url, self.pages[page]["dest"])
+
+    def resolve(self, url, dest):
+        """find for a url in the output at dest, which needn't be a page."""
+        path = unquote(urlsplit(url).path)
+        if not path.startswith("/"):
+            base = page_url(dest)
+            path = posixpath.join(posixpath.dirname(base), path)
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path).lstrip("/")
+        if path in ("", "."):
+            candidates = ["index.html"]
+        elif trailing:
+            candidates = [path + "/index.html"]
+        else:
+            candidates = [path, path + "/index.html", path + ".html"]
+        for candidate in candidates:
+            if candidate in self.outputs:
+                return candidate
+        return None
+
+    def assets(self, page):
+        """Returns the static files page links to or shows, in sorted order."""
+        record = self.pages[page]
+        found = set()
+        for url in record.get("links", []) + record.get("images", []):
+            if is_internal(url):
+                target = self.find(url, page)
+                if target in self.static:
+                    found.add(target)
+        return sorted(found)
+
+    def check(self):
+        """Finds broken internal links, images missing from the site and
+        pages nothing links to, in one pass over every page's urls. Links
+        from listing pages count too, so a page only they list isn't an
+        orphan. The site's front page is never an orphan."""
+        report = LinkReport()
+        linked = set()
+        for page in sorted(self.pages):
+            record = self.pages[page]
+            for url in record.get("links", ()):
+                if not is_internal(url):
+                    continue
+                target = self.find(url, page)
+                if target is None:
+                    report.broken.append((page, url))
+                elif target in self.by_dest and self.by_dest[target] != page:
+                    linked.add(self.by_dest[target])
+            for url in record.get("images", ()):
+                if is_internal(url) and self.find(url, page) is None:
+                    report.missing.append((page, url))
+        for dest, record in self.listings.items():
+            for url in record.get("links", ()):
+                target = self.resolve(url, dest)
+                if target in self.by_dest:
+                    linked.add(self.by_dest[target])
+        report.orphans = [
+            page for page in sorted(self.pages)
+            if page not in linked and self.pages[page]["dest"] != "index.html"
+        ]
+        return report
+
+    def linking_to(self, dests):
+        """Returns {dest: [pages]} for the pages with a link that would
+        resolve to each output path in dests, were it still in the site."""
+        dests = set(dests)
+        found = {}
+        if not dests:
+            return found
+        index = LinkIndex(self.pages, dests)
+        for page in sorted(self.pages):
+            for url in self.pages[page].get("links", ()):
+                if is_internal(url):
+                    target = index.find(url, page)
+                    if target in dests and page not in found.setdefault(target, []):
+                        found[target].append(page)
+        return found
@@ -0,0 +1,234 @@
+"""Files made from the site index rather than from content: a sitemap, RSS
+feeds and paginated listings of a directory's pages.
+
+They are written in one pass from the titles and front matter the build
+indexed, without reading a rendered page. Each one's manifest record holds
+a digest of everything it was made from, so it is only written again when
+pages are added or removed or their metadata changes."""
+
+import hashlib
+import html
+import json
+import posixpath
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from htmlnode import LeafNode, ParentNode
+from links import page_url
+from template import load_template, rewrite_url
+
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+class Listings():
+    def __init__(self, url=None, feeds=(), sections=(), per_page=10, feed_items=20):
+        """url is the scheme and host the site is served from, such as
+        https://example.com, which a sitemap and feeds need for absolute
+        links; without it neither is made. feeds and sections are
+        directories of the content: each feed gets an RSS feed.xml of its
+        newest feed_items pages, and each section listings of all its
+        pages, per_page to a listing."""
+        if feeds and not url:
+            raise ValueError("feeds need the site's url")
+        if per_page < 1:
+            raise ValueError("a listing needs room for at least one page")
+        self.url = url.rstrip("/") if url else None
+        self.feeds = [normalize(section) for section in feeds]
+        self.sections = [normalize(section) for section in sections]
+        self.per_page = per_page
+        self.feed_items = feed_items
+
+    def __repr__(self):
+        return f"Listings({self.url}, feeds={self.feeds}, sections={self.sections})"
+
+
+def normalize(section):
+    section = posixpath.normpath(section.strip("/"))
+    return "" if section == "." else section
+
+
+def page_link(basepath, path):
+    """The url of the page built from the source at path, as a link to it is written."""
+    return rewrite_url(page_url(path[:-len(".md")] + ".html"), basepath)
+
+
+def parse_date(text):
+    """The date or time in text, in UTC unless it says otherwise, or None if it isn't ISO 8601."""
+    try:
+        date = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
+def xml(text):
+    return html.escape(text, quote=False)
+
+
+def entry(page, basepath):
+    """What a listing shows of a page, as JSON for the digest."""
+    description = page.fields.get("description")
+    return {
+        "url": page_link(basepath, page.path),
+        "title": page.title or page.path,
+        "date": page.date if parse_date(page.date) else None,
+        "description": description if isinstance(description, str) else None,
+    }
+
+
+def section_pages(index, section):
+    """The pages under section, newest first, leaving out its own index
+    page. Pages without a date that parses come last, in path order."""
+    prefix = section + "/" if section else ""
+    own = prefix + "index.md"
+    pages = [page for page in index.pages.values() if page.path.startswith(prefix) and page.path != own]
+    undated = sorted((page for page in pages if not parse_date(page.date)), key=lambda page: page.path)
+    return index.by_date([page for page in pages if parse_date(page.date)]) + undated
+
+
+def section_title(index, section):
+    own = posixpath.join(section, "index.md")
+    if own in index and index[own].title:
+        return index[own].title
+    return posixpath.basename(section).capitalize() or "Home"
+
+
+class Output():
+    """A file made from the site index. data holds everything it is made
+    from, so its digest changes exactly when the file would. links holds
+    the urls of the pages it links to, before the basepath is added, as a
+    page's links are recorded."""
+
+    def __init__(self, dest, data, links=()):
+        self.dest = dest
+        self.data = data
+        self.links = list(links)
+
+    @property
+    def digest(self):
+        return hashlib.sha256(json.dumps(self.data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def write_to(self, stream, text=None):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.dest})"
+
+
+class Sitemap(Output):
+    def write_to(self, stream, text=None):
+        url = self.data["url"]
+        stream.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        for entry in self.data["entries"]:
+            stream.write(f"<url><loc>{xml(url + entry['url'])}</loc>")
+            if entry["date"]:
+                stream.write(f"<lastmod>{xml(entry['date'])}</lastmod>")
+            stream.write("</url>\n")
+        stream.write("</urlset>\n")
+
+
+class Feed(Output):
+    def write_to(self, stream, text=None):
+        url = self.data["url"]
+        title = xml(self.data["title"])
+        stream.write('<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>\n')
+        stream.write(f"<title>{title}</title><link>{xml(url + self.data['link'])}</link><description>{title}</description>\n")
+        for entry in self.data["entries"]:
+            link = xml(url + entry["url"])
+            stream.write(f"<item><title>{xml(entry['title'])}</title><link>{link}</link><guid>{link}</guid>")
+            if entry["date"]:
+                stream.write(f"<pubDate>{format_datetime(parse_date(entry['date']))}</pubDate>")
+            if entry["description"]:
+                stream.write(f"<description>{xml(entry['description'])}</description>")
+            stream.write("</item>\n")
+        stream.write("</channel></rss>\n")
+
+
+class ListingPage(Output):
+    """One page of a section's listing, filled into the section's template.
+    The build sets template and the assets.AssetTable it is filled with, if
+    any, and adds the template's hashes and the hashed names of the static
+    files it points at to data."""
+
+    def __init__(self, dest, data, section, links=()):
+        super().__init__(dest, data, links)
+        self.section = section
+        self.template = None
+        self.assets = None
+
+    def content(self):
+        children = [LeafNode("h1", self.data["title"])]
+        items = []
+        for entry in self.data["entries"]:
+            item = [LeafNode("a", entry["title"], {"href": entry["url"]})]
+            if entry["date"]:
+                item.append(LeafNode(None, " "))
+                item.append(LeafNode("time", entry["date"][:10], {"datetime": entry["date"]}))
+            items.append(ParentNode("li", item))
+        if items:
+            children.append(ParentNode("ul", items))
+        nav = []
+        if self.data["newer"]:
+            nav.append(LeafNode("a", "Newer", {"href": self.data["newer"], "rel": "prev"}))
+        if self.data["older"]:
+            nav.append(LeafNode("a", "Older", {"href": self.data["older"], "rel": "next"}))
+        if nav:
+            children.append(ParentNode("nav", nav))
+        return ParentNode("div", children)
+
+    def write_to(self, stream, text=None):
+        template = load_template(self.template, self.data["basepath"], self.assets)
+        template.write_to(stream, {"Title": self.data["title"], "Content": self.content()}, text)
+
+
+def listing_dests(index, section, count):
+    """Where each of a section's count listings goes: the first in place of
+    the section's index page, unless it has one, and the rest under page/."""
+    first = posixpath.join(section, "index.html")
+    pages = [posixpath.join(section, "page", str(n), "index.html") for n in range(1, count + 1)]
+    if posixpath.join(section, "index.md") not in index:
+        pages[0] = first
+    return pages
+
+
+def outputs(listings, index, basepath, output="raw"):
+    """Returns every Output listings makes from index, a meta.SiteIndex,
+    for a site served from basepath and serialized with output."""
+    made = []
+    for section in listings.feeds:
+        entries = [entry(page, basepath) for page in section_pages(index, section)[:listings.feed_items]]
+        made.append(Feed(posixpath.join(section, FEED_NAME), {
+            "url": listings.url,
+            "title": section_title(index, section),
+            "link": rewrite_url(page_url(posixpath.join(section, "index.html")), basepath),
+            "entries": entries,
+        }))
+    for section in listings.sections:
+        pages = section_pages(index, section)
+        entries = [entry(page, basepath) for page in pages]
+        chunks = [entries[i:i + listings.per_page] for i in range(0, len(entries), listings.per_page)] or [[]]
+        dests = listing_dests(index, section, len(chunks))
+        urls = [page_url(dest) for dest in dests]
+        links = [rewrite_url(url, basepath) for url in urls]
+        page_urls = [page_url(page.path[:-len(".md")] + ".html") for page in pages]
+        for n, chunk in enumerate(chunks):
+            start = n * listings.per_page
+            nav = [urls[i] for i in (n - 1, n + 1) if 0 <= i < len(urls)]
+            made.append(ListingPage(dests[n], {
+                "basepath": basepath,
+                "output": output,
+                "title": section_title(index, section),
+                "entries": chunk,
+                "newer": links[n - 1] if n > 0 else None,
+                "older": links[n + 1] if n + 1 < len(chunks) else None,
+            }, section, page_urls[start:start + listings.per_page] + nav))
+    if listings.url:
+        entries = [entry(page, basepath) for page in index.pages.values()]
+        for listing in made:
+            if isinstance(listing, ListingPage):
+                entries.append({"url": rewrite_url(page_url(listing.dest), basepath), "date": None})
+        entries.sort(key=lambda entry: entry["url"])
+        made.append(Sitemap(SITEMAP_NAME, {"url": listings.url, "entries": entries}))
+    return made
@@ -1,19 +1,270 @@
-import convert
-import fileio
-import fileutil
+import argparse
 import os
 import sys
-import textnode
+import time
 
 
 def main():
-    print(os.getcwd())
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    if len(sys.argv) > 1 and sys.argv[1] == "watch":
+        watch(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "merge":
+        merge(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "page":
+        page(sys.argv[2:])
     else:
-        basepath = "/"
-    fileio.copy("static", "docs")
-    convert.generate_pages_recursive(basepath, "content", "template.html", "docs")
+        build_site(sys.argv[1:])
 
-main()
+
+def start_logging(quiet=False, verbose=False):
+    """Sets up logging for a subcommand and returns main's logger. logging
+    is only imported here, so the page subcommand never loads it."""
+    import logging
+
+    level = logging.DEBUG if verbose else logging.ERROR if quiet else logging.INFO
+    logging.basicConfig(level=level, format="%(message)s")
+    return logging.getLogger("main")
+
+
+def watch(argv):
+    import watch
+
+    parser = argparse.ArgumentParser(prog="main.py watch", description="Serve docs/ and rebuild it whenever a source changes.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("-p", "--port", type=int, default=8888)
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes to render pages on, 0 for one per CPU")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+    start_logging(args.quiet)
+
+    # docs/ is always the watcher's output, so it may be replaced.
+    watcher = watch.Watcher(args.basepath, "content", "template.html", "static", "docs", jobs=jobs, force=True)
+    try:
+        watcher.run(args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+def check_links(report):
+    """Logs the link check of report's site. Returns True if links are broken or images missing."""
+    import logging
+
+    log = logging.getLogger("main")
+    links = report.links.check()
+    for page, url in links.broken:
+        log.error("broken link: %s: %s", page, url)
+    for page, url in links.missing:
+        log.error("missing image: %s: %s", page, url)
+    for page in links.orphans:
+        log.warning("orphan page: %s", page)
+    log.info("%s", links)
+    return bool(links.broken or links.missing)
+
+
+def log_summary(report, path):
+    import json
+    import logging
+
+    log = logging.getLogger("main")
+
+    summary = report.summary()
+    log.info("%d written, %d skipped, %d deleted", len(summary["written"]), len(summary["skipped"]), len(summary["deleted"]))
+    if path:
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=1)
+
+
+def merge(argv):
+    import build
+    import shard
+
+    parser = argparse.ArgumentParser(prog="main.py merge", description="Combine the output of every shard of a build into docs/.")
+    parser.add_argument("shards", nargs="+", metavar="DIR", help="the --dest of each shard's build")
+    parser.add_argument("--dest", default="docs", metavar="DIR", help="where to merge them (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="delete --dest before merging if it holds files but no manifest from an earlier build")
+    parser.add_argument("--link", action="store_true",
+                        help="reflink or hardlink files from the shards instead of copying them")
+    parser.add_argument("--check-links", action="store_true",
+                        help="check the merged site's links, failing if any are broken")
+    parser.add_argument("--summary", metavar="PATH",
+                        help="write the files written, skipped and deleted to PATH as JSON")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+    args = parser.parse_args(argv)
+    log = start_logging(args.quiet)
+
+    try:
+        report = shard.merge(args.shards, args.dest, link=args.link, force=args.force)
+    except shard.MergeError as e:
+        for problem in e.problems:
+            log.error("error: %s", problem)
+        sys.exit(1)
+    except build.DestError as e:
+        log.error("error: %s", e)
+        sys.exit(1)
+    broken = check_links(report) if args.check_links else False
+    log_summary(report, args.summary)
+    if broken:
+        sys.exit(1)
+
+
+def page(argv):
+    import convert
+    from htmlnode import OUTPUTS
+    from template import find_template
+
+    parser = argparse.ArgumentParser(prog="main.py page", description="Render a single page, to preview it without building the site.")
+    parser.add_argument("source", help="the page's markdown file")
+    parser.add_argument("dest", help="where to write its HTML")
+    parser.add_argument("-b", "--basepath", default="/")
+    parser.add_argument("--output", choices=["raw", "escape", "minify"], default="raw",
+                        help="serialize the page as main.py --output would (default: %(default)s)")
+    args = parser.parse_args(argv)
+    convert.serialize_text = OUTPUTS[args.output]
+
+    rel_dir = os.path.dirname(os.path.relpath(args.source, "content"))
+    if rel_dir.split(os.sep)[0] == os.pardir:
+        template_path = "template.html"
+    else:
+        template_path = find_template("content", rel_dir, "template.html")
+    try:
+        convert.generate_page(args.basepath, args.source, template_path, args.dest)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+
+
+def build_site(argv):
+    import build
+
+    parser = argparse.ArgumentParser(description="Build the site from content/ into docs/.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes to render pages on, 0 for one per CPU")
+    parser.add_argument("--io-threads", type=int, default=0, metavar="N",
+                        help="read and write pages on N threads while rendering, for slow disks; needs -j 1")
+    parser.add_argument("--checksum", action="store_true",
+                        help="hash every static file instead of trusting unchanged sizes and mtimes")
+    parser.add_argument("--link", action="store_true",
+                        help="reflink or hardlink static files into docs/ instead of copying them")
+    parser.add_argument("--block-cache", type=int, default=0, metavar="N",
+                        help="memoize up to N rendered blocks per process, 0 to turn the cache off")
+    parser.add_argument("--block-cache-dir", metavar="DIR",
+                        help="also keep rendered blocks on disk in DIR, shared between workers and builds")
+    parser.add_argument("--page-cache-dir", metavar="DIR",
+                        help="keep every rendered page on disk in DIR, so a template change doesn't reparse them")
+    parser.add_argument("--page-cache-size", type=int, default=256, metavar="MIB",
+                        help="how much the page cache may hold (default: %(default)s MiB)")
+    parser.add_argument("--output", choices=["raw", "escape", "minify"], default="raw",
+                        help="write text as it is, escape text and attributes, or escape them and collapse whitespace "
+                             "(default: %(default)s)")
+    parser.add_argument("--gzip", action="store_true",
+                        help="keep a precompressed .gz next to every HTML and text-like static file")
+    parser.add_argument("--gzip-level", type=int, default=9, choices=range(1, 10), metavar="1-9",
+                        help="--gzip compression level (default: %(default)s)")
+    parser.add_argument("--gzip-min-size", type=int, default=256, metavar="BYTES",
+                        help="don't compress files smaller than this (default: %(default)s)")
+    parser.add_argument("--hash-assets", action="store_true",
+                        help="also write static files under names holding their hash, point pages at those, "
+                             "and give images their width and height")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="the scheme and host the site is served from, to write a sitemap.xml with")
+    parser.add_argument("--feed", action="append", default=[], metavar="DIR",
+                        help="write an RSS feed of the newest pages under DIR to DIR/feed.xml; needs --site-url")
+    parser.add_argument("--listing", action="append", default=[], metavar="DIR",
+                        help="write pages listing every page under DIR, newest first")
+    parser.add_argument("--per-page", type=int, default=10, metavar="N",
+                        help="how many pages each --listing page lists (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each build phase and print a summary")
+    parser.add_argument("--profile-json", default="profile.json", metavar="PATH",
+                        help="where --profile writes its measurements (default: %(default)s)")
+    parser.add_argument("--check-links", action="store_true",
+                        help="report broken internal links, missing images and orphan pages, failing on the first two")
+    parser.add_argument("--summary", metavar="PATH",
+                        help="write the files written, skipped and deleted in docs/ to PATH as JSON")
+    parser.add_argument("--dest", default="docs", metavar="DIR", help="where to build the site (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="delete --dest before building if it holds files but no manifest from an earlier build")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="only build the I-th of N shares of the pages, for main.py merge to combine")
+    parser.add_argument("--shard-by-size", action="store_true",
+                        help="balance --shard by the size of the pages rather than their number")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every file that is written")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+    if args.io_threads and jobs > 1:
+        parser.error("--io-threads only works with -j 1")
+    shard = None
+    if args.shard:
+        import shard as sharding
+        try:
+            shard = sharding.Shard.parse(args.shard, args.shard_by_size)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.check_links:
+            parser.error("a shard only has some of the pages; use --check-links with main.py merge")
+    listings = None
+    if args.site_url or args.feed or args.listing:
+        import listing
+        try:
+            listings = listing.Listings(args.site_url, args.feed, args.listing, args.per_page)
+        except ValueError as e:
+            parser.error(str(e))
+    log = start_logging(args.quiet, args.verbose)
+
+    profiler = None
+    if args.profile:
+        import timing
+        profiler = timing.enable()
+
+    block_cache = None
+    if args.block_cache or args.block_cache_dir:
+        path = os.path.join(args.block_cache_dir, "blocks.sqlite") if args.block_cache_dir else None
+        block_cache = (args.block_cache or 10000, path)
+    page_cache = None
+    if args.page_cache_dir:
+        page_cache = (os.path.join(args.page_cache_dir, "pages.sqlite"), args.page_cache_size << 20)
+
+    start = time.perf_counter()
+    try:
+        report = build.build(args.basepath, "content", "template.html", "static", args.dest,
+                             jobs=jobs, checksum=args.checksum, link=args.link, block_cache=block_cache,
+                             io_threads=args.io_threads, shard=shard, page_cache=page_cache,
+                             output=args.output, gzip=(args.gzip_level, args.gzip_min_size) if args.gzip else None,
+                             listings=listings, hash_assets=args.hash_assets, force=args.force)
+    except build.DestError as e:
+        log.error("error: %s", e)
+        sys.exit(1)
+    wall = time.perf_counter() - start
+
+    for action, path in report.static.changes():
+        log.debug("%s %s", action, path)
+    for path in report.generated:
+        log.debug("generated %s", path)
+    for path in report.listings:
+        log.debug("listed %s", path)
+    for error in report.errors:
+        log.error("error: %s", error)
+    for dest, pages in report.dangling.items():
+        log.warning("warning: removed %s is still linked from %s", dest, ", ".join(pages))
+    broken = check_links(report) if args.check_links else False
+    log.info("%s", report)
+    log_summary(report, args.summary)
+    if block_cache is not None:
+        log.info("block cache: %d hits, %d misses", report.cache_hits, report.cache_misses)
+    if args.gzip:
+        log.info("%d files compressed", len(report.compressed))
+    if page_cache is not None:
+        log.info("page cache: %d hits, %d misses", report.page_cache_hits, report.page_cache_misses)
+    if profiler is not None:
+        timing.write_json(args.profile_json, profiler.to_json(wall))
+        log.info("%s", profiler.summary(wall))
+    if report.errors or broken:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
 
@@ -0,0 +1,72 @@
+"""Persistent record of build inputs, used to decide what needs rebuilding."""
+
+import hashlib
+import json
+import os
+
+# Manifests are kept next to the output directory rather than in it, so
+# they are never deployed or served with the site.
+STATE_DIR = ".ssg-state"
+VERSION = 1
+
+
+def manifest_path(dest_dir):
+    """Where the manifest of the build in dest_dir is kept: in STATE_DIR
+    beside dest_dir, named after it."""
+    parent, name = os.path.split(os.path.abspath(dest_dir))
+    return os.path.join(parent, STATE_DIR, name + ".manifest.json")
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(path, previous=None):
+    """Returns a {size, mtime_ns, hash} record for path.
+
+    The file is only re-hashed when its size or mtime differ from the
+    previous record, so unchanged files cost a single stat."""
+    st = os.stat(path)
+    if previous and previous.get("hash") and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": previous["hash"]}
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": hash_file(path)}
+
+
+class Manifest():
+    def __init__(self, path, config=None, pages=None, static=None, listings=None):
+        self.path = path
+        self.config = config if config is not None else {}
+        self.pages = pages if pages is not None else {}
+        self.static = static if static is not None else {}
+        self.listings = listings if listings is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """Reads the manifest at path, or returns None if there isn't a usable one."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            return None
+        return cls(path, data.get("config"), data.get("pages"), data.get("static"), data.get("listings"))
+
+    def save(self):
+        data = {
+            "version": VERSION,
+            "config": self.config,
+            "pages": self.pages,
+            "static": self.static,
+            "listings": self.listings,
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        # json.dumps without indent uses the C encoder; json.dump never does.
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(data, sort_keys=True, separators=(",", ":")))
+        os.replace(tmp_path, self.path)
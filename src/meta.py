@@ -0,0 +1,173 @@
+"""Page metadata, read from the top of each source without parsing the page.
+
+A page may open with a front matter block of "key: value" lines between
+two --- lines, before its title:
+
+    ---
+    date: 2024-05-01
+    tags: [elves, heroes]
+    ---
+    # Why Glorfindel is More Impressive than Legolas
+
+Values in brackets are lists and quotes around a value are dropped. Every
+other value is kept as the string it is; dates are expected in ISO form, so
+they sort as strings."""
+
+import itertools
+import os
+
+FENCE = "---"
+
+# How many lines a front matter block may run to. A --- line followed by
+# no closing --- within this many lines is just a line of the page.
+MAX_FRONT_MATTER = 100
+
+
+class PageMeta():
+    __slots__ = ("path", "title", "fields")
+
+    def __init__(self, path, title=None, fields=None):
+        self.path = path
+        self.title = title
+        self.fields = fields or {}
+
+    @property
+    def date(self):
+        return self.fields.get("date")
+
+    @property
+    def tags(self):
+        tags = self.fields.get("tags", [])
+        return tags if isinstance(tags, list) else [tags]
+
+    def to_json(self):
+        return {"title": self.title, "fields": self.fields}
+
+    @classmethod
+    def from_json(cls, path, data):
+        return cls(path, data["title"], data["fields"])
+
+    def __eq__(self, other):
+        return isinstance(other, PageMeta) and (self.path, self.title, self.fields) == (other.path, other.title, other.fields)
+
+    def __repr__(self):
+        return f"PageMeta({self.path}, {self.title!r}, {self.fields})"
+
+
+def parse_value(text):
+    text = text.strip()
+    if text.startswith("[") and text.endswith("]"):
+        return [parse_value(item) for item in text[1:-1].split(",") if item.strip()]
+    if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+
+def parse_fields(lines):
+    fields = {}
+    for line in lines:
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            fields[key.strip()] = parse_value(value)
+    return fields
+
+
+def read_front_matter(lines):
+    """Reads a front matter block from the start of lines, an iterator of
+    lines without their line endings. Returns its fields, or None if the
+    page has none, an iterator of the lines that follow it, and how many
+    lines were read for it. Blank lines after the block go with it."""
+    first = next(lines, None)
+    if first is None or first.rstrip() != FENCE:
+        return None, itertools.chain([first] if first is not None else [], lines), 0
+    head = []
+    for line in lines:
+        if line.rstrip() == FENCE:
+            read = len(head) + 2
+            for line in lines:
+                if line.strip():
+                    return parse_fields(head), itertools.chain([line], lines), read
+                read += 1
+            return parse_fields(head), iter(()), read
+        head.append(line)
+        if len(head) > MAX_FRONT_MATTER:
+            break
+    return None, itertools.chain([first], head, lines), 0
+
+
+def split_front_matter(markdown):
+    """Like read_front_matter, for a whole page. Returns the fields, or None,
+    and the markdown that follows the block."""
+    pos = markdown.find("\n") + 1
+    if pos == 0 or markdown[:pos].rstrip() != FENCE:
+        return None, markdown
+    head = []
+    while len(head) <= MAX_FRONT_MATTER:
+        end = markdown.find("\n", pos)
+        line = markdown[pos:] if end == -1 else markdown[pos:end]
+        if line.rstrip() == FENCE:
+            body = len(markdown) if end == -1 else end + 1
+            while body < len(markdown):
+                end = markdown.find("\n", body)
+                if end == -1:
+                    end = len(markdown)
+                if markdown[body:end].strip():
+                    break
+                body = end + 1
+            return parse_fields(head), markdown[body:]
+        if end == -1:
+            break
+        head.append(line)
+        pos = end + 1
+    return None, markdown
+
+
+def read_title(lines):
+    """The title in the first of lines, as convert.extract_title reads it, or None."""
+    first = next(lines, "")
+    return first[2:].strip() if first.startswith("#") else None
+
+
+def scan(content_dir, rel_path):
+    """Reads the metadata of the page at rel_path in content_dir, reading no
+    further into the file than its title."""
+    with open(os.path.join(content_dir, rel_path), encoding="utf-8") as f:
+        fields, lines, _ = read_front_matter(line.rstrip("\r\n") for line in f)
+        title = read_title(lines)
+    fields = fields or {}
+    return PageMeta(rel_path, fields.get("title", title), fields)
+
+
+class SiteIndex():
+    """The metadata of every page in the site, by source path."""
+
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+
+    def add(self, meta):
+        self.pages[meta.path] = meta
+
+    def __getitem__(self, path):
+        return self.pages[path]
+
+    def __contains__(self, path):
+        return path in self.pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def by_date(self, pages=None):
+        """Returns pages, or else every page, newest first. Undated pages
+        come last, in path order."""
+        pages = self.pages.values() if pages is None else pages
+        dated = sorted((page for page in pages if page.date), key=lambda page: (page.date, page.path), reverse=True)
+        undated = sorted((page for page in pages if not page.date), key=lambda page: page.path)
+        return dated + undated
+
+    def tags(self):
+        """Returns {tag: [pages]} with each tag's pages newest first."""
+        tagged = {}
+        for page in self.pages.values():
+            for tag in page.tags:
+                tagged.setdefault(tag, []).append(page)
+        return {tag: self.by_date(pages) for tag, pages in sorted(tagged.items())}
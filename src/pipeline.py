@@ -0,0 +1,105 @@
+"""Renders pages with their reads and writes overlapped on I/O threads.
+
+Meant for build volumes where file I/O latency, not rendering, dominates:
+sources are read ahead of the page being rendered and finished pages are
+queued for writing behind it, with bounded queues so memory stays flat."""
+
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import convert
+import fileio
+from links import References
+from template import load_template
+
+
+class Directories():
+    """Creates each output directory once, however many pages it holds."""
+
+    def __init__(self):
+        self.made = set()
+        self.lock = threading.Lock()
+
+    def ensure(self, path):
+        if path in self.made:
+            return
+        with self.lock:
+            if path not in self.made:
+                os.makedirs(path, exist_ok=True)
+                self.made.add(path)
+
+
+def render_page(basepath, source_path, markdown, template, refs):
+    """Returns the finished HTML for one page, adding the urls it links to to refs."""
+    values = convert.page_values(markdown, basepath, refs)
+    out = io.StringIO()
+    template.write_to(out, values, convert.serialize_text)
+    return out.getvalue()
+
+
+def read_page(path):
+    """Reads a source ahead of rendering, unless it is big enough that
+    convert.generate_page would stream it. Returns None then."""
+    if os.path.getsize(path) > convert.STREAM_SIZE:
+        return None
+    return convert.read_source(path)
+
+
+def write_output(directories, dest_path, html, previous):
+    directories.ensure(os.path.dirname(dest_path))
+    return fileio.write_output(dest_path, html, previous)
+
+
+def render_pages(basepath, pages, threads=4, inflight=16, done=None):
+    """Generates each (source_path, template_path, dest_path, previous) page
+    in pages, rendering on this thread while threads I/O threads read and write.
+
+    At most inflight sources are read ahead and at most inflight rendered
+    pages wait to be written. Sources too big to read whole are streamed by
+    convert.generate_page on this thread instead. done, if given, is called
+    on this thread with the index and result of each page once it is
+    written. Returns the results of generate_page and the
+    exceptions raised, each with one entry per page, or None, in order."""
+    results = [None] * len(pages)
+    errors = [None] * len(pages)
+    directories = Directories()
+    write_slots = threading.BoundedSemaphore(inflight)
+
+    def finish(i, write, refs):
+        errors[i] = write.exception()
+        if errors[i] is None:
+            results[i] = convert.page_result(*write.result(), refs)
+            if done is not None:
+                done(i, results[i])
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="io") as executor:
+        reads = deque()
+        writes = deque()
+        for i, (source_path, template_path, dest_path, previous) in enumerate(pages):
+            while len(reads) < inflight and i + len(reads) < len(pages):
+                reads.append(executor.submit(read_page, pages[i + len(reads)][0]))
+            refs = References()
+            try:
+                markdown = reads.popleft().result()
+                if markdown is None:
+                    results[i] = convert.generate_page(basepath, source_path, template_path, dest_path, previous)
+                    if done is not None:
+                        done(i, results[i])
+                    continue
+                template = load_template(template_path, basepath, convert.asset_table)
+                html = render_page(basepath, source_path, markdown, template, refs)
+            except Exception as e:
+                errors[i] = e
+                continue
+            write_slots.acquire()
+            write = executor.submit(write_output, directories, dest_path, html, previous)
+            write.add_done_callback(lambda _: write_slots.release())
+            writes.append((i, write, refs))
+            while writes and writes[0][1].done():
+                finish(*writes.popleft())
+        while writes:
+            finish(*writes.popleft())
+    return results, errors
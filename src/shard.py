@@ -0,0 +1,233 @@
+"""Splitting a build into shards that can run anywhere, and merging them.
+
+Every shard sees the same content, so each one can work out on its own which
+pages are its share; nothing has to coordinate them. A shard's manifest
+records what it was asked to build, which lets merge() check that the
+shards it is given add up to the whole site."""
+
+import hashlib
+import os
+
+import build
+import compress
+import fileio
+from links import LinkIndex
+from manifest import Manifest, manifest_path
+
+
+class MergeError(ValueError):
+    def __init__(self, problems):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def stable_hash(path):
+    """A hash of path that is the same on every machine and Python run."""
+    return int.from_bytes(hashlib.sha1(path.encode("utf-8")).digest()[:8], "big")
+
+
+def hashes(records):
+    """Strips fingerprint records down to their hashes, which unlike mtimes
+    are the same on every machine."""
+    return {path: record.get("hash") for path, record in records.items()}
+
+
+def pages_digest(pages):
+    return hashlib.sha256("\n".join(sorted(pages)).encode("utf-8")).hexdigest()
+
+
+class Shard():
+    def __init__(self, index, count, weighted=False):
+        """Shard index of count, numbered from 1. With weighted, pages are
+        balanced by size rather than number."""
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"shard {index}/{count} doesn't exist")
+        self.index = index
+        self.count = count
+        self.weighted = weighted
+
+    @classmethod
+    def parse(cls, text, weighted=False):
+        """Parses "i/N"."""
+        index, sep, count = text.partition("/")
+        if not sep or not index.isdigit() or not count.isdigit():
+            raise ValueError(f"expected a shard like 1/4, not {text!r}")
+        return cls(int(index), int(count), weighted)
+
+    def assign(self, pages, sizes=None):
+        """Returns {page: shard index} for every page.
+
+        Unweighted, each page goes to a shard picked by a stable hash of its
+        path, so it stays there as other pages come and go. Weighted, pages
+        are dealt largest first to the shard with the fewest bytes so far,
+        which balances the work but can move pages when sizes change."""
+        if not self.weighted:
+            return {page: stable_hash(page) % self.count + 1 for page in pages}
+        loads = [0] * self.count
+        assigned = {}
+        for page in sorted(pages, key=lambda page: (-sizes[page], stable_hash(page), page)):
+            shard = min(range(self.count), key=lambda i: (loads[i], i))
+            loads[shard] += sizes[page]
+            assigned[page] = shard + 1
+        return assigned
+
+    def select(self, pages, sizes=None):
+        """Returns this shard's pages, in the order of pages."""
+        assigned = self.assign(pages, sizes)
+        return [page for page in pages if assigned[page] == self.index]
+
+    def record(self, pages):
+        """What the manifest keeps about the shard, for merge() to check."""
+        return {
+            "index": self.index,
+            "count": self.count,
+            "weighted": self.weighted,
+            "total": len(pages),
+            "pages": pages_digest(pages),
+        }
+
+    def __repr__(self):
+        return f"Shard({self.index}/{self.count})"
+
+
+def check(manifests, shard_dirs):
+    """Returns what is wrong with a set of shard manifests, if anything."""
+    problems = []
+    for manifest, shard_dir in zip(manifests, shard_dirs):
+        if manifest is None:
+            problems.append(f"{shard_dir}: no build manifest")
+        elif "shard" not in manifest.config:
+            problems.append(f"{shard_dir}: not a shard build")
+    if problems:
+        return problems
+
+    first = manifests[0].config
+    count = first["shard"]["count"]
+    indexes = sorted(manifest.config["shard"]["index"] for manifest in manifests)
+    if indexes != list(range(1, count + 1)):
+        problems.append(f"expected shards 1 to {count} once each, got {', '.join(map(str, indexes))}")
+    for manifest, shard_dir in zip(manifests, shard_dirs):
+        config = manifest.config
+        if config.get("basepath") != first.get("basepath"):
+            problems.append(f"{shard_dir}: built with a different basepath")
+        if config.get("output", "raw") != first.get("output", "raw"):
+            problems.append(f"{shard_dir}: built with a different --output")
+        if config.get("hash_assets", False) != first.get("hash_assets", False):
+            problems.append(f"{shard_dir}: built with a different --hash-assets")
+        if config.get("gzip") != first.get("gzip"):
+            problems.append(f"{shard_dir}: built with different --gzip settings")
+        if hashes(config.get("inputs", {})) != hashes(first.get("inputs", {})):
+            problems.append(f"{shard_dir}: built with different templates")
+        shard = config["shard"]
+        if (shard["count"], shard["total"], shard["pages"]) != (count, first["shard"]["total"], first["shard"]["pages"]):
+            problems.append(f"{shard_dir}: built from different content or shard count")
+        if hashes(manifest.static) != hashes(manifests[0].static):
+            problems.append(f"{shard_dir}: static files differ")
+        if hashes(manifest.listings) != hashes(manifests[0].listings):
+            problems.append(f"{shard_dir}: listings differ")
+        for page, record in sorted(manifest.pages.items()):
+            output = record.get("output")
+            if not record.get("hash") or not output:
+                problems.append(f"{shard_dir}: {page} failed to build")
+            elif fileio.dest_size(os.path.join(shard_dir, record["dest"])) != output["size"]:
+                problems.append(f"{shard_dir}: {record['dest']} is missing or damaged")
+
+    pages = [page for manifest in manifests for page in manifest.pages]
+    if len(pages) != len(set(pages)):
+        problems.append("a page was built by more than one shard")
+    elif not problems and (len(pages), pages_digest(pages)) != (first["shard"]["total"], first["shard"]["pages"]):
+        problems.append(f"the shards built {len(pages)} of {first['shard']['total']} pages")
+    return problems
+
+
+def merge_sibling(rel_path, shard_dir, dest_dir, changed, link, report):
+    """Brings the .gz sibling of an output in dest_dir in line with the shard's."""
+    gz_path = rel_path + compress.SUFFIX
+    if not os.path.exists(os.path.join(shard_dir, gz_path)):
+        if compress.remove_sibling(dest_dir, rel_path):
+            report.removed.append(gz_path)
+    elif changed or not os.path.exists(os.path.join(dest_dir, gz_path)):
+        fileio.place(os.path.join(shard_dir, gz_path), os.path.join(dest_dir, gz_path), link)
+        report.written.append(gz_path)
+    else:
+        report.skipped.append(gz_path)
+
+
+def merge(shard_dirs, dest_dir, link=False, force=False):
+    """Combines the output of every shard of a build into dest_dir.
+
+    Raises MergeError without touching dest_dir unless the shards all built
+    the same site and together hold every one of its pages. Files that are
+    already up to date in dest_dir are left alone and files no longer in the
+    site are removed, as in an ordinary build, and the merged manifest lets
+    later unsharded builds of dest_dir be incremental. The .gz siblings of
+    a build with gzip are merged along with their files. Every shard makes
+    the same listings from the whole site's index, so they are taken from
+    the first, as are the static files and their hashed copies. Returns a
+    build.BuildReport listing what was written, skipped and removed, with
+    the merged site's LinkIndex as its links. Without a manifest in
+    dest_dir, it is cleared as build.clear_dest does, with force, keeping
+    the shards' directories."""
+    manifests = [Manifest.load(manifest_path(shard_dir)) for shard_dir in shard_dirs]
+    problems = check(manifests, shard_dirs) if shard_dirs else ["no shards to merge"]
+    if problems:
+        raise MergeError(problems)
+
+    path = manifest_path(dest_dir)
+    previous = Manifest.load(path)
+    if previous is None:
+        build.clear_dest(dest_dir, force, shard_dirs)
+        previous = Manifest(path)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    config = {key: value for key, value in manifests[0].config.items() if key != "shard"}
+    current = Manifest(path, config, {}, dict(manifests[0].static), dict(manifests[0].listings))
+    # (output path, shard holding it, its record, its record in dest_dir's manifest)
+    files = [
+        (rel_path, shard_dirs[0], record, previous.static.get(rel_path))
+        for rel_path, record in sorted(manifests[0].static.items())
+    ]
+    files.extend(
+        (rel_path, shard_dirs[0], record, previous.listings.get(rel_path))
+        for rel_path, record in sorted(manifests[0].listings.items())
+    )
+    hashed = {record["hashed"]: record for record in current.static.values() if record.get("hashed")}
+    previous_hashed = {record["hashed"]: record for record in previous.static.values() if record.get("hashed")}
+    files.extend(
+        (name, shard_dirs[0], record, previous_hashed.get(name))
+        for name, record in sorted(hashed.items())
+    )
+    for manifest, shard_dir in zip(manifests, shard_dirs):
+        for page, record in manifest.pages.items():
+            current.pages[page] = record
+            old = previous.pages.get(page)
+            files.append((record["dest"], shard_dir, record["output"], old.get("output") if old else None))
+
+    report = build.BuildReport()
+    for rel_path, shard_dir, record, old in sorted(files, key=lambda file: file[0]):
+        dest_path = os.path.join(dest_dir, rel_path)
+        changed = not (old and old.get("hash") == record["hash"] and fileio.dest_size(dest_path) == record["size"])
+        if changed:
+            fileio.place(os.path.join(shard_dir, rel_path), dest_path, link)
+            report.written.append(rel_path)
+        else:
+            report.skipped.append(rel_path)
+        if config.get("gzip") and rel_path + compress.SUFFIX not in current.static:
+            merge_sibling(rel_path, shard_dir, dest_dir, changed, link, report)
+
+    outputs = {record["dest"] for record in current.pages.values()} | current.static.keys() | current.listings.keys() | hashed.keys()
+    old_outputs = [record["dest"] for record in previous.pages.values()] + list(previous.static) + list(previous.listings)
+    old_outputs.extend(previous_hashed)
+    for rel_path in sorted(set(old_outputs) - outputs):
+        fileio.remove(os.path.join(dest_dir, rel_path), dest_dir)
+        report.removed.append(rel_path)
+    if previous.config.get("gzip"):
+        # The siblings of outputs that are gone, or of all of them if the shards weren't compressed.
+        stale = set(old_outputs) - outputs if config.get("gzip") else set(old_outputs)
+        for rel_path in sorted(stale):
+            if rel_path + compress.SUFFIX not in current.static and compress.remove_sibling(dest_dir, rel_path):
+                report.removed.append(rel_path + compress.SUFFIX)
+
+    report.links = LinkIndex(current.pages, current.static, current.listings)
+    current.save()
+    return report
@@ -0,0 +1,155 @@
+"""Page templates, parsed once into literal segments and placeholder slots."""
+
+import os
+
+from htmlnode import minify_html, minify_text
+from lazyre import LazyPattern
+
+PLACEHOLDER_RE = LazyPattern(r"\{\{\s*(\w+)\s*\}\}")
+INCLUDE_RE = LazyPattern(r"\{\{>\s*([^\s}]+)\s*\}\}")
+URL_ATTRIBUTE_RE = LazyPattern(r'\b(href|src)="(/[^"]*)"')
+
+# The name of a template that applies to the pages in its directory of
+# content/ and below, in place of the site's template.
+TEMPLATE_NAME = "template.html"
+
+
+def rewrite_url(url, basepath):
+    """Points a site-absolute url at basepath. Other urls are returned unchanged."""
+    if basepath == "/" or not url.startswith("/") or url.startswith("//"):
+        return url
+    return basepath + url[1:]
+
+
+class Template():
+    def __init__(self, text, basepath="/", files=None, assets=None):
+        """Splits text on {{ Name }} placeholders.
+
+        Site-absolute href and src attributes in the literal parts are
+        pointed at basepath here, so rendering never has to rescan them.
+        files lists the template's file and the partials included in it.
+        With assets, an assets.AssetTable, they are pointed at the hashed
+        names of static files too, and static lists the files they name."""
+        self.files = files or []
+        self.parts = []
+        self.slots = []
+        self.minified = None
+        self.static = []
+        pos = 0
+        for m in PLACEHOLDER_RE.finditer(text):
+            self.parts.append(self._rewrite_literal(text[pos:m.start()], basepath, assets))
+            self.slots.append((len(self.parts), m.group(1)))
+            self.parts.append("")
+            pos = m.end()
+        self.parts.append(self._rewrite_literal(text[pos:], basepath, assets))
+
+    def _rewrite_literal(self, literal, basepath, assets):
+        if assets is None:
+            return self._rewrite(literal, basepath)
+
+        def rewrite(m):
+            path = assets.path(m.group(2))
+            if path is not None and path not in self.static:
+                self.static.append(path)
+            return f'{m.group(1)}="{rewrite_url(assets.url(m.group(2)), basepath)}"'
+
+        return URL_ATTRIBUTE_RE.sub(rewrite, literal)
+
+    @staticmethod
+    def _rewrite(literal, basepath):
+        if basepath == "/":
+            return literal
+        literal = literal.replace("href=\"/", f"href=\"{basepath}")
+        return literal.replace("src=\"/", f"src=\"{basepath}")
+
+    @property
+    def names(self):
+        return [name for _, name in self.slots]
+
+    def render(self, values):
+        """Fills each placeholder from values. Missing values render as an empty string."""
+        parts = self.parts.copy()
+        for i, name in self.slots:
+            parts[i] = values.get(name, "")
+        return "".join(parts)
+
+    def write_to(self, stream, values, text=None):
+        """Like render, but writes into stream. Values that are HTML nodes
+        are serialized straight into the stream.
+
+        text is one of htmlnode.OUTPUTS. If it is set, string values pass
+        through it and nodes are serialized with it. With minify_text the
+        template's own markup is minified as well, once per template."""
+        write = stream.write
+        names = dict(self.slots)
+        parts = self.parts
+        if text is minify_text:
+            if self.minified is None:
+                self.minified = [minify_html(part) for part in self.parts]
+            parts = self.minified
+        for i, part in enumerate(parts):
+            if i not in names:
+                write(part)
+                continue
+            value = values.get(names[i], "")
+            if isinstance(value, str):
+                write(value if text is None else text(value))
+            else:
+                value.write(write, text)
+
+
+def read_template(path, files=None, including=()):
+    """Returns the text of the template at path with every {{> partial }}
+    replaced by the partial's text. Partial paths are relative to the file
+    that includes them. Every file read is appended to files."""
+    if path in including:
+        raise ValueError(f"template includes itself: {' -> '.join(including + (path,))}")
+    if files is not None and path not in files:
+        files.append(path)
+    with open(path) as f:
+        text = f.read()
+    directory = os.path.dirname(path)
+    return INCLUDE_RE.sub(
+        lambda m: read_template(os.path.normpath(os.path.join(directory, m.group(1))), files, including + (path,)),
+        text,
+    )
+
+
+_templates = {}
+
+
+def load_template(path, basepath="/", assets=None):
+    """Returns the compiled template at path, re-reading it only when it or
+    one of its partials changes. assets is passed on to Template."""
+    key = (path, basepath, assets.digest if assets is not None else None)
+    cached = _templates.get(key)
+    if cached is not None:
+        try:
+            if cached[0] == [os.stat(file).st_mtime_ns for file in cached[1].files]:
+                return cached[1]
+        except OSError:
+            pass
+    files = []
+    mtimes = [os.stat(path).st_mtime_ns]
+    template = Template(read_template(path, files), basepath, files, assets)
+    mtimes.extend(os.stat(file).st_mtime_ns for file in files[1:])
+    _templates[key] = (mtimes, template)
+    return template
+
+
+def find_template(content_dir, rel_dir, default, found=None):
+    """Returns the template for pages in rel_dir of content_dir: the closest
+    TEMPLATE_NAME in it or a directory above it, or else default. found
+    remembers the answer per directory across calls."""
+    if found is not None and rel_dir in found:
+        return found[rel_dir]
+    path = os.path.join(content_dir, rel_dir, TEMPLATE_NAME)
+    if os.path.isfile(path):
+        template = path
+    elif not rel_dir:
+        template = default
+    else:
+        template = find_template(content_dir, os.path.dirname(rel_dir), default, found)
+    if found is not None:
+        found[rel_dir] = template
+    return template
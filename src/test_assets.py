@@ -0,0 +1,106 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import assets
+import fileio
+from assets import AssetTable
+from build import BuildReport
+from manifest import fingerprint
+from testutil import write
+
+
+def png(width, height):
+    return assets.PNG_SIGNATURE + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\x08\x06\x00\x00\x00" + b"\0" * 20
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\0" * 10
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + b"\xff\xff" + sof + b"\xff\xd9"
+
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hashed_name(self):
+        self.assertEqual(assets.hashed_name("images/a.png", "0123456789abcdef"), "images/a.0123456789.png")
+        self.assertEqual(assets.hashed_name("index.min.css", "fedcba9876543210"), "index.min.fedcba9876.css")
+
+    def test_image_size(self):
+        for name, data, size in (("a.png", png(1026, 388), (1026, 388)), ("a.gif", gif(640, 480), (640, 480)),
+                                 ("a.jpg", jpeg(300, 200), (300, 200)), ("a.css", b"body {}", None),
+                                 ("cut.jpg", jpeg(300, 200)[:30], None), ("empty.png", b"", None)):
+            write(os.path.join(self.static, name), data)
+            self.assertEqual(assets.image_size(os.path.join(self.static, name)), size, name)
+
+    def sync(self, previous):
+        current = {}
+        for rel_path in sorted(os.listdir(self.static)):
+            path = os.path.join(self.static, rel_path)
+            current[rel_path] = fingerprint(path, previous.get(rel_path))
+            fileio.place(path, os.path.join(self.dest, rel_path))
+        changed = {p for p in current if previous.get(p, {}).get("hash") != current[p]["hash"]}
+        report = BuildReport()
+        table = assets.update(self.static, self.dest, previous, current, changed, report)
+        return current, table, report
+
+    def test_update(self):
+        write(os.path.join(self.static, "a.png"), png(10, 20))
+        write(os.path.join(self.static, "index.css"), b"body {}")
+        write(os.path.join(self.static, "robots.txt"), b"")
+        current, table, report = self.sync({})
+
+        name = current["a.png"]["hashed"]
+        self.assertEqual(sorted(report.written), sorted([name, current["index.css"]["hashed"]]))
+        self.assertEqual(current["a.png"]["image"], [10, 20])
+        self.assertIsNone(current["index.css"]["image"])
+        self.assertNotIn("hashed", current["robots.txt"])
+        with open(os.path.join(self.dest, name), "rb") as f:
+            self.assertEqual(f.read(), png(10, 20))
+        self.assertEqual(table.url("/a.png?v=1#top"), f"/{name}?v=1#top")
+        self.assertEqual((table.path("/a.png"), table.size("/a.png")), ("a.png", (10, 20)))
+        self.assertEqual(table.url("/robots.txt"), "/robots.txt")
+        self.assertEqual(table.url("a.png"), "a.png")
+
+        previous = current
+        current, again, report = self.sync(previous)
+        self.assertEqual((report.written, len(report.skipped)), ([], 2))
+        self.assertEqual(again.digest, table.digest)
+
+        write(os.path.join(self.static, "a.png"), png(30, 40))
+        current, changed, report = self.sync(current)
+        self.assertEqual(report.written, [current["a.png"]["hashed"]])
+        self.assertEqual(report.removed, [name])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, name)))
+        self.assertEqual(changed.size("/a.png"), (30, 40))
+        self.assertNotEqual(changed.digest, table.digest)
+
+    def test_image_size_is_reused(self):
+        write(os.path.join(self.static, "a.png"), png(10, 20))
+        previous, _, _ = self.sync({})
+        previous["a.png"]["image"] = [1, 2]
+        current, table, _ = self.sync(previous)
+
+        self.assertEqual(table.size("/a.png"), (1, 2))
+
+    def test_table_ignores_unhashed_files(self):
+        table = AssetTable({"a.txt": {"hash": "h", "size": 1}})
+
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.url("/a.txt"), "/a.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
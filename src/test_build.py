@@ -0,0 +1,394 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import build
+import listing
+from manifest import manifest_path
+from testutil import read, write
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        self.dest = os.path.join(self.root, "docs")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog)")
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nsome **words**")
+        write(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/", jobs=1, io_threads=0, force=False):
+        return build.build(basepath, self.content, self.template, self.static, self.dest, jobs=jobs, io_threads=io_threads, force=force)
+
+    def test_full_build(self):
+        report = self.build()
+
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertEqual(report.copied, ["index.css"])
+        self.assertEqual(read(os.path.join(self.dest, "blog", "index.html")), "<title>Blog</title><div><h1>Blog</h1><p>some <b>words</b></p></div>")
+        self.assertTrue(os.path.exists(manifest_path(self.dest)))
+        self.assertFalse(manifest_path(self.dest).startswith(self.dest + os.sep))
+        self.assertEqual(sorted(os.listdir(self.dest)), ["blog", "index.css", "index.html"])
+
+    def test_dest_without_manifest(self):
+        write(os.path.join(self.dest, "notes.txt"), "keep me")
+        with self.assertRaises(build.DestError):
+            self.build()
+        self.assertEqual(read(os.path.join(self.dest, "notes.txt")), "keep me")
+
+        report = self.build(force=True)
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "notes.txt")))
+
+    def test_dest_holding_sources_is_never_deleted(self):
+        for dest in (self.content, self.static, self.root):
+            with self.assertRaises(build.DestError):
+                build.build("/", self.content, self.template, self.static, dest, force=True)
+        self.assertEqual(read(os.path.join(self.content, "index.md")), "# Home\n\n[blog](/blog)")
+        self.assertEqual(read(os.path.join(self.static, "index.css")), "body {}")
+
+    def test_rebuild_unchanged(self):
+        self.build()
+        report = self.build()
+
+        self.assertEqual(report.generated, [])
+        self.assertEqual(report.copied, [])
+        self.assertEqual(report.removed, [])
+
+    def test_rebuild_one_page(self):
+        self.build()
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nother words")
+        report = self.build()
+
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertIn("other words", read(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_identical_output_is_not_rewritten(self):
+        self.build()
+        path = os.path.join(self.dest, "blog", "index.html")
+        os.utime(path, ns=(0, 0))
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n\nsome **words**")
+        report = self.build()
+
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertEqual(report.summary(), {"written": [], "skipped": ["blog/index.html", "index.css", "index.html"], "deleted": []})
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+
+    def test_summary(self):
+        report = self.build()
+        self.assertEqual(report.summary(), {"written": ["blog/index.html", "index.css", "index.html"], "skipped": [], "deleted": []})
+
+        write(os.path.join(self.content, "index.md"), "# Home")
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        report = self.build()
+        self.assertEqual(report.summary(), {"written": ["index.html"], "skipped": ["index.css"], "deleted": ["blog/index.html"]})
+
+    def test_link_index(self):
+        self.build()
+        write(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog) [gone](/gone) ![a](/a.png)")
+        report = self.build()
+
+        self.assertEqual(report.generated, ["index.md"])
+        links = report.links.check()
+        self.assertEqual(links.broken, [("index.md", "/gone")])
+        self.assertEqual(links.missing, [("index.md", "/a.png")])
+        self.assertEqual(links.orphans, [])
+
+    def test_removed_page_still_linked(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        report = self.build()
+
+        self.assertEqual(report.dangling, {"blog/index.html": ["index.md"]})
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        report = self.build()
+
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+
+    def test_page_cache_skips_parsing_on_template_change(self):
+        page_cache = (os.path.join(self.root, "cache", "pages.sqlite"), 1 << 20)
+        for jobs, io_threads in ((1, 0), (2, 0), (1, 2)):
+            write(self.template, f"<h{jobs + io_threads}>{{{{ Title }}}}</h{jobs + io_threads}>{{{{ Content }}}}")
+            report = build.build("/", self.content, self.template, self.static, self.dest, jobs=jobs,
+                                 io_threads=io_threads, page_cache=page_cache)
+            self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+
+        self.assertEqual((report.page_cache_hits, report.page_cache_misses), (2, 0))
+        self.assertEqual(read(os.path.join(self.dest, "blog", "index.html")), "<h3>Blog</h3><div><h1>Blog</h1><p>some <b>words</b></p></div>")
+        self.assertEqual(report.links.pages["index.md"]["links"], ["/blog"])
+
+    def test_output_change_rebuilds_all(self):
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n[< Back](/)")
+        self.build()
+        report = build.build("/", self.content, self.template, self.static, self.dest, output="escape")
+
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertEqual(read(os.path.join(self.dest, "blog", "index.html")), '<title>Blog</title><div><h1>Blog</h1><p><a href="/">&lt; Back</a></p></div>')
+        for jobs, io_threads in ((2, 0), (1, 2)):
+            os.remove(manifest_path(self.dest))
+            build.build("/", self.content, self.template, self.static, self.dest, jobs=jobs, io_threads=io_threads, output="escape", force=True)
+            self.assertIn("&lt; Back", read(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_gzip_siblings(self):
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n" + "some **words** " * 50)
+        gz = (6, 200)
+        report = build.build("/", self.content, self.template, self.static, self.dest, gzip=gz)
+
+        self.assertEqual(report.compressed, ["blog/index.html.gz"])
+        self.assertIn("blog/index.html.gz", report.summary()["written"])
+        with gzip.open(os.path.join(self.dest, "blog", "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), read(os.path.join(self.dest, "blog", "index.html")))
+
+        write(os.path.join(self.content, "index.md"), "# Home\n\n" + "[blog](/blog) " * 50)
+        report = build.build("/", self.content, self.template, self.static, self.dest, gzip=gz)
+        self.assertEqual(report.compressed, ["index.html.gz"])
+        self.assertIn("blog/index.html.gz", report.skipped)
+
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        report = build.build("/", self.content, self.template, self.static, self.dest, gzip=gz)
+        self.assertEqual(sorted(report.removed), ["blog/index.html", "blog/index.html.gz"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+        report = self.build()
+        self.assertEqual(report.removed, ["index.html.gz"])
+        self.assertEqual(report.generated, [])
+
+    def test_index(self):
+        write(os.path.join(self.content, "blog", "post.md"), "---\ndate: 2024-05-01\ntags: [elves]\n---\n# Post\n\ntext")
+        report = self.build()
+
+        self.assertEqual(len(report.index), 3)
+        self.assertEqual(report.index["index.md"].title, "Home")
+        self.assertEqual(report.index["blog/post.md"].tags, ["elves"])
+        self.assertEqual([page.path for page in report.index.by_date()], ["blog/post.md", "blog/index.md", "index.md"])
+        self.assertNotIn("date:", read(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_index_rescans_changed_pages(self):
+        self.build()
+        write(os.path.join(self.content, "blog", "index.md"), "# New title\n\nwords")
+        os.remove(os.path.join(self.content, "index.md"))
+        write(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog)")
+        scanned = []
+        scan = build.meta.scan
+
+        def spy(content_dir, rel_path):
+            scanned.append(rel_path)
+            return scan(content_dir, rel_path)
+
+        build.meta.scan = spy
+        try:
+            report = self.build()
+        finally:
+            build.meta.scan = scan
+
+        self.assertEqual(scanned, ["blog/index.md"])
+        self.assertEqual(report.index["blog/index.md"].title, "New title")
+        self.assertEqual(report.index["index.md"].title, "Home")
+
+    def test_listings(self):
+        write(os.path.join(self.content, "blog", "post.md"), "---\ndate: 2024-05-01\n---\n# Post\n\ntext")
+        listings = listing.Listings("https://example.com", ["blog"], ["blog"])
+        report = build.build("/", self.content, self.template, self.static, self.dest, listings=listings)
+
+        self.assertEqual(report.listings, ["blog/feed.xml", "blog/page/1/index.html", "sitemap.xml"])
+        self.assertEqual(read(os.path.join(self.dest, "blog", "page", "1", "index.html")),
+                         '<title>Blog</title><div><h1>Blog</h1><ul><li><a href="/blog/post.html">Post</a> '
+                         '<time datetime="2024-05-01">2024-05-01</time></li></ul></div>')
+        self.assertIn("<loc>https://example.com/blog/post.html</loc>", read(os.path.join(self.dest, "sitemap.xml")))
+        self.assertEqual(report.links.find("/blog/page/1", "index.md"), "blog/page/1/index.html")
+
+        write(os.path.join(self.content, "blog", "post.md"), "---\ndate: 2024-05-01\n---\n# Post\n\nother text")
+        report = build.build("/", self.content, self.template, self.static, self.dest, listings=listings)
+        self.assertEqual((report.generated, report.listings), (["blog/post.md"], []))
+
+        write(os.path.join(self.content, "blog", "post.md"), "---\ndate: 2024-05-01\n---\n# New title")
+        report = build.build("/", self.content, self.template, self.static, self.dest, listings=listings)
+        self.assertEqual(report.listings, ["blog/feed.xml", "blog/page/1/index.html", "sitemap.xml"])
+
+        report = self.build()
+        self.assertEqual(report.removed, ["blog/feed.xml", "blog/page/1/index.html", "sitemap.xml"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "page")))
+
+    def test_pages_only_listed_are_not_orphans(self):
+        write(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog/)")
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        for name in ("a", "b", "c"):
+            write(os.path.join(self.content, "blog", name, "index.md"), f"# {name}")
+        listings = listing.Listings(sections=["blog"], per_page=2)
+
+        for _ in range(2):
+            report = build.build("/", self.content, self.template, self.static, self.dest, listings=listings)
+            self.assertEqual(report.links.check().orphans, [])
+        self.assertEqual(report.listings, [])
+
+    def test_listing_template_change(self):
+        listings = listing.Listings(sections=["blog"])
+        build.build("/", self.content, self.template, self.static, self.dest, listings=listings)
+        write(os.path.join(self.content, "blog", "template.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+        report = build.build("/", self.content, self.template, self.static, self.dest, listings=listings)
+
+        self.assertEqual(report.listings, ["blog/page/1/index.html"])
+        self.assertTrue(read(os.path.join(self.dest, "blog", "page", "1", "index.html")).startswith("<h2>Blog</h2>"))
+
+    def gif(self, width=3, height=2):
+        write(os.path.join(self.static, "images", "a.gif"), b"GIF89a" + bytes([width, 0, height, 0]) + bytes(10))
+
+    def test_hash_assets(self):
+        write(self.template, '<link href="/index.css" />{{ Content }}')
+        self.gif()
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n![a](/images/a.gif) [css](/index.css)")
+        report = build.build("/", self.content, self.template, self.static, self.dest, hash_assets=True)
+
+        css = [path for path in report.written if path.startswith("index.") and path.endswith(".css") and path != "index.css"]
+        self.assertEqual(len(css), 1)
+        self.assertEqual(read(os.path.join(self.dest, css[0])), "body {}")
+        html = read(os.path.join(self.dest, "blog", "index.html"))
+        self.assertIn(f'<link href="/{css[0]}" />', html)
+        self.assertRegex(html, r'<img src="/images/a\.[0-9a-f]{10}\.gif" alt="a" width="3" height="2">')
+        self.assertIn(f'<a href="/{css[0]}">css</a>', html)
+
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nno assets")
+        write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        report = build.build("/", self.content, self.template, self.static, self.dest, hash_assets=True)
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertIn(css[0], report.removed)
+        self.assertNotIn(css[0], read(os.path.join(self.dest, "index.html")))
+
+        report = self.build()
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertEqual(len(report.removed), 2)
+        self.assertIn('<link href="/index.css" />', read(os.path.join(self.dest, "index.html")))
+
+    def test_hash_assets_rebuilds_only_pages_using_a_changed_image(self):
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n![a](/images/a.gif)")
+        self.gif()
+        build.build("/", self.content, self.template, self.static, self.dest, hash_assets=True)
+        self.gif(5, 4)
+        report = build.build("/", self.content, self.template, self.static, self.dest, hash_assets=True)
+
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertIn('width="5" height="4"', read(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_hash_assets_rebuilds_pages_linking_to_an_added_image(self):
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n![a](/images/a.gif)")
+        build.build("/", self.content, self.template, self.static, self.dest, hash_assets=True)
+        self.gif()
+        report = build.build("/", self.content, self.template, self.static, self.dest, hash_assets=True)
+
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertRegex(read(os.path.join(self.dest, "blog", "index.html")), r'<img src="/images/a\.[0-9a-f]{10}\.gif" alt="a" width="3" height="2">')
+
+    def test_directory_template(self):
+        self.build()
+        write(os.path.join(self.content, "blog", "template.html"), "<h1>blog</h1>{{ Content }}")
+        report = self.build()
+
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertEqual(read(os.path.join(self.dest, "blog", "index.html")), "<h1>blog</h1><div><h1>Blog</h1><p>some <b>words</b></p></div>")
+
+        write(os.path.join(self.content, "blog", "template.html"), "<h2>blog</h2>{{ Content }}")
+        report = self.build()
+        self.assertEqual(report.generated, ["blog/index.md"])
+
+        os.remove(os.path.join(self.content, "blog", "template.html"))
+        report = self.build()
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertTrue(read(os.path.join(self.dest, "blog", "index.html")).startswith("<title>Blog</title>"))
+
+    def test_partial_change_rebuilds_dependents(self):
+        write(os.path.join(self.content, "blog", "template.html"), "{{> ../../partials/nav.html }}{{ Content }}")
+        write(os.path.join(self.root, "partials", "nav.html"), "<nav>1</nav>")
+        self.build()
+        write(os.path.join(self.root, "partials", "nav.html"), "<nav>2</nav>")
+        report = self.build()
+
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertIn(os.path.join(self.root, "partials", "nav.html"), report.inputs)
+        self.assertTrue(read(os.path.join(self.dest, "blog", "index.html")).startswith("<nav>2</nav>"))
+
+    def test_asset_change_rebuilds_pages_using_it(self):
+        write(os.path.join(self.content, "index.md"), "# Home\n\n![logo](/images/logo.png)")
+        write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.build()
+        write(os.path.join(self.static, "images", "logo.png"), "new png")
+        report = self.build()
+
+        self.assertEqual(report.copied, ["images/logo.png"])
+        self.assertEqual(report.generated, ["index.md"])
+
+    def test_basepath_change_rebuilds_all(self):
+        self.build()
+        report = self.build("/ssg/")
+
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertIn('href="/ssg/blog"', read(os.path.join(self.dest, "index.html")))
+
+    def test_deleted_sources_are_removed(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        report = self.build()
+
+        self.assertEqual(sorted(report.removed), ["blog/index.html", "index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        report = self.build()
+
+        self.assertEqual(report.generated, ["index.md"])
+
+    def test_parallel_build_matches_serial(self):
+        self.build()
+        serial = read(os.path.join(self.dest, "blog", "index.html"))
+        os.remove(manifest_path(self.dest))
+        report = self.build(jobs=2, force=True)
+
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertEqual(read(os.path.join(self.dest, "blog", "index.html")), serial)
+
+    def test_io_threads_build_matches_serial(self):
+        self.build()
+        serial = read(os.path.join(self.dest, "blog", "index.html"))
+        os.remove(manifest_path(self.dest))
+        report = self.build(io_threads=2, force=True)
+
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+        self.assertEqual(read(os.path.join(self.dest, "blog", "index.html")), serial)
+
+    def test_page_errors_are_reported(self):
+        write(os.path.join(self.content, "blog", "index.md"), "no title here")
+        report = self.build(jobs=2)
+
+        self.assertEqual(report.generated, ["index.md"])
+        self.assertEqual([error.path for error in report.errors], ["blog/index.md"])
+        self.assertIsInstance(report.errors[0].error, ValueError)
+
+        write(os.path.join(self.content, "blog", "index.md"), "# Fixed")
+        report = self.build()
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertEqual(report.errors, [])
+
+    def test_failed_page_is_retried(self):
+        write(os.path.join(self.content, "blog", "index.md"), "no title here")
+        self.build()
+        report = self.build()
+
+        self.assertEqual([error.path for error in report.errors], ["blog/index.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import unittest
+
+import cache
+import convert
+from assets import AssetTable
+from htmlnode import escape_text
+from links import References
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        lru = cache.LRUCache(2)
+        lru.put("a", "1")
+        lru.put("b", "2")
+        lru.get("a")
+        lru.put("c", "3")
+
+        self.assertEqual(lru.get("a"), "1")
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(len(lru), 2)
+
+
+class TestBlockCache(unittest.TestCase):
+    markdown = "# title\n\nshared **footer**\n\n* a\n* b\n\nshared **footer**"
+
+    def tearDown(self):
+        convert.block_cache = None
+
+    def test_cached_render_matches(self):
+        expected = convert.markdown_to_html_node(self.markdown, "/ssg/").to_html()
+        convert.block_cache = cache.BlockCache()
+
+        self.assertEqual(convert.markdown_to_html_node(self.markdown, "/ssg/").to_html(), expected)
+        self.assertEqual(convert.block_cache.take_stats(), (1, 3))
+        self.assertEqual(convert.markdown_to_html_node(self.markdown, "/ssg/").to_html(), expected)
+        self.assertEqual(convert.block_cache.take_stats(), (4, 0))
+
+    def test_basepath_is_part_of_the_key(self):
+        convert.block_cache = cache.BlockCache()
+        convert.markdown_to_html_node("[home](/)", "/")
+
+        self.assertEqual(convert.markdown_to_html_node("[home](/)", "/ssg/").to_html(), '<div><p><a href="/ssg/">home</a></p></div>')
+
+    def test_output_is_part_of_the_key(self):
+        convert.block_cache = cache.BlockCache()
+        convert.markdown_to_html_node("a < b")
+        convert.serialize_text = escape_text
+        try:
+            self.assertEqual(convert.markdown_to_html_node("a < b").to_html(escape_text), "<div><p>a &lt; b</p></div>")
+        finally:
+            convert.serialize_text = None
+
+    def test_asset_table_is_part_of_the_key(self):
+        convert.block_cache = cache.BlockCache()
+        convert.markdown_to_html_node("![a](/a.png)")
+        convert.asset_table = AssetTable({"a.png": {"hash": "h", "size": 1, "hashed": "a.h.png", "image": [1, 2]}})
+        try:
+            self.assertEqual(convert.markdown_to_html_node("![a](/a.png)").to_html(),
+                             '<div><p><img src="/a.h.png" alt="a" width="1" height="2"></img></p></div>')
+        finally:
+            convert.asset_table = None
+
+    def test_cached_blocks_keep_their_links(self):
+        markdown = "[home](/) ![tom](/tom.png)\n\n[home](/) ![tom](/tom.png)"
+        convert.block_cache = cache.BlockCache()
+        refs = References()
+
+        convert.markdown_to_html_node(markdown, "/", refs)
+
+        self.assertEqual(convert.block_cache.take_stats(), (1, 1))
+        self.assertEqual(refs.links, ["/", "/"])
+        self.assertEqual(refs.images, ["/tom.png", "/tom.png"])
+
+    def test_disk_cache_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.sqlite")
+            convert.block_cache = cache.BlockCache(path=path)
+            expected = convert.markdown_to_html_node(self.markdown).to_html()
+            convert.block_cache.take_stats()
+            convert.block_cache.disk.close()
+
+            convert.block_cache = cache.BlockCache(path=path)
+            self.assertEqual(convert.markdown_to_html_node(self.markdown).to_html(), expected)
+            self.assertEqual(convert.block_cache.take_stats(), (4, 0))
+            convert.block_cache.disk.close()
+
+    def test_disk_prune(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = cache.DiskCache(os.path.join(tmp, "blocks.sqlite"))
+            for i in range(5):
+                disk.put(str(i), "x")
+            disk.prune(2)
+
+            self.assertEqual([disk.get(str(i)) for i in range(5)], [None, None, None, "x", "x"])
+            disk.close()
+
+    def test_disk_prune_to_size(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = cache.DiskCache(os.path.join(tmp, "pages.sqlite"))
+            for i in range(5):
+                disk.put(str(i), "x" * 10)
+            disk.touch("0")
+            disk.prune(10, max_bytes=25)
+
+            self.assertEqual([disk.get(str(i)) for i in range(5)], ["x" * 10, None, None, None, "x" * 10])
+            disk.close()
+
+
+class TestPageCache(unittest.TestCase):
+    markdown = "# Title\n\n[home](/) ![tom](/tom.png)\n\n* a\n* b"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "pages.sqlite")
+
+    def tearDown(self):
+        convert.page_cache = None
+        cache._parser_version = None
+        self.tmp.cleanup()
+
+    def render(self, basepath="/"):
+        refs = References()
+        title, node = convert.render_markdown(self.markdown, basepath, refs)
+        return title, node.to_html(), refs.links, refs.images
+
+    def test_cached_render_matches(self):
+        expected = self.render()
+        convert.page_cache = cache.PageCache(self.path)
+
+        self.assertEqual(self.render(), expected)
+        self.assertEqual(self.render(), expected)
+        self.assertEqual(convert.page_cache.take_stats(), (1, 1))
+        self.assertEqual(self.render("/ssg/")[1], expected[1].replace('"/', '"/ssg/'))
+        self.assertEqual(convert.page_cache.take_stats(), (0, 1))
+
+    def test_persists_until_the_parser_changes(self):
+        convert.page_cache = cache.PageCache(self.path)
+        self.render()
+        convert.page_cache.close()
+
+        convert.page_cache = cache.PageCache(self.path)
+        self.render()
+        self.assertEqual(convert.page_cache.take_stats(), (1, 0))
+        cache._parser_version = "edited"
+        self.render()
+        self.assertEqual(convert.page_cache.take_stats(), (0, 1))
+        convert.page_cache.close()
+
+    def test_failed_pages_are_not_cached(self):
+        convert.page_cache = cache.PageCache(self.path)
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                convert.render_markdown("# Title\n\nuneven **bold")
+        self.assertEqual(convert.page_cache.take_stats(), (0, 2))
+        convert.page_cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import compress
+from testutil import write
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compressible(self):
+        self.assertTrue(compress.compressible("blog/index.html", 300, 256))
+        self.assertTrue(compress.compressible("INDEX.CSS", 300, 256))
+        self.assertFalse(compress.compressible("index.html", 100, 256))
+        self.assertFalse(compress.compressible("images/tom.png", 30000, 256))
+
+    def test_compress_file_is_deterministic(self):
+        path = os.path.join(self.root, "index.html")
+        write(path, "<p>hello</p>" * 100)
+
+        compress.compress_file(path)
+        with open(path + ".gz", "rb") as f:
+            first = f.read()
+        os.utime(path, (0, 0))
+        compress.compress_file(path, 9)
+        with open(path + ".gz", "rb") as f:
+            second = f.read()
+
+        self.assertEqual(first, second)
+        self.assertEqual(gzip.decompress(first), b"<p>hello</p>" * 100)
+
+    def test_compressor(self):
+        for name in ("a.html", "b.html", "small.html", "c.png", "d.css", "d.css.gz"):
+            write(os.path.join(self.root, name), "x" * 1000 if name != "small.html" else "x")
+        write(os.path.join(self.root, "small.html.gz"), "stale")
+        compress.compress_file(os.path.join(self.root, "b.html"))
+        compressor = compress.Compressor(self.root, min_size=100)
+        outputs = {"d.css": {}, "d.css.gz": {}}
+
+        for name in ("a.html", "b.html", "small.html", "c.png", "d.css"):
+            compressor.update(name, os.path.getsize(os.path.join(self.root, name)), False, outputs)
+
+        self.assertEqual(compressor.wait(), [])
+        self.assertEqual(compressor.written, ["a.html.gz"])
+        self.assertEqual(compressor.skipped, ["b.html.gz"])
+        self.assertEqual(compressor.removed, ["small.html.gz"])
+        self.assertEqual(sorted(os.listdir(self.root)), ["a.html", "a.html.gz", "b.html", "b.html.gz", "c.png", "d.css", "d.css.gz", "small.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import convert
@@ -247,6 +249,144 @@ blah blah"""
         self.assertEqual(output.to_html(), """<div><p>this is some text
 blah blah</p></div>""")
 
+    def test_markdown_to_html_basepath(self):
+        input = "[home](/) and ![tom](/images/tom.png) and [boot](https://www.boot.dev)"
+
+        output = convert.markdown_to_html_node(input, "/ssg/")
+
+        self.assertEqual(output.to_html(), """<div><p><a href="/ssg/">home</a> and <img src="/ssg/images/tom.png" alt="tom"></img> and <a href="https://www.boot.dev">boot</a></p></div>""")
+
+    def test_parse_blocks_spans(self):
+        input = """# heading
+
+> a quote
+> more
+
+
+1. one
+2. two"""
+
+        output = convert.parse_blocks(input)
+
+        self.assertEqual(output, [
+            convert.Block("heading", ["# heading"], 0, 1),
+            convert.Block("quote", ["> a quote", "> more"], 2, 4),
+            convert.Block("ordered", ["1. one", "2. two"], 6, 8),
+        ])
+
+    def test_parse_blocks_code_with_blank_lines(self):
+        input = """```
+first
+
+second
+```
+after"""
+
+        output = convert.parse_blocks(input)
+
+        self.assertEqual([(block.type, block.start, block.end) for block in output], [("code", 0, 5), ("paragraph", 5, 6)])
+        self.assertEqual(convert.markdown_to_html_node(input).to_html(), """<div><pre><code>
+first
+
+second
+</code></pre><p>after</p></div>""")
+
+    def test_parse_blocks_unclosed_fence(self):
+        output = convert.parse_blocks("```\nnot code\n\ntext")
+
+        self.assertEqual([block.type for block in output], ["paragraph", "paragraph"])
+
+    def test_parse_blocks_invalid_list(self):
+        output = convert.parse_blocks("1. one\n3. three")
+
+        self.assertEqual(output[0].error, "ordered list must start with a number followed by a period and a space")
+        with self.assertRaises(ValueError):
+            convert.markdown_to_html_node("1. one\n3. three")
+
+    def test_markdown_to_html_long_ordered(self):
+        input = "\n".join(f"{i}. item {i}" for i in range(1, 12))
+
+        output = convert.markdown_to_html_node(input)
+
+        self.assertEqual(output.to_html(), "<div><ol>" + "".join(f"<li>item {i}</li>" for i in range(1, 12)) + "</ol></div>")
+
+    def test_stream_page_matches_generate_page(self):
+        markdown = "# Big\r\n\r\n```\r\ncode\r\n\r\nmore```\r\n* [a](/a)\r\n- ![b](/b.png)\r\n\r\n```\r\nnot closed `x`\r\n`"
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "big.md")
+            template = os.path.join(tmp, "template.html")
+            with open(source, "w", newline="") as f:
+                f.write(markdown)
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+
+            whole = convert.generate_page("/ssg/", source, template, os.path.join(tmp, "whole.html"))
+            streamed = convert.stream_page("/ssg/", source, template, os.path.join(tmp, "out", "streamed.html"))
+
+            with open(os.path.join(tmp, "whole.html")) as f, open(os.path.join(tmp, "out", "streamed.html")) as g:
+                self.assertEqual(f.read(), g.read())
+            self.assertEqual(streamed, whole)
+            self.assertEqual(streamed["links"], ["/a"])
+            with convert.MappedSource(source) as mapped:
+                self.assertEqual(mapped.last_fence(), convert.last_fence(markdown.splitlines()))
+
+    def test_front_matter(self):
+        markdown = "---\ntitle: Better\ntags: [a, b]\nauthor: Tolkien\n---\n\n# Heading\n\ntext\n\n```\ncode\n```"
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "page.md")
+            template = os.path.join(tmp, "template.html")
+            with open(source, "w") as f:
+                f.write(markdown)
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title><p>{{ Author }}: {{ Tags }}</p>{{ Content }}")
+
+            convert.generate_page("/", source, template, os.path.join(tmp, "whole.html"))
+            convert.stream_page("/", source, template, os.path.join(tmp, "streamed.html"))
+
+            with open(os.path.join(tmp, "whole.html")) as f, open(os.path.join(tmp, "streamed.html")) as g:
+                whole = f.read()
+                self.assertEqual(g.read(), whole)
+            self.assertEqual(whole, "<title>Better</title><p>Tolkien: a, b</p><div><h1>Heading</h1><p>text</p><pre><code>\ncode\n</code></pre></div>")
+
+    def test_front_matter_title_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            for markdown, expected in [
+                ("---\ntitle: FM only\n---\n\ntext", "<title>FM only</title><div><p>text</p></div>"),
+                ("---\ntitle: FM only\n---\n\n## Section\n\ntext", "<title>FM only</title><div><h2>Section</h2><p>text</p></div>"),
+                ("---\ntitle: Blog\n---\n", "<title>Blog</title><div></div>"),
+            ]:
+                source = os.path.join(tmp, "page.md")
+                with open(source, "w") as f:
+                    f.write(markdown)
+
+                convert.generate_page("/", source, template, os.path.join(tmp, "whole.html"))
+                convert.stream_page("/", source, template, os.path.join(tmp, "streamed.html"))
+
+                with open(os.path.join(tmp, "whole.html")) as f, open(os.path.join(tmp, "streamed.html")) as g:
+                    self.assertEqual(f.read(), expected)
+                    self.assertEqual(g.read(), expected)
+
+            with open(source, "w") as f:
+                f.write("---\nauthor: Tolkien\n---\n\ntext")
+            for generate in (convert.generate_page, convert.stream_page):
+                with self.assertRaises(ValueError):
+                    generate("/", source, template, os.path.join(tmp, "none.html"))
+
+    def test_iter_blocks_is_lazy(self):
+        def lines():
+            yield "# title"
+            yield ""
+            yield "paragraph"
+            yield ""
+            raise AssertionError("read too far")
+
+        blocks = convert.iter_blocks(lines())
+
+        self.assertEqual(next(blocks).type, "heading")
+        self.assertEqual(next(blocks).type, "paragraph")
 
     def test_extract_title(self):
         input = """# this is the title"""
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+import corpus
+from convert import markdown_to_html_node
+
+
+def read_tree(root):
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+class TestCorpus(unittest.TestCase):
+    def test_generate_is_reproducible(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            paths = corpus.generate(a, pages=20, depth=2, blocks=5, seed=3)
+            corpus.generate(b, pages=20, depth=2, blocks=5, seed=3)
+
+            self.assertEqual(len(paths), 20)
+            self.assertEqual(read_tree(a), read_tree(b))
+
+    def test_pages_respect_depth(self):
+        for path in corpus.page_paths(50, 2):
+            self.assertLessEqual(path.count(os.sep), 4)
+
+    def test_pages_parse(self):
+        for seed in range(5):
+            markdown = corpus.synthetic_markdown(30, seed=seed, link_density=0.5)
+            self.assertTrue(markdown_to_html_node(markdown).to_html().startswith("<div><h1>"))
+
+    def test_mix(self):
+        markdown = corpus.synthetic_markdown(10, mix=corpus.parse_mix("code"))
+
+        self.assertEqual(markdown.count("```"), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+import fileio
+from testutil import write
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.source, "index.css"), "body {}")
+        write(os.path.join(self.source, "images", "a.png"), "png")
+        self.records = {}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, **kwargs):
+        previous, self.records = self.records, {}
+        return fileio.sync(self.source, self.dest, previous, self.records, **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        report = self.sync()
+
+        self.assertEqual(report.copied, ["images/a.png", "index.css"])
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "images", "a.png")))
+
+    def test_unchanged_files_are_skipped(self):
+        self.sync()
+        report = self.sync()
+
+        self.assertEqual(report.copied, [])
+        self.assertEqual(report.unchanged, ["images/a.png", "index.css"])
+
+    def test_touched_but_identical_file_is_skipped(self):
+        self.sync()
+        os.utime(os.path.join(self.source, "index.css"), ns=(0, 0))
+        report = self.sync()
+
+        self.assertEqual(report.copied, [])
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        write(os.path.join(self.source, "index.css"), "body { color: red }")
+        report = self.sync()
+
+        self.assertEqual(report.copied, ["index.css"])
+
+    def test_damaged_copy_is_replaced(self):
+        self.sync()
+        write(os.path.join(self.dest, "index.css"), "")
+        report = self.sync()
+
+        self.assertEqual(report.copied, ["index.css"])
+
+    def test_deleted_file_is_removed(self):
+        self.sync()
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        report = self.sync()
+
+        self.assertEqual(report.removed, ["images/a.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+
+    def test_unrecorded_files_are_kept(self):
+        write(os.path.join(self.dest, "index.html"), "<p>page</p>")
+        self.sync()
+        self.sync()
+
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_link(self):
+        report = self.sync(link=True)
+
+        self.assertEqual(report.linked, ["images/a.png", "index.css"])
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+
+class TestWriteOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_new_file(self):
+        record, written = fileio.write_output(self.path, "<p>é</p>")
+
+        self.assertTrue(written)
+        self.assertEqual(record["size"], 9)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>é</p>")
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+    def test_identical_output_is_skipped(self):
+        record, _ = fileio.write_output(self.path, "<p>page</p>")
+        os.utime(self.path, ns=(0, 0))
+
+        self.assertEqual(fileio.write_output(self.path, "<p>page</p>", record), (record, False))
+        self.assertEqual(fileio.write_output(self.path, "<p>page</p>"), (record, False))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+
+    def test_changed_output_is_replaced(self):
+        record, _ = fileio.write_output(self.path, "<p>page</p>")
+        write(self.path, "<p>edited</p>")
+
+        _, written = fileio.write_output(self.path, "<p>page</p>", record)
+
+        self.assertTrue(written)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>page</p>")
+
+    def test_write_output_stream(self):
+        def fill(stream):
+            for i in range(10000):
+                stream.write(f"<p>{i}</p>")
+
+        record, written = fileio.write_output_stream(self.path, fill)
+        self.assertTrue(written)
+        self.assertEqual(fileio.write_output(self.path, "".join(f"<p>{i}</p>" for i in range(10000))), (record, False))
+
+        self.assertEqual(fileio.write_output_stream(self.path, fill, record), (record, False))
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+    def test_failed_write_keeps_old_file(self):
+        write(self.path, "old")
+
+        def fail(tmp_path):
+            write(tmp_path, "half")
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            fileio.replace_with(self.path, fail)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
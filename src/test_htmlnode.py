@@ -1,4 +1,5 @@
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, escape_text, minify_html, minify_text
+import io
 import unittest
 
 
@@ -60,6 +61,50 @@ class TestParentNode(unittest.TestCase):
 
         self.assertEqual(node.to_html(), "<div><p>123</p><p>456</p></div>")
 
+    def test_to_html_nested(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode("b", "1"), LeafNode(None, " one")], {"class": "x"})])
+
+        self.assertEqual(node.to_html(), "<ul><li class=\"x\"><b>1</b> one</li></ul>")
+
+    def test_write_to(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "123")]), LeafNode("p", "456")])
+        stream = io.StringIO()
+
+        node.write_to(stream)
+
+        self.assertEqual(stream.getvalue(), "<div><p>123</p><p>456</p></div>")
+
+    def test_write_to_invalid_child(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+
+        with self.assertRaises(ValueError):
+            node.write_to(io.StringIO())
+
+
+class TestOutput(unittest.TestCase):
+    def test_escape_text(self):
+        self.assertEqual(escape_text("< Back & forth >"), "&lt; Back &amp; forth &gt;")
+        self.assertEqual(escape_text("&copy; &#169; &amp;"), "&copy; &#169; &amp;")
+
+    def test_escaped_node(self):
+        node = ParentNode("p", [LeafNode(None, "a < b"), LeafNode("a", "x & y", {"href": '/q?a=1&b="2"'})])
+
+        self.assertEqual(node.to_html(escape_text), '<p>a &lt; b<a href="/q?a=1&amp;b=&quot;2&quot;">x &amp; y</a></p>')
+        self.assertEqual(node.to_html(), '<p>a < b<a href="/q?a=1&b="2"">x & y</a></p>')
+
+    def test_minify_keeps_preformatted_text(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "one\n  two\tthree")]),
+            ParentNode("pre", [ParentNode("code", [LeafNode(None, "\nif x:\n    y()\n")])]),
+        ])
+
+        self.assertEqual(node.to_html(minify_text), "<div><p>one two three</p><pre><code>\nif x:\n    y()\n</code></pre></div>")
+
+    def test_minify_html(self):
+        html = "<head>\n  <title>x</title>\n  <script>\n// hi\nrun()\n</script>\n</head>\n<pre>a\n  b</pre>"
+
+        self.assertEqual(minify_html(html), "<head> <title>x</title> <script>\n// hi\nrun()\n</script> </head> <pre>a\n  b</pre>")
+
 
 if __name__ == "__main__":
     unittest.main()
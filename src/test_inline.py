@@ -0,0 +1,80 @@
+import unittest
+
+from convert import split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_html_nodes
+from inline import text_to_textnodes
+from textnode import TextNode, TextType
+
+
+def chained(text):
+    nodes = [TextNode(text, TextType.NORMAL)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+class TestInline(unittest.TestCase):
+    def test_matches_chained_splitters(self):
+        texts = [
+            "plain text",
+            "**bold** at the start and _italic_ at the end",
+            "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+            "[< Back Home](/) then ![a](/a.png)![b](/b.png)[c](/c)",
+            "use **snake_case** names",
+            "the **my_var** value",
+            "**a `b** and `c`",
+            "_`b_]_[`_",
+            "",
+        ]
+        for text in texts:
+            self.assertEqual(text_to_textnodes(text), chained(text))
+
+    def test_unbalanced_delimiter(self):
+        for text in ["a **b", "a _b", "a `b"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_single_star_is_text(self):
+        self.assertEqual(text_to_textnodes("2 * 3"), [TextNode("2 * 3", TextType.NORMAL)])
+
+    def test_code_is_literal(self):
+        nodes = text_to_textnodes("call `snake_case_name` now")
+
+        self.assertEqual(nodes[1], TextNode("snake_case_name", TextType.CODE))
+
+    def test_link_url_is_literal(self):
+        nodes = text_to_textnodes("[x](https://example.com/a_b)")
+
+        self.assertEqual(nodes, [TextNode("x", TextType.LINK, "https://example.com/a_b")])
+
+    def test_bold_inside_link(self):
+        nodes = text_to_textnodes("see [the **best** page](/best)")
+
+        self.assertEqual(nodes, [
+            TextNode("see ", TextType.NORMAL),
+            TextNode("the **best** page", TextType.LINK, "/best", children=[
+                TextNode("the ", TextType.NORMAL),
+                TextNode("best", TextType.BOLD),
+                TextNode(" page", TextType.NORMAL),
+            ]),
+        ])
+
+    def test_link_inside_bold(self):
+        nodes = text_to_textnodes("**go [home](/)**")
+
+        self.assertEqual(nodes, [
+            TextNode("go [home](/)", TextType.BOLD, children=[
+                TextNode("go ", TextType.NORMAL),
+                TextNode("home", TextType.LINK, "/"),
+            ]),
+        ])
+
+    def test_nested_html(self):
+        nodes = text_to_html_nodes("[the **best** _page_](/best)", "/ssg/")
+
+        self.assertEqual("".join(node.to_html() for node in nodes), '<a href="/ssg/best">the <b>best</b> <i>page</i></a>')
+
+
+if __name__ == "__main__":
+    unittest.main()
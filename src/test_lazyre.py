@@ -0,0 +1,25 @@
+import re
+import unittest
+
+from lazyre import LazyPattern
+
+
+class TestLazyPattern(unittest.TestCase):
+    def test_compiles_on_first_use(self):
+        pattern = LazyPattern(r"(\w+)@(\w+)", re.ASCII)
+
+        self.assertNotIn("findall", vars(pattern))
+        self.assertEqual(pattern.findall("a@b c@d"), [("a", "b"), ("c", "d")])
+        self.assertIn("findall", vars(pattern))
+        self.assertEqual(pattern.sub(r"\2", "a@b"), "b")
+        self.assertEqual(pattern.flags, re.ASCII)
+
+    def test_bad_pattern_fails_when_used(self):
+        pattern = LazyPattern("(")
+
+        with self.assertRaises(re.error):
+            pattern.search("")
+
+
+if __name__ == "__main__":
+    unittest.main()
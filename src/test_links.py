@@ -0,0 +1,67 @@
+import unittest
+
+from links import LinkIndex, References, is_internal, page_url
+
+
+def page(dest, links=(), images=()):
+    return {"dest": dest, "links": list(links), "images": list(images)}
+
+
+class TestLinks(unittest.TestCase):
+    def setUp(self):
+        self.pages = {
+            "index.md": page("index.html", ["/blog", "https://www.boot.dev", "#top", "/contact/"]),
+            "blog/index.md": page("blog/index.html", ["/", "post", "/blog/missing"], ["/images/a.png", "../images/b.png"]),
+            "blog/post.md": page("blog/post.html", ["/blog/", "mailto:me@example.com"]),
+            "contact/index.md": page("contact/index.html"),
+            "draft.md": page("draft.html", ["/draft"]),
+        }
+        self.index = LinkIndex(self.pages, ["images/a.png", "index.css"])
+
+    def test_is_internal(self):
+        self.assertTrue(is_internal("/blog"))
+        self.assertTrue(is_internal("post#part"))
+        self.assertFalse(is_internal("https://www.boot.dev"))
+        self.assertFalse(is_internal("//cdn.example.com/x.js"))
+        self.assertFalse(is_internal("#top"))
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "/")
+        self.assertEqual(page_url("blog/index.html"), "/blog/")
+        self.assertEqual(page_url("blog/post.html"), "/blog/post.html")
+
+    def test_find(self):
+        self.assertEqual(self.index.find("/", "blog/post.md"), "index.html")
+        self.assertEqual(self.index.find("/blog", "index.md"), "blog/index.html")
+        self.assertEqual(self.index.find("/blog/", "index.md"), "blog/index.html")
+        self.assertEqual(self.index.find("post", "blog/index.md"), "blog/post.html")
+        self.assertEqual(self.index.find("../index.css", "blog/post.md"), "index.css")
+        self.assertEqual(self.index.find("/blog/post.html#end", "index.md"), "blog/post.html")
+        self.assertIsNone(self.index.find("/nope", "index.md"))
+
+    def test_check(self):
+        report = self.index.check()
+
+        self.assertEqual(report.broken, [("blog/index.md", "/blog/missing")])
+        self.assertEqual(report.missing, [("blog/index.md", "../images/b.png")])
+        self.assertEqual(report.orphans, ["draft.md"])
+
+    def test_listing_links_count_against_orphans(self):
+        index = LinkIndex(self.pages, ["images/a.png"], {"page/2/index.html": {"digest": "", "links": ["/draft.html", "/"]}})
+
+        self.assertEqual(index.check().orphans, [])
+        self.assertEqual(index.find("/page/2/", "index.md"), "page/2/index.html")
+
+    def test_linking_to(self):
+        self.assertEqual(self.index.linking_to(["blog/missing.html", "gone.html"]), {"blog/missing.html": ["blog/index.md"]})
+        self.assertEqual(self.index.linking_to([]), {})
+
+    def test_references_extend(self):
+        refs = References(["/a"], [])
+        refs.extend(References(["/b"], ["/c.png"]))
+
+        self.assertEqual((refs.links, refs.images), (["/a", "/b"], ["/c.png"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import io
+import os
+import tempfile
+import unittest
+
+import listing
+from listing import Listings
+from htmlnode import escape_text
+from meta import PageMeta, SiteIndex
+
+
+def site_index():
+    index = SiteIndex()
+    index.add(PageMeta("index.md", "Home"))
+    index.add(PageMeta("blog/old.md", "Old & <dusty>", {"date": "2020-01-01", "description": "The first"}))
+    index.add(PageMeta("blog/new/index.md", "New", {"date": "2024-05-01T12:00:00+02:00"}))
+    index.add(PageMeta("blog/undated.md", "Undated", {"date": "someday"}))
+    return index
+
+
+def written(output, text=None):
+    stream = io.StringIO()
+    output.write_to(stream, text)
+    return stream.getvalue()
+
+
+class TestListing(unittest.TestCase):
+    def test_listings_settings(self):
+        self.assertEqual(Listings("https://example.com/", ["/blog/"], ["."]).__dict__, {
+            "url": "https://example.com", "feeds": ["blog"], "sections": [""], "per_page": 10, "feed_items": 20,
+        })
+        with self.assertRaises(ValueError):
+            Listings(feeds=["blog"])
+        with self.assertRaises(ValueError):
+            Listings(sections=["blog"], per_page=0)
+
+    def test_section_pages(self):
+        pages = listing.section_pages(site_index(), "blog")
+
+        self.assertEqual([page.path for page in pages], ["blog/new/index.md", "blog/old.md", "blog/undated.md"])
+        self.assertEqual(len(listing.section_pages(site_index(), "")), 3)
+
+    def test_sitemap(self):
+        outputs = listing.outputs(Listings("https://example.com"), site_index(), "/ssg/")
+
+        self.assertEqual([output.dest for output in outputs], ["sitemap.xml"])
+        self.assertEqual(written(outputs[0]), (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            "<url><loc>https://example.com/ssg/</loc></url>\n"
+            "<url><loc>https://example.com/ssg/blog/new/</loc><lastmod>2024-05-01T12:00:00+02:00</lastmod></url>\n"
+            "<url><loc>https://example.com/ssg/blog/old.html</loc><lastmod>2020-01-01</lastmod></url>\n"
+            "<url><loc>https://example.com/ssg/blog/undated.html</loc></url>\n"
+            "</urlset>\n"
+        ))
+
+    def test_feed(self):
+        outputs = listing.outputs(Listings("https://example.com", feeds=["blog"], feed_items=2), site_index(), "/")
+
+        self.assertEqual([output.dest for output in outputs], ["blog/feed.xml", "sitemap.xml"])
+        self.assertEqual(written(outputs[0]), (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>\n'
+            "<title>Blog</title><link>https://example.com/blog/</link><description>Blog</description>\n"
+            "<item><title>New</title><link>https://example.com/blog/new/</link><guid>https://example.com/blog/new/</guid>"
+            "<pubDate>Wed, 01 May 2024 12:00:00 +0200</pubDate></item>\n"
+            "<item><title>Old &amp; &lt;dusty&gt;</title><link>https://example.com/blog/old.html</link>"
+            "<guid>https://example.com/blog/old.html</guid><pubDate>Wed, 01 Jan 2020 00:00:00 +0000</pubDate>"
+            "<description>The first</description></item>\n"
+            "</channel></rss>\n"
+        ))
+
+    def test_listing_pages(self):
+        outputs = listing.outputs(Listings(sections=["blog"], per_page=2), site_index(), "/ssg/")
+
+        self.assertEqual([output.dest for output in outputs], ["blog/index.html", "blog/page/2/index.html"])
+        self.assertEqual([entry["title"] for entry in outputs[0].data["entries"]], ["New", "Old & <dusty>"])
+        self.assertEqual((outputs[0].data["newer"], outputs[0].data["older"]), (None, "/ssg/blog/page/2/"))
+        self.assertEqual((outputs[1].data["newer"], outputs[1].data["older"]), ("/ssg/blog/", None))
+        self.assertEqual(outputs[1].content().to_html(), (
+            '<div><h1>Blog</h1><ul><li><a href="/ssg/blog/undated.html">Undated</a></li></ul>'
+            '<nav><a href="/ssg/blog/" rel="prev">Newer</a></nav></div>'
+        ))
+
+    def test_listing_of_section_with_index_page(self):
+        outputs = listing.outputs(Listings(sections=[""], per_page=10), site_index(), "/")
+
+        self.assertEqual([output.dest for output in outputs], ["page/1/index.html"])
+        self.assertEqual(outputs[0].data["title"], "Home")
+
+    def test_listing_page_uses_template(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write('<title>{{ Title }}</title><a href="/">home</a>{{ Content }}')
+            output = listing.outputs(Listings(sections=["blog"], per_page=1), site_index(), "/ssg/", "escape")[1]
+            output.template = template
+
+            self.assertEqual(written(output, escape_text), (
+                '<title>Blog</title><a href="/ssg/">home</a><div><h1>Blog</h1><ul><li>'
+                '<a href="/ssg/blog/old.html">Old &amp; &lt;dusty&gt;</a> <time datetime="2020-01-01">2020-01-01</time></li></ul>'
+                '<nav><a href="/ssg/blog/" rel="prev">Newer</a><a href="/ssg/blog/page/3/" rel="next">Older</a></nav></div>'
+            ))
+
+    def test_digest(self):
+        index = site_index()
+        settings = Listings("https://example.com", ["blog"], ["blog"])
+        before = {output.dest: output.digest for output in listing.outputs(settings, index, "/")}
+        index.add(PageMeta("blog/old.md", "Old", {"date": "2020-01-01"}))
+        after = {output.dest: output.digest for output in listing.outputs(settings, index, "/")}
+
+        self.assertEqual(before.keys(), after.keys())
+        self.assertTrue(all(before[dest] != after[dest] for dest in before))
+        self.assertEqual(after, {output.dest: output.digest for output in listing.outputs(settings, index, "/")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(code, cwd=HERE):
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+class TestStartup(unittest.TestCase):
+    def test_main_imports_nothing_up_front(self):
+        loaded = run("import sys, main; print(' '.join(sys.modules))").split()
+
+        for module in ("build", "convert", "concurrent.futures", "sqlite3", "json", "logging"):
+            self.assertNotIn(module, loaded)
+
+    def test_render_path_skips_build_modules(self):
+        loaded = run("import sys, convert; print(' '.join(sys.modules))").split()
+
+        for module in ("cache", "pipeline", "concurrent.futures", "shutil", "logging", "mmap"):
+            self.assertNotIn(module, loaded)
+
+
+class TestPage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "content", "blog"))
+        with open(os.path.join(self.root, "template.html"), "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        with open(os.path.join(self.root, "content", "blog", "template.html"), "w") as f:
+            f.write("<h2>{{ Title }}</h2>{{ Content }}")
+        with open(os.path.join(self.root, "content", "blog", "post.md"), "w") as f:
+            f.write("# Post\n\n[home](/)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def page(self, *args):
+        return subprocess.run([sys.executable, os.path.join(HERE, "main.py"), "page", *args], cwd=self.root,
+                              capture_output=True, text=True)
+
+    def test_page(self):
+        result = self.page("content/blog/post.md", "out/post.html", "--basepath", "/ssg/")
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        with open(os.path.join(self.root, "out", "post.html")) as f:
+            self.assertEqual(f.read(), '<h2>Post</h2><div><h1>Post</h1><p><a href="/ssg/">home</a></p></div>')
+        self.assertFalse(os.path.exists(os.path.join(self.root, "docs")))
+
+    def test_missing_page(self):
+        result = self.page("content/nope.md", "out/nope.html")
+
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("nope.md", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
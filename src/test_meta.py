@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import meta
+from meta import PageMeta, SiteIndex
+
+
+class TestMeta(unittest.TestCase):
+    def test_split_front_matter(self):
+        markdown = "---\ndate: 2024-05-01\ntags: [elves, 'heroes']\ntitle: \"Quoted: title\"\n---\n\n# Heading\n\ntext"
+
+        fields, body = meta.split_front_matter(markdown)
+
+        self.assertEqual(fields, {"date": "2024-05-01", "tags": ["elves", "heroes"], "title": "Quoted: title"})
+        self.assertEqual(body, "# Heading\n\ntext")
+
+    def test_split_without_front_matter(self):
+        for markdown in ("# Heading\n\ntext", "---", "---\nnot: closed\n\n# Heading", ""):
+            self.assertEqual(meta.split_front_matter(markdown), (None, markdown))
+
+    def test_split_front_matter_too_long(self):
+        markdown = "---\n" + "key: value\n" * (meta.MAX_FRONT_MATTER + 1) + "---\n# Heading"
+
+        self.assertEqual(meta.split_front_matter(markdown), (None, markdown))
+
+    def test_read_front_matter_matches_split(self):
+        for markdown in ("---\na: 1\n---\n\n\n# Heading\ntext", "---\na: 1\n---", "# Heading\n---\ntext", "---\n# Heading"):
+            fields, body = meta.split_front_matter(markdown)
+            read_fields, lines, read = meta.read_front_matter(iter(markdown.split("\n")))
+
+            self.assertEqual(read_fields, fields)
+            self.assertEqual("\n".join(lines), body)
+            lines_in = lambda text: len(text.split("\n")) if text else 0
+            self.assertEqual(read, lines_in(markdown) - lines_in(body) if fields is not None else 0)
+
+    def test_read_front_matter_reads_no_further(self):
+        def lines():
+            yield "---"
+            yield "a: 1"
+            yield "---"
+            yield "# Heading"
+            raise AssertionError("read too far")
+
+        fields, rest, _ = meta.read_front_matter(lines())
+
+        self.assertEqual(fields, {"a": "1"})
+        self.assertEqual(meta.read_title(rest), "Heading")
+
+    def test_scan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "plain.md"), "w") as f:
+                f.write("# Plain\n\ntext")
+            with open(os.path.join(tmp, "titled.md"), "w") as f:
+                f.write("---\ntitle: Better\n---\n# Heading\n")
+
+            self.assertEqual(meta.scan(tmp, "plain.md"), PageMeta("plain.md", "Plain"))
+            self.assertEqual(meta.scan(tmp, "titled.md"), PageMeta("titled.md", "Better", {"title": "Better"}))
+
+    def test_to_json(self):
+        page = PageMeta("a.md", "A", {"tags": ["x"]})
+
+        self.assertEqual(PageMeta.from_json("a.md", page.to_json()), page)
+
+    def test_by_date(self):
+        index = SiteIndex()
+        for path, date in (("b.md", None), ("old.md", "2020-01-01"), ("a.md", None), ("new.md", "2024-01-01")):
+            index.add(PageMeta(path, path, {"date": date} if date else {}))
+
+        self.assertEqual([page.path for page in index.by_date()], ["new.md", "old.md", "a.md", "b.md"])
+
+    def test_tags(self):
+        index = SiteIndex()
+        index.add(PageMeta("a.md", "A", {"date": "2020-01-01", "tags": ["elves", "heroes"]}))
+        index.add(PageMeta("b.md", "B", {"date": "2021-01-01", "tags": "elves"}))
+        index.add(PageMeta("c.md", "C"))
+
+        tags = index.tags()
+
+        self.assertEqual(list(tags), ["elves", "heroes"])
+        self.assertEqual([page.path for page in tags["elves"]], ["b.md", "a.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
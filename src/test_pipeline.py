@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import pipeline
+from testutil import read, write
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pages(self, sources):
+        pages = []
+        for name, text in sources.items():
+            source_path = os.path.join(self.root, "content", name + ".md")
+            write(source_path, text)
+            pages.append((source_path, self.template, os.path.join(self.root, "docs", name + ".html"), None))
+        return pages
+
+    def test_render_pages(self):
+        pages = self.pages({f"section{i % 3}/page{i}": f"# Page {i}\n\nsome **words**" for i in range(40)})
+
+        results, errors = pipeline.render_pages("/", pages, threads=3, inflight=4)
+
+        self.assertEqual(errors, [None] * 40)
+        self.assertTrue(all(result["written"] for result in results))
+        self.assertEqual(read(pages[7][2]), "<title>Page 7</title><div><h1>Page 7</h1><p>some <b>words</b></p></div>")
+
+    def test_errors_in_page_order(self):
+        pages = self.pages({"a": "# A", "b": "no title", "c": "# C"})
+        pages.insert(1, (os.path.join(self.root, "content", "missing.md"), self.template, os.path.join(self.root, "docs", "missing.html"), None))
+
+        results, errors = pipeline.render_pages("/", pages, threads=2, inflight=1)
+
+        self.assertIsNone(errors[0])
+        self.assertIsNone(results[1])
+        self.assertIsInstance(errors[1], FileNotFoundError)
+        self.assertIsInstance(errors[2], ValueError)
+        self.assertIsNone(errors[3])
+        self.assertTrue(os.path.exists(pages[3][2]))
+        self.assertFalse(os.path.exists(pages[2][2]))
+
+    def test_done_called_for_written_pages(self):
+        pages = self.pages({"a": "# A", "b": "no title", "c": "# C"})
+        done = []
+
+        results, _ = pipeline.render_pages("/", pages, threads=2, inflight=1, done=lambda i, result: done.append((i, result)))
+
+        self.assertEqual(sorted(done, key=lambda item: item[0]), [(0, results[0]), (2, results[2])])
+
+    def test_missing_template(self):
+        pages = [(source_path, os.path.join(self.root, "nope.html"), dest_path, None) for source_path, _, dest_path, _ in self.pages({"a": "# A"})]
+
+        _, errors = pipeline.render_pages("/", pages)
+
+        self.assertIsInstance(errors[0], FileNotFoundError)
+
+    def test_directories_made_once(self):
+        directories = pipeline.Directories()
+        path = os.path.join(self.root, "a", "b")
+
+        directories.ensure(path)
+        os.rmdir(path)
+        directories.ensure(path)
+
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+
+import build
+import listing
+import shard
+from shard import MergeError, Shard
+from testutil import read, write
+
+
+class TestShard(unittest.TestCase):
+    def test_parse(self):
+        parsed = Shard.parse("2/4")
+
+        self.assertEqual((parsed.index, parsed.count), (2, 4))
+        for text in ("0/4", "5/4", "2", "a/b", "1/0"):
+            with self.assertRaises(ValueError):
+                Shard.parse(text)
+
+    def test_assign_is_stable(self):
+        pages = [f"section{i % 7}/page{i}.md" for i in range(1000)]
+        assigned = Shard(1, 4).assign(pages)
+
+        self.assertEqual(set(assigned.values()), {1, 2, 3, 4})
+        self.assertEqual(Shard(3, 4).assign(list(reversed(pages))), assigned)
+        self.assertEqual(Shard(1, 4).assign(pages[:500]), {page: assigned[page] for page in pages[:500]})
+        self.assertTrue(all(200 < list(assigned.values()).count(i) < 300 for i in range(1, 5)))
+
+    def test_assign_by_size(self):
+        sizes = {"huge.md": 1000, **{f"page{i}.md": 10 for i in range(100)}}
+        assigned = Shard(1, 2, weighted=True).assign(list(sizes), sizes)
+
+        loads = [sum(size for page, size in sizes.items() if assigned[page] == i) for i in (1, 2)]
+        self.assertEqual(loads, [1000, 1000])
+
+    def test_select_partitions_pages(self):
+        pages = [f"page{i}.md" for i in range(50)]
+        selected = [Shard(i, 3).select(pages) for i in (1, 2, 3)]
+
+        self.assertEqual(sorted(sum(selected, [])), sorted(pages))
+
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        self.dest = os.path.join(self.root, "docs")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(12):
+            write(os.path.join(self.content, f"page{i}", "index.md"), f"# Page {i}\n\n[home](/)")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_shards(self, count=3, only=None):
+        dirs = []
+        for i in range(1, count + 1):
+            shard_dir = os.path.join(self.root, "shards", str(i))
+            if only is None or i in only:
+                report = build.build("/", self.content, self.template, self.static, shard_dir, shard=Shard(i, count))
+                self.assertEqual(report.errors, [])
+            dirs.append(shard_dir)
+        return dirs
+
+    def test_merge_matches_full_build(self):
+        full = os.path.join(self.root, "full")
+        build.build("/", self.content, self.template, self.static, full)
+
+        report = shard.merge(self.build_shards(), self.dest)
+
+        self.assertEqual(len(report.written), 14)
+        self.assertEqual(report.links.check().broken, [])
+        for i in range(12):
+            rel_path = os.path.join(f"page{i}", "index.html")
+            self.assertEqual(read(os.path.join(self.dest, rel_path)), read(os.path.join(full, rel_path)))
+        self.assertEqual(build.build("/", self.content, self.template, self.static, self.dest).generated, [])
+
+    def test_merge_keeps_shards_and_unknown_dest(self):
+        dirs = self.build_shards()
+        with self.assertRaises(build.DestError):
+            shard.merge(dirs, os.path.dirname(dirs[0]), force=True)
+        self.assertTrue(os.path.exists(os.path.join(dirs[0], "index.css")))
+
+        write(os.path.join(self.dest, "notes.txt"), "keep me")
+        with self.assertRaises(build.DestError):
+            shard.merge(dirs, self.dest)
+        self.assertEqual(read(os.path.join(self.dest, "notes.txt")), "keep me")
+        shard.merge(dirs, self.dest, force=True)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "notes.txt")))
+
+    def test_merge_is_incremental(self):
+        dirs = self.build_shards()
+        shard.merge(dirs, self.dest)
+        write(os.path.join(self.content, "page3", "index.md"), "# Page 3 again")
+        os.remove(os.path.join(self.content, "page4", "index.md"))
+        self.build_shards()
+
+        report = shard.merge(dirs, self.dest)
+
+        self.assertEqual(report.written, ["page3/index.html"])
+        self.assertEqual(report.removed, ["page4/index.html"])
+        self.assertEqual(len(report.skipped), 12)
+
+    def test_merge_gzip_siblings(self):
+        write(os.path.join(self.content, "page1", "index.md"), "# Page 1\n\n" + "[home](/) " * 50)
+        dirs = []
+        for i in (1, 2, 3):
+            dirs.append(os.path.join(self.root, "shards", str(i)))
+            build.build("/", self.content, self.template, self.static, dirs[-1], shard=Shard(i, 3), gzip=(9, 256))
+
+        report = shard.merge(dirs, self.dest)
+
+        self.assertIn("page1/index.html.gz", report.written)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "page1", "index.html.gz")))
+        self.assertIn("page1/index.html.gz", shard.merge(dirs, self.dest).skipped)
+
+    def test_merge_listings(self):
+        listings = listing.Listings("https://example.com", sections=[""])
+        dirs = []
+        for i in (1, 2, 3):
+            dirs.append(os.path.join(self.root, "shards", str(i)))
+            build.build("/", self.content, self.template, self.static, dirs[-1], shard=Shard(i, 3), listings=listings)
+        full = os.path.join(self.root, "full")
+        build.build("/", self.content, self.template, self.static, full, listings=listings)
+
+        report = shard.merge(dirs, self.dest)
+
+        self.assertIn("sitemap.xml", report.written)
+        for rel_path in ("sitemap.xml", os.path.join("page", "1", "index.html"), os.path.join("page", "2", "index.html")):
+            self.assertEqual(read(os.path.join(self.dest, rel_path)), read(os.path.join(full, rel_path)))
+        self.assertEqual(build.build("/", self.content, self.template, self.static, self.dest, listings=listings).listings, [])
+
+    def test_merge_hashed_assets(self):
+        dirs = []
+        for i in (1, 2, 3):
+            dirs.append(os.path.join(self.root, "shards", str(i)))
+            build.build("/", self.content, self.template, self.static, dirs[-1], shard=Shard(i, 3), hash_assets=True)
+
+        report = shard.merge(dirs, self.dest)
+
+        hashed = [path for path in report.written if path.endswith(".css") and path != "index.css"]
+        self.assertEqual(len(hashed), 1)
+        self.assertEqual(read(os.path.join(self.dest, hashed[0])), "body {}")
+        self.assertIn(hashed[0], shard.merge(dirs, self.dest).skipped)
+
+    def test_missing_shard(self):
+        dirs = self.build_shards()
+
+        with self.assertRaises(MergeError) as raised:
+            shard.merge(dirs[:2], self.dest)
+        self.assertEqual(raised.exception.problems, ["expected shards 1 to 3 once each, got 1, 2"])
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_shards_of_different_content(self):
+        dirs = self.build_shards(only=[1, 2])
+        write(os.path.join(self.content, "new", "index.md"), "# New")
+        self.build_shards(only=[3])
+
+        with self.assertRaises(MergeError) as raised:
+            shard.merge(dirs, self.dest)
+        self.assertIn(f"{dirs[2]}: built from different content or shard count", raised.exception.problems)
+
+    def test_damaged_output(self):
+        dirs = self.build_shards(count=1)
+        os.remove(os.path.join(dirs[0], "page0", "index.html"))
+
+        with self.assertRaises(MergeError) as raised:
+            shard.merge(dirs, self.dest)
+        self.assertEqual(raised.exception.problems, [f"{dirs[0]}: page0/index.html is missing or damaged"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import io
+import os
+import tempfile
+import unittest
+
+from assets import AssetTable
+from htmlnode import LeafNode, ParentNode, escape_text, minify_text
+from template import TEMPLATE_NAME, Template, find_template, load_template, rewrite_url
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+
+        self.assertEqual(template.names, ["Title", "Content"])
+        self.assertEqual(template.render({"Title": "t", "Content": "<p>c</p>"}), "<title>t</title><article><p>c</p></article>")
+
+    def test_render_missing_value(self):
+        template = Template("<p>{{ Date }}</p>")
+
+        self.assertEqual(template.render({}), "<p></p>")
+
+    def test_render_repeated_placeholder(self):
+        template = Template("{{Title}} - {{ Title }}")
+
+        self.assertEqual(template.render({"Title": "t"}), "t - t")
+
+    def test_write_to(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        stream = io.StringIO()
+
+        template.write_to(stream, {"Title": "t", "Content": ParentNode("p", [LeafNode("b", "c")])})
+
+        self.assertEqual(stream.getvalue(), "<title>t</title><article><p><b>c</b></p></article>")
+
+    def test_write_to_escaped(self):
+        template = Template("<title>{{ Title }}</title>\n  <pre>a\n  b</pre>\n  {{ Content }}")
+        node = ParentNode("p", [LeafNode(None, "x  <  y")])
+
+        for text, expected in (
+            (escape_text, "<title>A &amp; B</title>\n  <pre>a\n  b</pre>\n  <p>x  &lt;  y</p>"),
+            (minify_text, "<title>A &amp; B</title> <pre>a\n  b</pre> <p>x &lt; y</p>"),
+        ):
+            stream = io.StringIO()
+            template.write_to(stream, {"Title": "A & B", "Content": node}, text)
+            self.assertEqual(stream.getvalue(), expected)
+
+    def test_basepath_in_literals(self):
+        template = Template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/ssg/")
+
+        self.assertEqual(template.render({"Content": 'href="/x"'}), '<link href="/ssg/index.css" /><img src="/ssg/a.png" />href="/x"')
+
+    def test_assets_in_literals(self):
+        table = AssetTable({"index.css": {"hash": "h", "size": 1, "hashed": "index.h.css"}})
+        template = Template('<link href="/index.css?v=2" /><a href="/about">{{ Content }}</a><a href="//cdn/index.css">', "/ssg/", assets=table)
+
+        self.assertEqual(template.render({"Content": "x"}), '<link href="/ssg/index.h.css?v=2" /><a href="/ssg/about">x</a><a href="//cdn/index.css">')
+        self.assertEqual(template.static, ["index.css"])
+
+    def test_rewrite_url(self):
+        self.assertEqual(rewrite_url("/blog/tom", "/ssg/"), "/ssg/blog/tom")
+        self.assertEqual(rewrite_url("https://www.boot.dev", "/ssg/"), "https://www.boot.dev")
+        self.assertEqual(rewrite_url("//cdn.example.com/a.js", "/ssg/"), "//cdn.example.com/a.js")
+        self.assertEqual(rewrite_url("/blog/tom", "/"), "/blog/tom")
+
+    def test_load_template_reloads_on_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("a {{ Content }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as f:
+                f.write("b {{ Content }}")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path).render({"Content": "c"}), "b c")
+
+
+    def test_partials(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            partial = os.path.join(tmp, "partials", "head.html")
+            os.makedirs(os.path.dirname(partial))
+            with open(path, "w") as f:
+                f.write("{{> partials/head.html }}{{ Content }}")
+            with open(partial, "w") as f:
+                f.write('<link href="/index.css">{{ Title }}')
+
+            template = load_template(path, "/ssg/")
+            self.assertEqual(template.files, [path, partial])
+            self.assertEqual(template.render({"Title": "t", "Content": "c"}), '<link href="/ssg/index.css">tc')
+
+            with open(partial, "w") as f:
+                f.write("changed ")
+            os.utime(partial, ns=(0, 0))
+            self.assertEqual(load_template(path, "/ssg/").render({"Content": "c"}), "changed c")
+
+    def test_partial_cycle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{> template.html }}")
+
+            with self.assertRaises(ValueError):
+                load_template(path)
+
+    def test_find_template(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "blog", "2024"))
+            blog = os.path.join(tmp, "blog", TEMPLATE_NAME)
+            with open(blog, "w") as f:
+                f.write("{{ Content }}")
+
+            found = {}
+            self.assertEqual(find_template(tmp, "blog/2024", "default.html", found), blog)
+            self.assertEqual(find_template(tmp, "blog", "default.html", found), blog)
+            self.assertEqual(find_template(tmp, "contact", "default.html", found), "default.html")
+            self.assertEqual(found["blog/2024"], blog)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import timing
+from testutil import write
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.saved = timing.profiler
+        timing.profiler = timing.Profiler()
+
+    def tearDown(self):
+        timing.profiler = self.saved
+
+    def test_nested_phases_are_exclusive(self):
+        profiler = timing.profiler
+        profiler.enter("outer")
+        profiler.enter("inner")
+        profiler.exit()
+        profiler.exit()
+
+        self.assertEqual(profiler.phases["outer"][0], 1)
+        self.assertEqual(profiler.phases["inner"][0], 1)
+        self.assertEqual(profiler.stack, [])
+
+    def test_recursive_calls_count_once(self):
+        def depth(n):
+            return 0 if n == 0 else 1 + depth(n - 1)
+        depth = timing.timed(depth, "depth")
+
+        self.assertEqual(depth(5), 5)
+        self.assertEqual(timing.profiler.phases["depth"][0], 1)
+
+    def test_phase_closed_on_error(self):
+        def fail():
+            raise ValueError("boom")
+        fail = timing.timed(fail, "fail")
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(timing.profiler.stack, [])
+        self.assertEqual(timing.profiler.phases["fail"][0], 1)
+
+    def test_threads_nest_separately(self):
+        profiler = timing.profiler
+        profiler.enter("outer")
+        thread = threading.Thread(target=lambda: (profiler.enter("io"), profiler.exit()))
+        thread.start()
+        thread.join()
+        profiler.exit()
+
+        self.assertEqual(profiler.phases["io"][0], 1)
+        self.assertEqual(profiler.phases["outer"][0], 1)
+        self.assertEqual(profiler.stack, [])
+
+    def test_merge_and_report(self):
+        other = timing.Profiler()
+        other.phases["read"] = [2, 0.5]
+        other.pages["a.md"] = 0.25
+        timing.profiler.phases["read"] = [1, 0.5]
+        timing.profiler.pages["b.md"] = 0.75
+
+        timing.profiler.merge(other.take())
+        data = timing.profiler.to_json(2.0, slowest=1)
+
+        self.assertEqual(data["phases"]["read"], {"calls": 3, "seconds": 1.0})
+        self.assertEqual(data["pages"], 2)
+        self.assertEqual(data["slowest_pages"], [{"path": "b.md", "seconds": 0.75}])
+        self.assertIn("read", timing.profiler.summary(2.0))
+        self.assertEqual(other.phases, {})
+
+
+class TestEnable(unittest.TestCase):
+    def test_build_records_phases(self):
+        # enable() patches modules for good, so the build runs in a child process.
+        code = """
+import json, os, sys
+import build, timing
+root = sys.argv[1]
+profiler = timing.enable()
+for io_threads in (0, 2):
+    build.build("/", os.path.join(root, "content"), os.path.join(root, "template.html"),
+                os.path.join(root, "static"), os.path.join(root, "docs" + str(io_threads)), io_threads=io_threads)
+    print(json.dumps(sorted(profiler.take()["phases"])))
+"""
+        with tempfile.TemporaryDirectory() as root:
+            write(os.path.join(root, "content", "index.md"), "# Home\n\nsome **words**")
+            write(os.path.join(root, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+            write(os.path.join(root, "static", "index.css"), "body {}")
+            src = os.path.dirname(os.path.abspath(__file__))
+            out = subprocess.run([sys.executable, "-c", code, root], cwd=src, capture_output=True, text=True, check=True).stdout
+
+        for line in out.splitlines():
+            self.assertLessEqual({"read", "block parsing", "inline parsing", "write"}, set(json.loads(line)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+
+import watch
+from testutil import write
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.dest = os.path.join(root, "docs")
+        write(self.template, "<body>{{ Content }}</body>")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.watcher = watch.Watcher("/", self.content, self.template, os.path.join(root, "static"), self.dest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_inject_reload(self):
+        self.assertEqual(watch.inject_reload("<body>x</body>"), f"<body>x{watch.RELOAD_SCRIPT}</body>")
+        self.assertEqual(watch.inject_reload("x"), f"x{watch.RELOAD_SCRIPT}")
+
+    def test_poll_rebuilds_changed_pages(self):
+        self.watcher.poll()
+        self.assertIsNone(self.watcher.poll())
+
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nnew post")
+        changed, report = self.watcher.poll()
+
+        self.assertEqual(changed, [os.path.join(self.content, "blog", "index.md")])
+        self.assertEqual(report.generated, ["blog/index.md"])
+        self.assertEqual(self.watcher.reloader.generation, 2)
+
+    def test_poll_watches_partials(self):
+        partial = os.path.join(self.tmp.name, "nav.html")
+        write(partial, "<nav>1</nav>")
+        write(self.template, "{{> nav.html }}<body>{{ Content }}</body>")
+        self.watcher.poll()
+        self.assertIsNone(self.watcher.poll())
+
+        write(partial, "<nav>2</nav>")
+        changed, report = self.watcher.poll()
+
+        self.assertEqual(changed, [partial])
+        self.assertEqual(report.generated, ["blog/index.md", "index.md"])
+
+    def test_serve_injects_reload_script(self):
+        self.watcher.poll()
+        server = self.watcher.serve(0)
+        try:
+            url = f"http://localhost:{server.server_address[1]}/blog/"
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertIn("<h1>Blog</h1>", body)
+        self.assertIn(watch.RELOAD_SCRIPT, body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+"""File helpers shared by the tests."""
+
+import os
+
+
+def write(path, data):
+    """Writes data, text or bytes, to path, making its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
@@ -10,19 +10,28 @@ class TextType(Enum):
     LINK = "link"
     IMAGE = "image"
 
+    # Hash members by identity so dispatch tables keyed on them skip Enum.__hash__.
+    __hash__ = object.__hash__
+
 class TextNode():
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(self, text, text_type, url=None, children=None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        self.children = children
 
     def __eq__(self, other):
         return (
                 self.text == other.text and
                 self.text_type == other.text_type and
-                self.url == other.url
+                self.url == other.url and
+                self.children == other.children
                 )
 
     def __repr__(self):
+        if self.children:
+            return f"TextNode({self.text}, {self.text_type.value}, {self.url}, {self.children})"
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
@@ -0,0 +1,161 @@
+"""Per-phase build timing, enabled with main.py --profile.
+
+Instrumentation works by wrapping the functions that make up each phase,
+so a build without --profile runs the plain functions and pays nothing."""
+
+import functools
+import importlib
+import json
+import threading
+import time
+
+# (module, attribute, phase) for every function that gets timed.
+PHASES = [
+    ("build", "discover_pages", "discovery"),
+    ("build", "index_pages", "metadata scan"),
+    ("build", "write_listings", "listings"),
+    ("convert", "read_source", "read"),
+    ("convert", "parse_blocks", "block parsing"),
+    ("convert", "text_to_html_nodes", "inline parsing"),
+    ("htmlnode", "ParentNode.write", "serialization"),
+    ("template", "Template.write_to", "template fill"),
+    ("convert", "write_page", "write"),
+    ("pipeline", "write_output", "write"),
+    ("fileio", "sync", "asset copy"),
+]
+
+profiler = None
+
+
+class Profiler():
+    """Times phases on any number of threads. Each thread nests its own
+    phases, so time in a phase is summed over the threads running it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.pages = {}
+        self.local = threading.local()
+
+    @property
+    def stack(self):
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        """Closes the innermost phase. Time spent in nested phases is only
+        counted against them, so no time is counted twice."""
+        stack = self.stack
+        name, start, nested = stack.pop()
+        elapsed = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += elapsed
+        with self.lock:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed - nested
+
+    def in_phase(self, name):
+        stack = self.stack
+        return bool(stack) and stack[-1][0] == name
+
+    def merge(self, data):
+        """Adds the measurements returned by take() in another process."""
+        for name, (calls, seconds) in data["phases"].items():
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+        self.pages.update(data["pages"])
+
+    def take(self):
+        """Returns the measurements so far and starts over."""
+        data = {"phases": self.phases, "pages": self.pages}
+        self.reset()
+        return data
+
+    def to_json(self, wall, slowest=10):
+        pages = sorted(self.pages.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "wall_seconds": wall,
+            "phases": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.phases.items()},
+            "pages": len(self.pages),
+            "slowest_pages": [{"path": path, "seconds": seconds} for path, seconds in pages[:slowest]],
+        }
+
+    def summary(self, wall, slowest=10):
+        data = self.to_json(wall, slowest)
+        lines = [f"{'phase':<18} {'calls':>9} {'seconds':>10} {'share':>7}"]
+        for name, entry in sorted(data["phases"].items(), key=lambda item: item[1]["seconds"], reverse=True):
+            share = entry["seconds"] / wall if wall else 0.0
+            lines.append(f"{name:<18} {entry['calls']:>9} {entry['seconds']:>10.4f} {share:>7.1%}")
+        lines.append(f"{'wall':<18} {'':>9} {wall:>10.4f}")
+        if data["slowest_pages"]:
+            lines.append("slowest pages:")
+            for page in data["slowest_pages"]:
+                lines.append(f"  {page['seconds']:8.4f}  {page['path']}")
+        return "\n".join(lines)
+
+
+def timed(fn, name):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Recursive calls, such as nested ParentNodes, count once.
+        if profiler.in_phase(name):
+            return fn(*args, **kwargs)
+        profiler.enter(name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.exit()
+    return wrapper
+
+
+def timed_page(fn):
+    """Records the time fn(basepath, source_path, ...) takes against the page."""
+    @functools.wraps(fn)
+    def wrapper(basepath, from_path, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(basepath, from_path, *args, **kwargs)
+        finally:
+            profiler.pages[from_path] = time.perf_counter() - start
+    return wrapper
+
+
+def enable():
+    """Starts profiling in this process. Safe to call more than once."""
+    global profiler
+    if profiler is not None:
+        return profiler
+    profiler = Profiler()
+    for module_name, attribute, name in PHASES:
+        owner = importlib.import_module(module_name)
+        *path, attr = attribute.split(".")
+        for part in path:
+            owner = getattr(owner, part)
+        setattr(owner, attr, timed(getattr(owner, attr), name))
+    convert = importlib.import_module("convert")
+    convert.generate_page = timed_page(convert.generate_page)
+    pipeline = importlib.import_module("pipeline")
+    pipeline.render_page = timed_page(pipeline.render_page)
+    return profiler
+
+
+def init_worker(enabled):
+    """ProcessPoolExecutor initializer, so spawned workers profile too."""
+    if enabled:
+        enable()
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
@@ -0,0 +1,164 @@
+"""Rebuilds the site when its sources change and serves it with live reload."""
+
+import logging
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import build
+
+log = logging.getLogger("watch")
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = f'<script>new EventSource("{RELOAD_PATH}").onmessage = () => location.reload();</script>'
+
+
+def snapshot(paths):
+    """Returns {path: (size, mtime_ns)} for every file at or under paths."""
+    state = {}
+    stack = [path for path in paths if os.path.exists(path)]
+    while stack:
+        path = stack.pop()
+        if not os.path.isdir(path):
+            st = os.stat(path)
+            state[path] = (st.st_size, st.st_mtime_ns)
+            continue
+        for entry in os.scandir(path):
+            if entry.is_dir():
+                stack.append(entry.path)
+            elif entry.is_file():
+                st = entry.stat()
+                state[entry.path] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def changed_paths(old, new):
+    return sorted(path for path in old.keys() | new.keys() if old.get(path) != new.get(path))
+
+
+def inject_reload(html):
+    """Adds the live reload script to an HTML page, just before </body> if it has one."""
+    i = html.rfind("</body>")
+    if i == -1:
+        return html + RELOAD_SCRIPT
+    return html[:i] + RELOAD_SCRIPT + html[i:]
+
+
+class Reloader():
+    """Counts builds and lets waiting browser connections know when one finishes."""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Blocks until a build newer than generation finishes or timeout passes."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    reloader = None
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, encoding="utf-8") as f:
+            body = inject_reload(f.read()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        generation = self.reloader.generation
+        try:
+            while True:
+                current = self.reloader.wait(generation, timeout=15)
+                if current != generation:
+                    self.wfile.write(b"data: reload\n\n")
+                    self.wfile.flush()
+                    return
+                # A comment keeps the connection alive and notices closed tabs.
+                self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Watcher():
+    def __init__(self, basepath, content_dir, template_path, static_dir, dest_dir, jobs=1, force=False):
+        self.args = (basepath, content_dir, template_path, static_dir, dest_dir)
+        self.jobs = jobs
+        self.force = force
+        self.sources = [content_dir, template_path, static_dir]
+        self.state = {}
+        self.reloader = Reloader()
+
+    def poll(self):
+        """Rebuilds if any source changed since the last poll.
+
+        Returns the changed paths and the build report, or None if nothing changed."""
+        state = snapshot(self.sources)
+        if state == self.state:
+            return None
+        changed = changed_paths(self.state, state)
+        self.state = state
+        report = build.build(*self.args, jobs=self.jobs, force=self.force)
+        # Partials can live anywhere, so also watch whatever the build read.
+        new = [path for path in report.inputs if path not in self.sources]
+        if new:
+            self.sources = self.sources + new
+            self.state.update(snapshot(new))
+        self.reloader.notify()
+        return changed, report
+
+    def serve(self, port):
+        handler = partial(LiveReloadHandler, directory=self.args[4])
+        LiveReloadHandler.reloader = self.reloader
+        server = ThreadingHTTPServer(("", port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def run(self, port, interval=0.2):
+        """Builds, serves dest_dir on port and rebuilds every time a source changes."""
+        self.poll()
+        self.serve(port)
+        log.info("Serving %s at http://localhost:%s/", self.args[4], port)
+        while True:
+            time.sleep(interval)
+            try:
+                result = self.poll()
+            except Exception as e:
+                log.error("error: %s: %s", type(e).__name__, e)
+                continue
+            if result is not None:
+                changed, report = result
+                for error in report.errors:
+                    log.error("error: %s", error)
+                log.info("%s changed: %s", len(changed), report)